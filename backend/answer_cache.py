@@ -0,0 +1,186 @@
+import os
+import time
+import itertools
+import threading
+from collections import OrderedDict
+
+from embedding_cache import normalize_query
+
+# ----------------- CONFIGURATION -----------------
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_SOURCES = int(os.getenv("ANSWER_CACHE_MAX_SOURCES", "10000"))
+
+
+def source_key(path: str) -> str:
+    """Normalise un chemin source pour qu'il soit comparable quel que soit son format.
+
+        Les sources Chroma peuvent contenir des séparateurs Windows (`uploads\\doc.pdf`)
+        alors que le watcher reçoit des chemins POSIX.
+
+        Args:
+            path (str): Chemin source
+
+        Returns:
+            str: Chemin absolu normalisé
+    """
+    return os.path.normcase(os.path.abspath(path.replace("\\", "/")))
+
+
+class AnswerCache:
+    """Cache des réponses générées, invalidé par compteurs de génération de l'index.
+
+        La clé combine la question normalisée, le type de requête et l'état de
+        l'index pour l'ensemble de documents filtré : la génération de chaque
+        document de l'ensemble, ou la génération globale si la recherche porte sur
+        toute la base. Le watcher renouvelle ces compteurs à chaque ajout,
+        modification ou suppression, ce qui rend les anciennes entrées inatteignables.
+
+        La génération d'un document est tirée d'un compteur qui ne repasse jamais
+        par la même valeur. Les documents supprimés sont oubliés et le nombre de
+        documents suivis est borné (LRU) : un document inconnu reçoit une
+        génération neuve, qui ne correspond à aucune entrée existante.
+
+        Attributes:
+            max_entries (int): Nombre maximal de réponses conservées (LRU)
+            ttl (float): Durée de vie d'une réponse en secondes
+            max_sources (int): Nombre maximal de documents dont la génération est suivie
+            generation (int): Génération globale de l'index
+    """
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL,
+                 max_sources: int = ANSWER_CACHE_MAX_SOURCES):
+        """Initialise le cache.
+
+            Args:
+                max_entries (int): Nombre maximal d'entrées
+                ttl (float): Durée de vie des entrées (s)
+                max_sources (int): Nombre maximal de documents suivis
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_sources = max_sources
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._source_generations = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate_sources(self, sources):
+        """Signale l'ajout, la modification ou la suppression de documents indexés.
+
+            Args:
+                sources: Chemins des documents concernés
+        """
+        with self._lock:
+            self.generation += 1
+            for source in sources:
+                self._renew_source(source_key(source))
+
+    def remove_sources(self, sources):
+        """Signale la suppression (ou le déplacement) de documents indexés et les oublie.
+
+            Args:
+                sources: Anciens chemins des documents
+        """
+        with self._lock:
+            self.generation += 1
+            for source in sources:
+                self._source_generations.pop(source_key(source), None)
+
+    def _renew_source(self, key: str) -> int:
+        generation = next(self._generation_counter)
+        self._source_generations[key] = generation
+        self._source_generations.move_to_end(key)
+        while len(self._source_generations) > self.max_sources:
+            self._source_generations.popitem(last=False)
+        return generation
+
+    def _source_generation(self, key: str) -> int:
+        generation = self._source_generations.get(key)
+        if generation is None:
+            return self._renew_source(key)
+        self._source_generations.move_to_end(key)
+        return generation
+
+    def make_key(self, kind: str, question: str, sources=None) -> tuple:
+        """Construit la clé de cache d'une question.
+
+            Args:
+                kind (str): Type de requête (ex: "general", "file")
+                question (str): Question de l'utilisateur
+                sources (list, optional): Documents auxquels la recherche est limitée
+
+            Returns:
+                tuple: Clé de cache
+        """
+        with self._lock:
+            if sources:
+                state = tuple(sorted(
+                    (key, self._source_generation(key))
+                    for key in {source_key(s) for s in sources}
+                ))
+            else:
+                state = ("*", self.generation)
+        return kind, normalize_query(question), state
+
+    def get(self, key: tuple):
+        """Retourne la réponse en cache pour une clé, si elle est encore valide.
+
+            Args:
+                key (tuple): Clé construite par `make_key`
+
+            Returns:
+                dict | None: Entrée en cache ou None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["created_at"] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, fragments: list, sources: list, docs_with_sources: list = None):
+        """Enregistre une réponse complète.
+
+            Args:
+                key (tuple): Clé construite par `make_key`
+                fragments (list): Fragments de texte tels que streamés par le LLM
+                sources (list): Sources envoyées au frontend
+                docs_with_sources (list, optional): Chunks du contexte (pour l'historique)
+        """
+        with self._lock:
+            self._entries[key] = {
+                "fragments": list(fragments),
+                "sources": sources,
+                "docs_with_sources": docs_with_sources or [],
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du cache.
+
+            Returns:
+                dict: Hits, misses, nombre d'entrées, documents suivis et génération globale
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "tracked_sources": len(self._source_generations),
+                "generation": self.generation,
+            }
+
+
+answer_cache = AnswerCache()
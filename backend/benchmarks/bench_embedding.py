@@ -0,0 +1,100 @@
+"""Mesure le débit de l'étape d'embedding contre un faux serveur Ollama local.
+
+Le faux serveur simule le coût d'une requête (`--request-ms`, aller-retour et
+chargement) et le coût par texte (`--item-ms`), pour `/api/embeddings` (un
+texte par requête) comme pour `/api/embed` (par lots). Il traite au plus
+`--server-parallel` requêtes à la fois, comme `OLLAMA_NUM_PARALLEL`.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_embedding --chunks 2000 --request-ms 15 --item-ms 1
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from ollama_client import OllamaClient
+from embedding_stage import EmbeddingStage
+
+DIMENSIONS = 768
+
+
+def make_handler(request_ms: float, item_ms: float, server_parallel: int):
+    slots = threading.Semaphore(server_parallel)
+
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/api/embed":
+                texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            else:
+                texts = [body["prompt"]]
+
+            with slots:
+                time.sleep((request_ms + item_ms * len(texts)) / 1000)
+            vectors = [[float(len(text) % 7)] * DIMENSIONS for text in texts]
+
+            if self.path == "/api/embed":
+                payload = {"embeddings": vectors}
+            else:
+                payload = {"embedding": vectors[0]}
+            out = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return FakeOllamaHandler
+
+
+def run(base_url: str, embed_api: str, batch_size: int, parallelism: int, texts: list) -> float:
+    client = OllamaClient(base_url=base_url, embed_api=embed_api)
+    stage = EmbeddingStage("fake-embed", client=client, batch_size=batch_size, parallelism=parallelism)
+    start = time.perf_counter()
+    vectors = stage.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == len(texts)
+    client.sync_client.close()
+    return len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--request-ms", type=float, default=15.0, help="Coût fixe d'une requête (ms)")
+    parser.add_argument("--item-ms", type=float, default=1.0, help="Coût par texte (ms)")
+    parser.add_argument("--server-parallel", type=int, default=4, help="Requêtes traitées simultanément")
+    parser.add_argument("--port", type=int, default=11499)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(args.request_ms, args.item_ms, args.server_parallel)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    texts = [f"chunk {i} " + "texte " * 80 for i in range(args.chunks)]
+
+    configurations = [
+        ("série (avant)", "embeddings", 1, 1),
+        ("/api/embeddings x4", "embeddings", 8, 4),
+        ("/api/embed lots 32 x1", "embed", 32, 1),
+        ("/api/embed lots 32 x4", "embed", 32, 4),
+        ("/api/embed lots 64 x4", "embed", 64, 4),
+    ]
+    try:
+        for label, embed_api, batch_size, parallelism in configurations:
+            rate = run(base_url, embed_api, batch_size, parallelism, texts)
+            print(f"[BENCH] {label:<24} {rate:9.1f} chunks/s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Mesure le débit d'analyse des PDF (pages/s) avant et après l'analyse en une passe.
+
+Avant : PyPDFLoader pour les chunks, puis pdfplumber pour chercher le préambule
+dans les 20 premières pages, puis pdfplumber à nouveau pour la page retenue.
+Après : une seule passe (`parse_pdf`) dont le texte sert au découpage et à la
+recherche du préambule. Le cache de texte des pages est désactivé des deux côtés.
+
+Sans `--corpus`, génère des rapports texte de `--pages` pages dont le
+préambule se trouve en page `--preamble-page`.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_pdf_parsing --documents 3 --pages 300
+    python -m benchmarks.bench_pdf_parsing --corpus ../rapports
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import pdfplumber
+from langchain_community.document_loaders import PyPDFLoader
+
+from extractors import detect_preamble_page, find_preamble_page, PREAMBLE_SEARCH_PAGES
+from parsed_document import parse_pdf
+
+LINES_PER_PAGE = 45
+
+
+def pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(page: int, preamble_page: int) -> list:
+    if page == 0:
+        return ["RAPPORT D'ETUDE", "Mission 2 : Diagnostic territorial", "Version 1.0"]
+    if page == 1:
+        return [f"Chapitre {i} ........................ {i * 3}" for i in range(1, 30)]
+    title = "Preambule" if page == preamble_page else f"Section {page}"
+    body = [
+        f"Ligne {line} de la page {page} : analyse des besoins, des contraintes et des resultats attendus."
+        for line in range(LINES_PER_PAGE)
+    ]
+    return [title] + body
+
+
+def write_report(path: str, pages: int, preamble_page: int):
+    """Écrit un PDF texte minimal (police standard Helvetica)."""
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(None)
+    objects.append(None)
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for page in range(pages):
+        lines = page_lines(page, preamble_page)
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({pdf_escape(line)}) '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def parse_before(path: str) -> tuple:
+    documents = PyPDFLoader(path).load()
+    preamble_page = detect_preamble_page(path, max_search_pages=PREAMBLE_SEARCH_PAGES)
+    if preamble_page != -1:
+        with pdfplumber.open(path) as pdf:
+            pdf.pages[preamble_page].extract_text()
+    return len(documents), preamble_page
+
+
+def parse_after(path: str) -> tuple:
+    parsed = parse_pdf(path)
+    preamble_page = find_preamble_page(enumerate(parsed.head_pages))
+    parsed.to_documents()
+    return parsed.page_count, preamble_page
+
+
+def run(label: str, parse, paths: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = 0
+        found = []
+        for path in paths:
+            count, preamble_page = parse(path)
+            pages += count
+            found.append(preamble_page)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = pages / best
+    print(f"[BENCH] {label:<20} {pages} pages en {best:7.2f}s  {rate:8.1f} pages/s  préambules={found}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", help="Dossier de PDF réels (sinon corpus généré)")
+    parser.add_argument("--documents", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--preamble-page", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = sorted(
+                os.path.join(args.corpus, name) for name in os.listdir(args.corpus) if name.lower().endswith(".pdf")
+            )
+        else:
+            paths = []
+            for i in range(args.documents):
+                path = os.path.join(tmp, f"rapport_{i}.pdf")
+                write_report(path, args.pages, args.preamble_page)
+                paths.append(path)
+
+        before = run("avant (3 lectures)", parse_before, paths, args.repeat)
+        after = run("après (une passe)", parse_after, paths, args.repeat)
+        print(f"[BENCH] accélération : x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
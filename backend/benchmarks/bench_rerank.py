@@ -0,0 +1,57 @@
+"""Compare le débit du reranking avec et sans regroupement des requêtes.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_rerank --requests 64 --pairs 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sentence_transformers import CrossEncoder
+from rerank_batcher import RerankBatcher
+
+WORDS = (
+    "marché étude rapport mission région société version définitif provisoire "
+    "assainissement réseau station pompage travaux lot préambule objet analyse"
+).split()
+
+
+def random_text(n_words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(n_words))
+
+
+async def run(batcher: RerankBatcher, n_requests: int, n_pairs: int) -> float:
+    requests = [
+        [(random_text(8), random_text(120)) for _ in range(n_pairs)]
+        for _ in range(n_requests)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*(batcher.score(pairs) for pairs in requests))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64, help="Requêtes concurrentes")
+    parser.add_argument("--pairs", type=int, default=20, help="Paires par requête")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    model.predict([("échauffement", "échauffement")])
+
+    for enabled in (False, True):
+        batcher = RerankBatcher(model, args.max_batch_size, args.max_wait_ms, enabled=enabled)
+        elapsed = asyncio.run(run(batcher, args.requests, args.pairs))
+        stats = batcher.stats()
+        print(
+            f"[BENCH] batching={'on ' if enabled else 'off'} "
+            f"{elapsed:.2f}s - {args.requests / elapsed:.1f} req/s - "
+            f"{stats['batches']} appels predict (moy. {stats['avg_batch_size']:.1f} paires)"
+        )
+
+
+if __name__ == "__main__":
+    main()
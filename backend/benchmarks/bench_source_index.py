@@ -0,0 +1,136 @@
+"""Mesure la latence de résolution des chunks à supprimer avec l'index des sources.
+
+Remplit un index temporaire de `--chunks` chunks répartis en dossiers et fichiers,
+puis compare :
+    - la résolution via `SourceIndex` (fichier et dossier)
+    - l'ancien parcours complet des métadonnées (simulé en mémoire, sans le coût
+      du chargement des textes depuis Chroma, donc optimiste pour l'ancien code)
+
+Avec `--chroma`, les mêmes chunks sont aussi écrits dans une collection Chroma
+persistante (vecteurs aléatoires de `--dimensions` flottants) et la suppression
+complète telle que faite par le watcher (résolution par l'index, puis
+`db.delete`) est mesurée pour un fichier puis pour un dossier.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_source_index --chunks 1000000 --chunks-per-file 100
+    python -m benchmarks.bench_source_index --chunks 1000000 --chunks-per-file 100 --chroma
+"""
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from answer_cache import source_key
+from source_index import SourceIndex
+
+FILES_PER_FOLDER = 100
+CHROMA_BATCH_SIZE = 5000
+
+
+def source_path(file_index: int) -> str:
+    return os.path.join("uploads", f"dossier_{file_index // FILES_PER_FOLDER}", f"doc_{file_index}.pdf")
+
+
+def timed(func, repeat: int) -> list:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(label: str, durations: list):
+    print(f"[BENCH] {label:<32} médiane={statistics.median(durations):9.2f}ms max={max(durations):9.2f}ms")
+
+
+def fill_chroma(path: str, n_files: int, chunks_per_file: int, dimensions: int):
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection("langchain")
+    rng = random.Random(0)
+    start = time.perf_counter()
+    batch = []
+    for file_index in range(n_files):
+        source = source_path(file_index)
+        batch.extend((f"{source}:{i // 5}:{i % 5}", source) for i in range(chunks_per_file))
+        if len(batch) >= CHROMA_BATCH_SIZE or file_index == n_files - 1:
+            collection.add(
+                ids=[chunk_id for chunk_id, _ in batch],
+                embeddings=[[rng.random() for _ in range(dimensions)] for _ in batch],
+                metadatas=[{"source": source, "id": chunk_id} for chunk_id, source in batch],
+                documents=[f"Texte du chunk {chunk_id}" for chunk_id, _ in batch],
+            )
+            batch = []
+    print(f"[BENCH] {collection.count()} chunk(s) écrits dans Chroma en {time.perf_counter() - start:.1f}s")
+    return Chroma(client=client, collection_name="langchain")
+
+
+def chroma_delete(db, index: SourceIndex, ids: list) -> int:
+    db.delete(ids)
+    index.remove(ids)
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--chunks-per-file", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chroma", action="store_true", help="Mesure aussi db.delete sur une collection Chroma")
+    parser.add_argument("--dimensions", type=int, default=64)
+    args = parser.parse_args()
+
+    n_files = args.chunks // args.chunks_per_file
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SourceIndex(os.path.join(tmp, "source_index.sqlite3"))
+
+        start = time.perf_counter()
+        metadatas = []
+        for file_index in range(n_files):
+            source = source_path(file_index)
+            entries = [(f"{source}:{i // 5}:{i % 5}", source) for i in range(args.chunks_per_file)]
+            index.add(entries)
+            metadatas.extend((chunk_id, {"source": source}) for chunk_id, _ in entries)
+        print(f"[BENCH] {index.count()} chunk(s) / {n_files} fichier(s) indexés en {time.perf_counter() - start:.1f}s")
+
+        target_file = source_path(n_files // 2)
+        target_folder = os.path.dirname(target_file)
+
+        summarize("SourceIndex fichier", timed(lambda: index.chunk_ids(target_file), args.repeat))
+        summarize("SourceIndex dossier", timed(lambda: index.chunks_under(target_folder), args.repeat))
+
+        key = source_key(target_file)
+        summarize("Parcours complet fichier", timed(
+            lambda: [chunk_id for chunk_id, metadata in metadatas if source_key(metadata["source"]) == key],
+            max(1, args.repeat // 10)
+        ))
+
+        start = time.perf_counter()
+        index.remove(index.chunk_ids(target_file))
+        print(f"[BENCH] Suppression des {args.chunks_per_file} entrée(s) d'un fichier : "
+              f"{(time.perf_counter() - start) * 1000:.2f}ms")
+
+        if not args.chroma:
+            return
+        db = fill_chroma(os.path.join(tmp, "chroma"), n_files, args.chunks_per_file, args.dimensions)
+        for label, target, resolve in (
+            ("fichier", source_path(n_files // 2 + 1), lambda t: index.chunk_ids(t)),
+            ("dossier", target_folder, lambda t: [chunk_id for chunk_id, _ in index.chunks_under(t)]),
+        ):
+            start = time.perf_counter()
+            ids = resolve(target)
+            resolved_ms = (time.perf_counter() - start) * 1000
+            deleted = chroma_delete(db, index, ids)
+            total_ms = (time.perf_counter() - start) * 1000
+            remaining = len(db.get(ids=ids, include=[])["ids"])
+            print(f"[BENCH] Chroma suppression {label:<8} {deleted:>6} chunk(s) : résolution={resolved_ms:8.2f}ms "
+                  f"total={total_ms:9.2f}ms restants={remaining}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Vérifie que la mémoire de l'ingestion ne dépend pas de la taille du document.
+
+Génère un PDF texte de `--pages` pages puis mesure (tracemalloc) le pic de
+mémoire Python :
+    - côté processus d'analyse : `parse_pdf` + découpage page par page + écriture
+      du fichier temporaire de chunks, sans cache de texte des pages, puis avec
+      un cache vide (pages écrites au fil de la lecture) et un cache rempli
+    - côté processus principal : relecture par fenêtres, embedding (vecteurs de
+      `--dimensions` flottants simulés) et écriture (simulée)
+    - réindexation d'un document déjà indexé : `sync_source_chunks` sur une
+      collection Chroma temporaire remplie au préalable par un premier passage
+      (index lexical et index des sources temporaires, embedding simulé)
+et compare à l'ancien chemin (liste complète des chunks puis de leurs vecteurs).
+
+La mesure est faite pour `--pages` et pour un quart de `--pages`. Le script
+échoue si le pic du processus principal (indexation ou réindexation) dépasse
+`--ceiling-mb` ou si un pic du processus d'analyse dépasse `--parse-ceiling-mb`.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_streaming_ingest --pages 2000 --ceiling-mb 32 --parse-ceiling-mb 32
+"""
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+
+from langchain_community.vectorstores import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+import parsed_document
+import watcher
+from benchmarks.bench_pdf_parsing import write_report
+from embedding_stage import EmbeddingStage
+from hashing import file_sha256
+from ingestion_worker import (
+    calculate_chunk_ids, iter_chunks, iter_windows, write_chunk_spool, read_chunk_spool,
+    CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
+)
+from lexical_index import LexicalIndex
+from page_text_cache import PageTextCache
+from parsed_document import parse_pdf
+from source_index import SourceIndex
+from tokenization import annotate_token_counts
+from token_splitter import TokenTextSplitter
+
+WINDOW_SIZE = int(os.getenv("INGEST_WINDOW_SIZE", "256"))
+
+
+def fake_embed(texts: list, dimensions: int) -> list:
+    return [[float(len(text) % 7)] * dimensions for text in texts]
+
+
+class FakeEmbeddingStage(EmbeddingStage):
+    """Étape d'embedding dont les vecteurs sont simulés ; l'écriture dans Chroma est réelle."""
+    def __init__(self, dimensions: int):
+        super().__init__(model="bench")
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: list) -> list:
+        return fake_embed(texts, self.dimensions)
+
+
+def peak_mb(func) -> tuple:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / (1024 * 1024)
+
+
+def before(path: str, dimensions: int) -> int:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    chunks = splitter.split_documents(parse_pdf(path).to_documents())
+    chunks = annotate_token_counts(calculate_chunk_ids(chunks))
+    vectors = fake_embed([chunk.page_content for chunk in chunks], dimensions)
+    return len(vectors)
+
+
+def parse_stage(path: str, spool_dir: str, content_hash=None) -> tuple:
+    parsed = parse_pdf(path, content_hash)
+    splitter = TokenTextSplitter(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+    return write_chunk_spool(iter_chunks(parsed.iter_documents(), splitter), spool_dir)
+
+
+def index_stage(spool: str, dimensions: int) -> int:
+    written = 0
+    for window in iter_windows(read_chunk_spool(spool), WINDOW_SIZE):
+        vectors = fake_embed([chunk.page_content for chunk in window], dimensions)
+        written += len(vectors)
+    return written
+
+
+def use_temporary_index(directory: str, dimensions: int):
+    watcher.db = Chroma(persist_directory=os.path.join(directory, "chroma"), embedding_function=None)
+    watcher.lexical_index = LexicalIndex(os.path.join(directory, "lexical_index.sqlite3"))
+    watcher.source_index = SourceIndex(os.path.join(directory, "source_index.sqlite3"))
+    watcher.embedding_stage = FakeEmbeddingStage(dimensions)
+
+
+def resync_stage(path: str, spool: str) -> dict:
+    return watcher.sync_source_chunks(path, read_chunk_spool(spool))
+
+
+def measure(path: str, spool_dir: str, index_dir: str, dimensions: int) -> dict:
+    chunk_count, before_mb = peak_mb(lambda: before(path, dimensions))
+    (spool, spooled), parse_mb = peak_mb(lambda: parse_stage(path, spool_dir))
+    written, index_mb = peak_mb(lambda: index_stage(spool, dimensions))
+    assert spooled == written
+
+    use_temporary_index(index_dir, dimensions)
+    assert resync_stage(path, spool)["embedded"] == spooled
+    counts, resync_mb = peak_mb(lambda: resync_stage(path, spool))
+    assert counts["unchanged"] == spooled
+    os.remove(spool)
+
+    content_hash = file_sha256(path)
+    cached = {}
+    for run in ("cold", "warm"):
+        (spool, count), cached[run] = peak_mb(lambda: parse_stage(path, spool_dir, content_hash))
+        os.remove(spool)
+        assert count == spooled
+    return {
+        "chunks": chunk_count, "before": before_mb, "parse": parse_mb,
+        "parse_cold": cached["cold"], "parse_warm": cached["warm"], "index": index_mb, "resync": resync_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--ceiling-mb", type=float, default=32.0)
+    parser.add_argument("--parse-ceiling-mb", type=float, default=32.0)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        parsed_document.page_text_cache = PageTextCache(os.path.join(tmp, "page_text_cache.sqlite3"))
+        for pages in (max(1, args.pages // 4), args.pages):
+            path = os.path.join(tmp, f"annexe_{pages}.pdf")
+            write_report(path, pages, preamble_page=2)
+            results[pages] = measure(path, os.path.join(tmp, "spool"), os.path.join(tmp, f"index_{pages}"), args.dimensions)
+            r = results[pages]
+            print(
+                f"[BENCH] {pages:>6} pages {r['chunks']:>7} chunks  "
+                f"avant={r['before']:8.1f} Mo  analyse={r['parse']:6.1f} Mo  "
+                f"analyse cache vide={r['parse_cold']:6.1f} Mo  analyse cache rempli={r['parse_warm']:6.1f} Mo  "
+                f"indexation={r['index']:6.1f} Mo  réindexation={r['resync']:6.1f} Mo"
+            )
+
+    failed = False
+    index_peak = max(results[args.pages][key] for key in ("index", "resync"))
+    if index_peak > args.ceiling_mb:
+        print(f"[BENCH] ÉCHEC : pic d'indexation ou de réindexation {index_peak:.1f} Mo > plafond {args.ceiling_mb:.1f} Mo")
+        failed = True
+    parse_peak = max(results[args.pages][key] for key in ("parse", "parse_cold", "parse_warm"))
+    if parse_peak > args.parse_ceiling_mb:
+        print(f"[BENCH] ÉCHEC : pic d'analyse {parse_peak:.1f} Mo > plafond {args.parse_ceiling_mb:.1f} Mo")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(
+        f"[BENCH] OK : pic d'indexation ou de réindexation {index_peak:.1f} Mo <= plafond {args.ceiling_mb:.1f} Mo, "
+        f"pic d'analyse {parse_peak:.1f} Mo <= plafond {args.parse_ceiling_mb:.1f} Mo"
+    )
+
+
+if __name__ == "__main__":
+    main()
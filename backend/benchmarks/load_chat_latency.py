@@ -0,0 +1,93 @@
+"""Mesure la latence d'endpoints sans rapport avec le chat pendant une charge de requêtes chat.
+
+Le serveur doit être démarré (uvicorn main:app). Le script lance des requêtes
+`/chat/stream-query` en parallèle et interroge en continu un endpoint léger
+(`/explorer/` par défaut) pour vérifier qu'il reste réactif.
+
+Usage (depuis backend/) :
+    python -m benchmarks.load_chat_latency --base-url http://localhost:8000 --chat-clients 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+QUESTIONS = [
+    "Quel est l'objet du marché ?",
+    "Quelle est la mission principale de l'étude ?",
+    "Quelles sont les conclusions du rapport définitif ?",
+    "Quelle société a réalisé l'étude ?",
+]
+
+
+async def chat_client(client: httpx.AsyncClient, stop: asyncio.Event, durations: list):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with client.stream(
+            "POST", "/chat/stream-query",
+            json={"query_text": QUESTIONS[i % len(QUESTIONS)]}
+        ) as response:
+            async for _ in response.aiter_lines():
+                pass
+        durations.append(time.perf_counter() - start)
+        i += 1
+
+
+async def probe(client: httpx.AsyncClient, path: str, duration: float, interval: float) -> list:
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else max(latencies)
+    print(
+        f"[LOAD] {label:<14} n={len(latencies):<4} "
+        f"p50={statistics.median(latencies):7.1f}ms p95={p95:7.1f}ms max={max(latencies):7.1f}ms"
+    )
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=300) as client:
+        idle = await probe(client, args.probe_path, args.baseline, args.interval)
+        summarize("sans charge", idle)
+
+        stop = asyncio.Event()
+        chat_durations = []
+        chats = [
+            asyncio.create_task(chat_client(client, stop, chat_durations))
+            for _ in range(args.chat_clients)
+        ]
+        loaded = await probe(client, args.probe_path, args.duration, args.interval)
+        stop.set()
+        await asyncio.gather(*chats, return_exceptions=True)
+
+        summarize("sous charge", loaded)
+        if chat_durations:
+            print(f"[LOAD] {len(chat_durations)} requête(s) chat terminée(s), "
+                  f"durée médiane {statistics.median(chat_durations):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--probe-path", default="/explorer/")
+    parser.add_argument("--chat-clients", type=int, default=8)
+    parser.add_argument("--baseline", type=float, default=5.0, help="Durée de la mesure à vide (s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée de la mesure sous charge (s)")
+    parser.add_argument("--interval", type=float, default=0.1, help="Intervalle entre deux sondes (s)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
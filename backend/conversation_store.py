@@ -0,0 +1,266 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+# ----------------- CONFIGURATION -----------------
+
+CONVERSATION_DB_FILE = "conversations.sqlite3"
+LEGACY_CONV_FILE = "conversations.json"
+
+
+class ConversationStore:
+    """Stockage transactionnel des conversations (SQLite en mode WAL).
+
+        Une ligne par conversation et une ligne par message : chaque opération ne
+        lit et n'écrit que les lignes concernées, dans une transaction, au lieu de
+        réécrire tout l'historique. Les messages sont conservés tels que reçus
+        (JSON), ce qui préserve les champs non modélisés comme `isLoading`.
+
+        Chaque thread utilise sa propre connexion ; les écritures prennent le verrou
+        d'écriture dès le début de la transaction (`BEGIN IMMEDIATE`) pour que deux
+        mises à jour concurrentes ne s'écrasent pas.
+
+        Attributes:
+            path (str): Chemin du fichier SQLite
+    """
+    def __init__(self, path: str = CONVERSATION_DB_FILE, legacy_file: str = LEGACY_CONV_FILE):
+        """Ouvre (ou crée) la base et migre l'ancien fichier JSON si nécessaire.
+
+            Args:
+                path (str): Chemin du fichier SQLite
+                legacy_file (str): Ancien fichier `conversations.json` à importer
+        """
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                position INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_position ON conversations(position);
+            CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+                message_id INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, message_id);
+            """
+        )
+        self._migrate_legacy(legacy_file)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate_legacy(self, legacy_file: str):
+        """Importe une seule fois `conversations.json` puis le renomme en `.migrated`."""
+        if not legacy_file or not os.path.exists(legacy_file):
+            return
+        if self._connection().execute("SELECT 1 FROM conversations LIMIT 1").fetchone():
+            return
+
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                content = f.read()
+            convs = json.loads(content) if content.strip() else []
+        except json.JSONDecodeError as e:
+            print(f"[ConversationStore] Fichier {legacy_file} illisible, migration ignorée : {e}")
+            return
+
+        with self._write() as conn:
+            for position, conv in enumerate(convs):
+                self._insert(conn, conv, position)
+
+        os.replace(legacy_file, legacy_file + ".migrated")
+        print(f"[ConversationStore] {len(convs)} conversation(s) migrée(s) depuis {legacy_file}")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, conv: dict, position: int):
+        conn.execute(
+            "INSERT OR REPLACE INTO conversations (id, name, mode, position) VALUES (?, ?, ?, ?)",
+            (conv["id"], conv.get("name", ""), conv.get("mode") or "classic", position)
+        )
+        ConversationStore._insert_messages(conn, conv["id"], conv.get("messages", []))
+
+    @staticmethod
+    def _insert_messages(conn: sqlite3.Connection, conv_id: str, messages: List[dict]):
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, message_id, data) VALUES (?, ?, ?)",
+            [(conv_id, m["id"], json.dumps(m, ensure_ascii=False)) for m in messages]
+        )
+
+    @staticmethod
+    def _update_fields(conn: sqlite3.Connection, conv_id: str, message_id: int, changes: dict) -> bool:
+        row = conn.execute(
+            "SELECT seq, data FROM messages WHERE conversation_id = ? AND message_id = ? ORDER BY seq LIMIT 1",
+            (conv_id, message_id)
+        ).fetchone()
+        if row is None:
+            return False
+        message = json.loads(row[1])
+        message.update(changes)
+        conn.execute(
+            "UPDATE messages SET data = ? WHERE seq = ?", (json.dumps(message, ensure_ascii=False), row[0])
+        )
+        return True
+
+    def _messages(self, conv_id: str) -> List[dict]:
+        rows = self._connection().execute(
+            "SELECT data FROM messages WHERE conversation_id = ? ORDER BY seq", (conv_id,)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def list_conversations(self) -> List[dict]:
+        """Retourne toutes les conversations, les plus récentes en premier.
+
+            Returns:
+                List[dict]: Conversations avec leurs messages
+        """
+        conn = self._connection()
+        convs = {}
+        for conv_id, name, mode in conn.execute(
+            "SELECT id, name, mode FROM conversations ORDER BY position"
+        ):
+            convs[conv_id] = {"id": conv_id, "name": name, "mode": mode, "messages": []}
+        for conv_id, data in conn.execute("SELECT conversation_id, data FROM messages ORDER BY seq"):
+            if conv_id in convs:
+                convs[conv_id]["messages"].append(json.loads(data))
+        return list(convs.values())
+
+    def get_conversation(self, conv_id: str) -> Optional[dict]:
+        """Retourne une conversation.
+
+            Args:
+                conv_id (str): ID de la conversation
+
+            Returns:
+                Optional[dict]: Conversation ou None si elle n'existe pas
+        """
+        row = self._connection().execute(
+            "SELECT id, name, mode FROM conversations WHERE id = ?", (conv_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "name": row[1], "mode": row[2], "messages": self._messages(conv_id)}
+
+    def create_conversation(self, conv: dict):
+        """Ajoute une conversation en tête de liste.
+
+            Args:
+                conv (dict): Conversation à créer
+        """
+        with self._write() as conn:
+            top = conn.execute("SELECT MIN(position) FROM conversations").fetchone()[0]
+            conn.execute("DELETE FROM conversations WHERE id = ?", (conv["id"],))
+            self._insert(conn, conv, (top if top is not None else 0) - 1)
+
+    def replace_conversation(self, conv_id: str, conv: dict) -> bool:
+        """Remplace le nom, le mode et les messages d'une conversation.
+
+            Args:
+                conv_id (str): ID de la conversation
+                conv (dict): Nouvelles données
+
+            Returns:
+                bool: False si la conversation n'existe pas
+        """
+        with self._write() as conn:
+            updated = conn.execute(
+                "UPDATE conversations SET name = ?, mode = ? WHERE id = ?",
+                (conv.get("name", ""), conv.get("mode") or "classic", conv_id)
+            ).rowcount
+            if not updated:
+                return False
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id,))
+            self._insert_messages(conn, conv_id, conv.get("messages", []))
+        return True
+
+    def delete_conversation(self, conv_id: str) -> bool:
+        """Supprime une conversation et ses messages.
+
+            Args:
+                conv_id (str): ID de la conversation
+
+            Returns:
+                bool: False si la conversation n'existe pas
+        """
+        with self._write() as conn:
+            return conn.execute("DELETE FROM conversations WHERE id = ?", (conv_id,)).rowcount > 0
+
+    def delete_message(self, conv_id: str, message_id: int) -> bool:
+        """Supprime un message.
+
+            Args:
+                conv_id (str): ID de la conversation
+                message_id (int): ID du message
+
+            Returns:
+                bool: False si la conversation n'existe pas
+        """
+        with self._write() as conn:
+            if not conn.execute("SELECT 1 FROM conversations WHERE id = ?", (conv_id,)).fetchone():
+                return False
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ? AND message_id = ?", (conv_id, message_id)
+            )
+        return True
+
+    def upsert_message(self, conv_id: str, message_id: int, changes: dict, new_message: dict) -> bool:
+        """Met à jour un message existant ou l'ajoute en fin de conversation.
+
+            Args:
+                conv_id (str): ID de la conversation
+                message_id (int): ID du message
+                changes (dict): Champs à modifier si le message existe
+                new_message (dict): Message complet à ajouter s'il n'existe pas
+
+            Returns:
+                bool: False si la conversation n'existe pas
+        """
+        with self._write() as conn:
+            if not conn.execute("SELECT 1 FROM conversations WHERE id = ?", (conv_id,)).fetchone():
+                return False
+            if not self._update_fields(conn, conv_id, message_id, changes):
+                self._insert_messages(conn, conv_id, [new_message])
+        return True
+
+    def update_message_fields(self, conv_id: str, message_id: int, changes: dict) -> bool:
+        """Modifie des champs d'un message existant.
+
+            Args:
+                conv_id (str): ID de la conversation
+                message_id (int): ID du message
+                changes (dict): Champs à modifier
+
+            Returns:
+                bool: False si le message n'existe pas
+        """
+        with self._write() as conn:
+            return self._update_fields(conn, conv_id, message_id, changes)
+
+conversation_store = ConversationStore()
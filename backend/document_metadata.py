@@ -0,0 +1,139 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Optional
+
+# ----------------- CONFIGURATION -----------------
+
+METADATA_FILE = "documents_metadata.json"
+
+
+class DocumentMetadataFile:
+    """Accès en écriture au fichier des métadonnées des documents (`documents_metadata.json`).
+
+        Le fichier est modifié par l'ingestion (boucle d'événements), le thread
+        du watcher, l'étape LLM et l'endpoint de mise à jour des métadonnées.
+        Chaque modification relit, modifie et réécrit le fichier sous un même
+        verrou ; l'écriture passe par un fichier temporaire remplacé par
+        `os.replace`, si bien qu'un lecteur ne voit jamais un fichier à moitié écrit.
+
+        Attributes:
+            path (str): Chemin du fichier de métadonnées
+    """
+    def __init__(self, path: str = METADATA_FILE):
+        """Initialise l'accès au fichier.
+
+            Args:
+                path (str): Chemin du fichier de métadonnées
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, all_metadata: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".documents_metadata.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(all_metadata, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def load(self) -> dict:
+        """Retourne toutes les métadonnées.
+
+            Returns:
+                dict: Métadonnées par nom de fichier
+        """
+        with self._lock:
+            return self._read()
+
+    def get(self, filename: str) -> Optional[dict]:
+        """Retourne les métadonnées d'un document.
+
+            Args:
+                filename (str): Nom du fichier
+
+            Returns:
+                Optional[dict]: Métadonnées, ou None si le document n'en a pas
+        """
+        return self.load().get(filename)
+
+    def put(self, filename: str, metadata: dict):
+        """Remplace les métadonnées d'un document.
+
+            Args:
+                filename (str): Nom du fichier
+                metadata (dict): Métadonnées
+        """
+        with self._lock:
+            all_metadata = self._read()
+            all_metadata[filename] = metadata
+            self._write(all_metadata)
+
+    def merge(self, filename: str, fields: dict) -> dict:
+        """Ajoute ou remplace des champs dans les métadonnées d'un document.
+
+            Args:
+                filename (str): Nom du fichier
+                fields (dict): Champs à fusionner
+
+            Returns:
+                dict: Métadonnées du document après fusion
+        """
+        with self._lock:
+            all_metadata = self._read()
+            metadata = {**all_metadata.get(filename, {}), **fields}
+            all_metadata[filename] = metadata
+            self._write(all_metadata)
+            return metadata
+
+    def remove(self, filename: str) -> Optional[dict]:
+        """Supprime les métadonnées d'un document.
+
+            Args:
+                filename (str): Nom du fichier
+
+            Returns:
+                Optional[dict]: Métadonnées supprimées, ou None si le document n'en avait pas
+        """
+        with self._lock:
+            all_metadata = self._read()
+            if filename not in all_metadata:
+                return None
+            metadata = all_metadata.pop(filename)
+            self._write(all_metadata)
+            return metadata
+
+    def rename(self, old_filename: str, new_filename: str) -> Optional[dict]:
+        """Réaffecte les métadonnées d'un document à un nouveau nom.
+
+            Args:
+                old_filename (str): Ancien nom du fichier
+                new_filename (str): Nouveau nom du fichier
+
+            Returns:
+                Optional[dict]: Métadonnées déplacées, ou None si l'ancien nom n'en avait pas
+        """
+        with self._lock:
+            all_metadata = self._read()
+            if old_filename not in all_metadata:
+                return None
+            metadata = all_metadata.pop(old_filename)
+            all_metadata[new_filename] = metadata
+            self._write(all_metadata)
+            return metadata
+
+
+document_metadata = DocumentMetadataFile()
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+import re
+from collections import OrderedDict
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+# ----------------- CONFIGURATION -----------------
+
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MEMORY_SIZE = 1024
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "50000"))
+EMBEDDING_CACHE_EVICT_RATIO = 0.9
+
+
+def normalize_query(text: str) -> str:
+    """Normalise une requête pour servir de clé de cache.
+
+        Effectue les opérations suivantes:
+        - Normalisation Unicode (NFC)
+        - Mise en minuscules
+        - Réduction des espaces multiples
+
+        Args:
+            text (str): Requête à normaliser
+
+        Returns:
+            str: Requête normalisée
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Enveloppe un modèle d'embedding avec un cache des requêtes à deux niveaux.
+
+        Le premier niveau est un LRU en mémoire, le second une table SQLite
+        persistante qui survit aux redémarrages, elle aussi bornée : au-delà de
+        `max_disk_entries`, les requêtes les moins récemment lues sur disque
+        sont supprimées. Seuls les embeddings de requêtes sont mis en cache :
+        l'indexation des documents passe directement au modèle.
+
+        La clé inclut le modèle et l'endpoint d'embedding du client Ollama
+        (`/api/embeddings` ou `/api/embed`), qui ne normalisent pas les vecteurs
+        de la même façon : changer d'endpoint ne sert pas d'anciens vecteurs.
+
+        Attributes:
+            embeddings (Embeddings): Modèle d'embedding sous-jacent
+            model_name (str): Nom du modèle, inclus dans la clé de cache avec l'endpoint d'embedding
+            hits (int): Nombre de requêtes servies depuis la mémoire
+            disk_hits (int): Nombre de requêtes servies depuis le disque
+            misses (int): Nombre de requêtes calculées par le modèle
+            evictions (int): Nombre d'entrées supprimées du cache disque
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_file: str = EMBEDDING_CACHE_FILE,
+                 max_memory_entries: int = EMBEDDING_CACHE_MEMORY_SIZE,
+                 max_disk_entries: int = EMBEDDING_CACHE_DISK_SIZE):
+        """Initialise le cache.
+
+            Args:
+                embeddings (Embeddings): Modèle d'embedding sous-jacent
+                model_name (str): Nom du modèle d'embedding
+                cache_file (str): Chemin du fichier SQLite du cache disque
+                max_memory_entries (int): Taille maximale du LRU en mémoire
+                max_disk_entries (int): Nombre maximal d'entrées du cache disque
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_file = cache_file
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " model TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " vector TEXT NOT NULL,"
+            " PRIMARY KEY (model, query))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(query_embeddings)")}
+        if "last_access" not in columns:
+            self._conn.execute("ALTER TABLE query_embeddings ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_embeddings_access ON query_embeddings(last_access)"
+        )
+        self._conn.commit()
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def _model_key(self) -> str:
+        embed_api = getattr(getattr(self.embeddings, "client", None), "embed_api", None)
+        return f"{self.model_name}@{embed_api}" if embed_api else self.model_name
+
+    def _remember(self, key: tuple, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        if self._disk_entries <= self.max_disk_entries:
+            return
+        excess = self._disk_entries - int(self.max_disk_entries * EMBEDDING_CACHE_EVICT_RATIO)
+        deleted = self._conn.execute(
+            "DELETE FROM query_embeddings WHERE rowid IN "
+            "(SELECT rowid FROM query_embeddings ORDER BY last_access LIMIT ?)",
+            (excess,)
+        ).rowcount
+        self.evictions += deleted
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calcule les embeddings de documents sans passer par le cache.
+
+            Args:
+                texts (List[str]): Textes à encoder
+
+            Returns:
+                List[List[float]]: Vecteurs d'embedding
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calcule l'embedding d'une requête en consultant d'abord le cache.
+
+            Args:
+                text (str): Requête à encoder
+
+            Returns:
+                List[float]: Vecteur d'embedding
+        """
+        model_key = self._model_key()
+        query = normalize_query(text)
+        key = (model_key, query)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            row = self._conn.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                (model_key, query)
+            ).fetchone()
+            if row:
+                vector = json.loads(row[0])
+                self._remember(key, vector)
+                self.disk_hits += 1
+                try:
+                    self._conn.execute(
+                        "UPDATE query_embeddings SET last_access = ? WHERE model = ? AND query = ?",
+                        (time.time(), model_key, query)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"[EmbeddingCache] Erreur d'écriture du cache disque : {e}")
+                return vector
+
+        vector = self.embeddings.embed_query(text)
+
+        with self._lock:
+            self.misses += 1
+            self._remember(key, vector)
+            try:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO query_embeddings (model, query, vector, last_access) VALUES (?, ?, ?, ?)",
+                    (model_key, query, json.dumps(vector), time.time())
+                ).rowcount
+                self._disk_entries += inserted
+                self._evict_disk()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Erreur d'écriture du cache disque : {e}")
+
+        return vector
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du cache.
+
+            Returns:
+                dict: Hits mémoire et disque, misses, taux de succès et tailles
+        """
+        model_key = self._model_key()
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            disk_entries = self._conn.execute(
+                "SELECT COUNT(*) FROM query_embeddings WHERE model = ?",
+                (model_key,)
+            ).fetchone()[0]
+            return {
+                "model": model_key,
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "max_disk_entries": self.max_disk_entries,
+                "disk_evictions": self.evictions,
+            }
@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import httpx
+
+from ollama_client import ollama_client
+
+# ----------------- CONFIGURATION -----------------
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_PARALLELISM = int(os.getenv("EMBED_PARALLELISM", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+EMBED_RETRY_BACKOFF = float(os.getenv("EMBED_RETRY_BACKOFF", "0.5"))
+CHROMA_UPSERT_BATCH = int(os.getenv("CHROMA_UPSERT_BATCH", "2000"))
+
+
+class EmbeddingStage:
+    """Étape d'embedding de l'ingestion : lots, parallélisme borné et reprises.
+
+        Les textes sont découpés en lots de `batch_size` envoyés à Ollama par au
+        plus `parallelism` requêtes simultanées. Un lot en échec est retenté avec
+        une attente exponentielle. Les vecteurs sont ensuite écrits dans Chroma
+        par upserts de `upsert_batch` chunks.
+
+        Attributes:
+            model (str): Nom du modèle d'embedding
+            batch_size (int): Nombre de textes par requête
+            parallelism (int): Nombre maximal de requêtes simultanées
+            max_retries (int): Nombre de reprises d'un lot en échec
+            retry_backoff (float): Attente avant la première reprise (s), doublée à chaque essai
+            upsert_batch (int): Nombre de chunks par écriture Chroma
+            embed_instruction (str): Préfixe d'instruction des passages (comme `OllamaEmbeddings`)
+    """
+    def __init__(self, model: str, client=None, batch_size: int = EMBED_BATCH_SIZE,
+                 parallelism: int = EMBED_PARALLELISM, max_retries: int = EMBED_MAX_RETRIES,
+                 retry_backoff: float = EMBED_RETRY_BACKOFF, upsert_batch: int = CHROMA_UPSERT_BATCH,
+                 embed_instruction: str = "passage: "):
+        """Initialise l'étape.
+
+            Args:
+                model (str): Nom du modèle d'embedding
+                client (OllamaClient, optional): Client Ollama (client partagé par défaut)
+                batch_size (int): Nombre de textes par requête
+                parallelism (int): Nombre maximal de requêtes simultanées
+                max_retries (int): Nombre de reprises d'un lot en échec
+                retry_backoff (float): Attente initiale entre deux essais (s)
+                upsert_batch (int): Nombre de chunks par écriture Chroma
+                embed_instruction (str): Préfixe ajouté à chaque passage
+        """
+        self.model = model
+        self.client = client or ollama_client
+        self.batch_size = max(1, batch_size)
+        self.parallelism = max(1, parallelism)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.upsert_batch = max(1, upsert_batch)
+        self.embed_instruction = embed_instruction
+        self.chunks = 0
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.last_rate = 0.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="embed")
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                vectors = self.client.embed_batch(self.model, texts)
+                with self._lock:
+                    self.batches += 1
+                return vectors
+            except (httpx.HTTPError, KeyError) as e:
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"[Embedding] Échec d'un lot de {len(texts)} texte(s) ({e}), nouvel essai dans {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calcule les embeddings de passages.
+
+            Args:
+                texts (List[str]): Textes des chunks
+
+            Returns:
+                List[List[float]]: Vecteurs dans l'ordre des textes
+        """
+        if not texts:
+            return []
+        start = time.perf_counter()
+        prefixed = [f"{self.embed_instruction}{text}" for text in texts]
+        batches = [prefixed[i:i + self.batch_size] for i in range(0, len(prefixed), self.batch_size)]
+        vectors = []
+        for batch_vectors in self._executor.map(self._embed_batch, batches):
+            vectors.extend(batch_vectors)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.chunks += len(texts)
+            self.seconds += elapsed
+            self.last_rate = len(texts) / elapsed if elapsed else 0.0
+        print(f"[Embedding] {len(texts)} chunk(s) en {elapsed:.2f}s ({self.last_rate:.1f} chunks/s)")
+        return vectors
+
+    def upsert(self, db, chunks, vectors: List[List[float]]):
+        """Écrit des chunks et leurs vecteurs dans Chroma par grands lots.
+
+            Args:
+                db (Chroma): Base vectorielle
+                chunks: Documents LangChain dont les métadonnées contiennent `id`
+                vectors (List[List[float]]): Vecteurs dans l'ordre des chunks
+        """
+        for i in range(0, len(chunks), self.upsert_batch):
+            batch = chunks[i:i + self.upsert_batch]
+            db._collection.upsert(
+                ids=[chunk.metadata["id"] for chunk in batch],
+                embeddings=[[float(x) for x in vector] for vector in vectors[i:i + self.upsert_batch]],
+                metadatas=[chunk.metadata for chunk in batch],
+                documents=[chunk.page_content for chunk in batch]
+            )
+
+    def index_chunks(self, db, chunks):
+        """Embedde des chunks puis les écrit dans Chroma.
+
+            Args:
+                db (Chroma): Base vectorielle
+                chunks: Documents LangChain dont les métadonnées contiennent `id`
+        """
+        vectors = self.embed_documents([chunk.page_content for chunk in chunks])
+        self.upsert(db, chunks, vectors)
+
+    def stats(self) -> dict:
+        """Retourne la configuration et le débit de l'étape.
+
+            Returns:
+                dict: Paramètres, compteurs et débit (chunks/s)
+        """
+        with self._lock:
+            return {
+                "model": self.model,
+                "embed_api": self.client.embed_api,
+                "batch_size": self.batch_size,
+                "parallelism": self.parallelism,
+                "upsert_batch": self.upsert_batch,
+                "chunks": self.chunks,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failures": self.failures,
+                "chunks_per_sec": self.chunks / self.seconds if self.seconds else 0.0,
+                "last_chunks_per_sec": self.last_rate,
+            }
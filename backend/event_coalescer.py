@@ -0,0 +1,162 @@
+import os
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional
+
+from answer_cache import source_key
+
+# ----------------- CONFIGURATION -----------------
+
+WATCHER_SETTLE_SECONDS = float(os.getenv("WATCHER_SETTLE_SECONDS", "2.0"))
+WATCHER_MAX_PENDING = int(os.getenv("WATCHER_MAX_PENDING", "1000"))
+
+
+def _file_state(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class EventCoalescer:
+    """Regroupe les événements du watcher par fichier avant de lancer un traitement.
+
+        Chaque chemin a au plus un traitement en attente, associé à un minuteur
+        relancé à chaque nouvel événement. À l'expiration, si la taille ou la date
+        de modification ont encore changé (copie en cours), le minuteur est
+        relancé ; sinon le fichier est transmis une seule fois à `on_settled`.
+
+        Le nombre de chemins suivis est borné : au-delà de `max_pending`, le
+        thread du watcher attend qu'un chemin soit transmis.
+
+        Attributes:
+            settle_seconds (float): Délai sans événement avant traitement
+            max_pending (int): Nombre maximal de chemins suivis
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, on_settled: Callable[[str], Awaitable[None]],
+                 settle_seconds: float = WATCHER_SETTLE_SECONDS, max_pending: int = WATCHER_MAX_PENDING):
+        """Initialise le regroupement.
+
+            Args:
+                loop (asyncio.AbstractEventLoop): Boucle d'événements portant les minuteurs
+                on_settled (Callable[[str], Awaitable[None]]): Coroutine appelée pour un fichier stabilisé
+                settle_seconds (float): Délai sans événement avant traitement
+                max_pending (int): Nombre maximal de chemins suivis
+        """
+        self.loop = loop
+        self.on_settled = on_settled
+        self.settle_seconds = settle_seconds
+        self.max_pending = max_pending
+        self.events = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.dispatched = 0
+        self._entries = {}
+        self._keys = set()
+        self._cond = threading.Condition()
+
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def touch(self, path: str):
+        """Signale un événement (création, modification, arrivée par déplacement) sur un fichier.
+
+            Args:
+                path (str): Chemin du fichier
+        """
+        key = source_key(path)
+        with self._cond:
+            if not self._in_loop():
+                while key not in self._keys and len(self._keys) >= self.max_pending:
+                    self._cond.wait()
+            self._keys.add(key)
+            self.events += 1
+        self.loop.call_soon_threadsafe(self._schedule, key, path)
+
+    def cancel(self, path: str):
+        """Abandonne le traitement en attente d'un fichier (supprimé ou déplacé).
+
+            Args:
+                path (str): Chemin du fichier
+        """
+        self.loop.call_soon_threadsafe(self._cancel, [source_key(path)])
+
+    def cancel_prefix(self, prefix: str):
+        """Abandonne les traitements en attente de tous les fichiers d'un dossier.
+
+            Args:
+                prefix (str): Chemin du dossier
+        """
+        start = source_key(prefix).rstrip(os.sep) + os.sep
+        with self._cond:
+            keys = [key for key in self._keys if key.startswith(start)]
+        self.loop.call_soon_threadsafe(self._cancel, keys)
+
+    def _release(self, key: str):
+        with self._cond:
+            if key not in self._entries:
+                self._keys.discard(key)
+                self._cond.notify_all()
+
+    def _schedule(self, key: str, path: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["timer"].cancel()
+            self.coalesced += 1
+        self._entries[key] = {
+            "path": path,
+            "state": _file_state(path),
+            "timer": self.loop.call_later(self.settle_seconds, self._fire, key),
+        }
+
+    def _cancel(self, keys: list):
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                entry["timer"].cancel()
+                self.cancelled += 1
+            self._release(key)
+
+    def _fire(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        state = _file_state(entry["path"])
+        if state is not None and state != entry["state"]:
+            entry["state"] = state
+            entry["timer"] = self.loop.call_later(self.settle_seconds, self._fire, key)
+            return
+
+        del self._entries[key]
+        if state is None:
+            self._release(key)
+            return
+        self.loop.create_task(self._dispatch(key, entry["path"]))
+
+    async def _dispatch(self, key: str, path: str):
+        try:
+            await self.on_settled(path)
+            self.dispatched += 1
+        finally:
+            self._release(key)
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du regroupement.
+
+            Returns:
+                dict: Chemins en attente de stabilisation, événements reçus, regroupés, annulés et transmis
+        """
+        return {
+            "settle_seconds": self.settle_seconds,
+            "max_pending": self.max_pending,
+            "settling": len(self._entries),
+            "tracked": len(self._keys),
+            "events": self.events,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "dispatched": self.dispatched,
+        }
@@ -1,8 +1,14 @@
+import os
 import unicodedata
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
 import pdfplumber
 from pdf2image import convert_from_path
 import pytesseract
+from hashing import file_sha256
+from page_text_cache import page_text_cache
 
 DEFAULT_PREAMBLE_KEYWORDS = [
     "préambule", "preambule",
@@ -10,6 +16,15 @@ DEFAULT_PREAMBLE_KEYWORDS = [
     "objectifs"
 ]
 
+OCR_DPI = 300
+OCR_LANG = "fra"
+OCR_CONFIG = "--psm 3"
+OCR_MAX_PAGES = 20
+PREAMBLE_SEARCH_PAGES = 20
+OCR_PARALLELISM = int(os.getenv("OCR_PARALLELISM", "2"))
+PDFPLUMBER_EXTRACTOR = "pdfplumber"
+OCR_EXTRACTOR = f"tesseract:{OCR_LANG}:{OCR_DPI}:{OCR_CONFIG}"
+
 def strip_last_lines(text: str, n: int = 1) -> str:
     """Supprime les n dernières lignes non vides d'un texte.
 
@@ -168,13 +183,75 @@ def extract_after_preamble(text: str, keywords=None) -> str:
 
     return strip_last_lines(extracted, 1)
 
-def detect_preamble_page(filepath: str, max_search_pages: int = 10, keywords=None) -> int:
+def _pdfplumber_page_text(filepath: str, page: int) -> str:
+    with pdfplumber.open(filepath) as pdf:
+        return pdf.pages[page].extract_text() or ""
+
+def iter_pdfplumber_pages(filepath: str, max_pages: int, content_hash: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """Produit le texte pdfplumber des premières pages d'un PDF, en passant par le cache.
+
+        Le PDF n'est ouvert qu'au premier défaut de cache.
+
+        Args:
+            filepath (str): Chemin vers le fichier PDF
+            max_pages (int): Nombre max de pages à lire
+            content_hash (Optional[str]): Empreinte du fichier (None désactive le cache)
+
+        Yields:
+            Tuple[int, str]: (numéro de page 0-based, texte de la page)
+    """
+    pdf = None
+    try:
+        count = None
+        if content_hash is not None:
+            count = page_text_cache.get_page_count(content_hash, PDFPLUMBER_EXTRACTOR)
+        if count is None:
+            pdf = pdfplumber.open(filepath)
+            count = len(pdf.pages)
+            if content_hash is not None:
+                page_text_cache.put_page_count(content_hash, PDFPLUMBER_EXTRACTOR, count)
+
+        for i in range(min(count, max_pages)):
+            def extract():
+                nonlocal pdf
+                if pdf is None:
+                    pdf = pdfplumber.open(filepath)
+                return pdf.pages[i].extract_text() or ""
+            yield i, page_text_cache.get_or_extract(content_hash, i, PDFPLUMBER_EXTRACTOR, extract)
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+def find_preamble_page(pages: Iterable[Tuple[int, str]], keywords=None) -> int:
+    """Retourne la première page (hors sommaire) contenant un mot-clé de préambule.
+
+        Args:
+            pages (Iterable[Tuple[int, str]]): Paires (numéro de page 0-based, texte)
+            keywords (list, optional): Mots-clés à rechercher. Defaults to DEFAULT_PREAMBLE_KEYWORDS.
+
+        Returns:
+            int: Numéro de page (0-based) ou -1 si non trouvé
+    """
+    if keywords is None:
+        keywords = DEFAULT_PREAMBLE_KEYWORDS
+    escaped = [re.escape(normalize_text(k)) for k in keywords]
+    pattern = re.compile(r"\b(" + "|".join(escaped) + r")\b")
+    for i, text in pages:
+        if not text or is_toc_page(text):
+            continue
+        if pattern.search(normalize_text(text)):
+            return i
+    return -1
+
+def detect_preamble_page(filepath: str, max_search_pages: int = 10, keywords=None,
+                         content_hash: Optional[str] = None) -> int:
     """Détecte la page contenant le préambule dans un PDF.
 
         Args:
             filepath (str): Chemin vers le fichier PDF
             max_search_pages (int, optional): Nombre max de pages à analyser. Defaults to 10.
             keywords (list, optional): Mots-clés à rechercher. Defaults to DEFAULT_PREAMBLE_KEYWORDS.
+            content_hash (str, optional): Empreinte du fichier, pour lire le texte des pages depuis le cache.
 
         Returns:
             int: Numéro de page (0-based) ou -1 si non trouvé
@@ -182,91 +259,158 @@ def detect_preamble_page(filepath: str, max_search_pages: int = 10, keywords=Non
         Note:
             Utilise d'abord pdfplumber, puis une méthode OCR de secours si nécessaire
     """
-    if keywords is None:
-        keywords = DEFAULT_PREAMBLE_KEYWORDS
     try:
-        with pdfplumber.open(filepath) as pdf:
-            for i, page in enumerate(pdf.pages[:max_search_pages]):
-                text = page.extract_text()
-                if not text or is_toc_page(text):
-                    continue
-                norm_text = normalize_text(text)
-                escaped = [re.escape(normalize_text(k)) for k in keywords]
-                pattern = re.compile(r"\b(" + "|".join(escaped) + r")\b")
-                if pattern.search(norm_text):
-                    return i
+        return find_preamble_page(iter_pdfplumber_pages(filepath, max_search_pages, content_hash), keywords)
     except Exception:
-        pass
-    return -1
+        return -1
 
-def extract_metadata_from_pdf(filepath: str, nlp_model, llama_model) -> dict:
-    """Extrait les métadonnées d'un document PDF en combinant plusieurs techniques.
+def ocr_page(filepath: str, page_number: int, content_hash: Optional[str] = None) -> Optional[str]:
+    """Rastérise une seule page d'un PDF et en extrait le texte par OCR (ou le lit depuis le cache).
+
+        Args:
+            filepath (str): Chemin vers le fichier PDF
+            page_number (int): Numéro de page (1-based)
+            content_hash (Optional[str]): Empreinte du fichier (None désactive le cache)
+
+        Returns:
+            Optional[str]: Texte OCR de la page, ou None si la page n'existe pas
+    """
+    return page_text_cache.get_or_extract(
+        content_hash, page_number - 1, OCR_EXTRACTOR, lambda: _rasterize_and_ocr(filepath, page_number)
+    )
+
+def _rasterize_and_ocr(filepath: str, page_number: int) -> Optional[str]:
+    images = convert_from_path(filepath, dpi=OCR_DPI, first_page=page_number, last_page=page_number)
+    if not images:
+        return None
+    img = images[0]
+    try:
+        return pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG) or ""
+    finally:
+        img.close()
+
+def iter_ocr_pages(filepath: str, max_pages: int = OCR_MAX_PAGES, parallelism: int = OCR_PARALLELISM,
+                   content_hash: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """Produit le texte OCR des premières pages d'un PDF, page par page et dans l'ordre.
+
+        Au plus `parallelism` pages sont rastérisées et traitées en même temps
+        (pdftoppm et tesseract sont des processus externes, un pool de threads
+        suffit à les paralléliser) : la mémoire reste bornée à quelques pages.
+        Si l'appelant s'arrête (ex: mot-clé trouvé), les pages non commencées
+        sont abandonnées.
+
+        Args:
+            filepath (str): Chemin vers le fichier PDF
+            max_pages (int, optional): Nombre max de pages à analyser. Defaults to OCR_MAX_PAGES.
+            parallelism (int, optional): Pages traitées simultanément. Defaults to OCR_PARALLELISM.
+            content_hash (str, optional): Empreinte du fichier, pour lire le texte OCR depuis le cache.
+
+        Yields:
+            Tuple[int, str]: (numéro de page 0-based, texte OCR)
+    """
+    parallelism = max(1, parallelism)
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        pending = deque()
+        next_page = 1
+        try:
+            while True:
+                while len(pending) < parallelism and next_page <= max_pages:
+                    pending.append((next_page - 1, pool.submit(ocr_page, filepath, next_page, content_hash)))
+                    next_page += 1
+                if not pending:
+                    return
+                index, future = pending.popleft()
+                text = future.result()
+                if text is None:
+                    return
+                yield index, text
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+def prepare_metadata_extraction(filepath: str, nlp_model, content_hash: Optional[str] = None,
+                                pages: Optional[List[str]] = None) -> Tuple[dict, str]:
+    """Prépare l'extraction des métadonnées d'un PDF : préambule, entités nommées et prompt LLM.
+
+        Partie rapide de l'extraction, exécutée pendant l'analyse du document ;
+        l'appel au LLM (lent) est fait à part, une fois les chunks indexés.
 
         Args:
             filepath (str): Chemin vers le fichier PDF
             nlp_model: Modèle NLP pour l'extraction d'entités (ex: spaCy)
-            llama_model: Modèle LLM pour l'analyse sémantique
+            content_hash (str, optional): Empreinte du fichier (calculée si absente), clé du cache de texte des pages
+            pages (List[str], optional): Texte déjà extrait des PREAMBLE_SEARCH_PAGES premières pages ;
+                le PDF n'est alors pas rouvert
 
         Returns:
-            dict: Dictionnaire des métadonnées extraites
+            Tuple[dict, str]: Métadonnées issues des entités nommées, prompt à soumettre au LLM
 
         Note:
             Combine:
-            - Extraction directe du texte (pdfplumber)
+            - Extraction directe du texte (document déjà analysé, sinon pdfplumber)
             - OCR de secours (pytesseract)
             - Analyse NLP des entités nommées
-            - Analyse sémantique avec LLM
     """
-    try:
-        preamble_page = detect_preamble_page(filepath, max_search_pages=20)
-        source = "pdfplumber"
-
-        if preamble_page == -1:
-            keywords = DEFAULT_PREAMBLE_KEYWORDS
-            try:
-                images = convert_from_path(filepath, dpi=300, first_page=1, last_page=20)
-                for i, img in enumerate(images):
-                    ocr_text_candidate = pytesseract.image_to_string(img, lang="fra", config="--psm 3") or ""
-                    if is_toc_page(ocr_text_candidate):
-                        continue
-                    norm = normalize_text(ocr_text_candidate)
-                    found = any(re.search(r"\b" + re.escape(normalize_text(kw)) + r"\b", norm) for kw in keywords)
-                    if found:
-                        preamble_page = i
-                        source = "ocr"
-                        break
-            except Exception:
-                pass
-
-        if preamble_page == -1:
-            preamble_page = 0
-            source = "ocr_fallback"
-
-        if source == "pdfplumber":
-            with pdfplumber.open(filepath) as pdf:
-                page_text = pdf.pages[preamble_page].extract_text() or ""
-            extracted_text = extract_after_preamble(page_text)
-        else:
-            img = convert_from_path(filepath, dpi=300, first_page=preamble_page+1, last_page=preamble_page+1)[0]
-            ocr_text = pytesseract.image_to_string(img, lang="fra", config="--psm 3") or ""
-            extracted_text = extract_after_preamble(ocr_text)
-
-        doc = nlp_model(extracted_text)
-        label_map = {
-            "LABEL_ORG": "societe",
-            "LABEL_MARCHE": "marche",
-            "LABEL_LOC": "region",
-            "LABEL_VERSION": "version"
-        }
-
-        collected = {}
-        for ent in doc.ents:
-            human_label = label_map.get(ent.label_)
-            if human_label and human_label not in collected:
-                collected[human_label] = ent.text.strip()
-
-        if source in ("pdfplumber", "ocr"):
-            prompt_text = f"""
+    if content_hash is None:
+        content_hash = file_sha256(filepath)
+    if pages is not None:
+        preamble_page = find_preamble_page(enumerate(pages[:PREAMBLE_SEARCH_PAGES]))
+    else:
+        preamble_page = detect_preamble_page(
+            filepath, max_search_pages=PREAMBLE_SEARCH_PAGES, content_hash=content_hash
+        )
+    source = "text"
+
+    ocr_texts = {}
+    if preamble_page == -1:
+        escaped = [re.escape(normalize_text(kw)) for kw in DEFAULT_PREAMBLE_KEYWORDS]
+        pattern = re.compile(r"\b(" + "|".join(escaped) + r")\b")
+        try:
+            for i, ocr_text_candidate in iter_ocr_pages(filepath, max_pages=OCR_MAX_PAGES, content_hash=content_hash):
+                ocr_texts[i] = ocr_text_candidate
+                if is_toc_page(ocr_text_candidate):
+                    continue
+                if pattern.search(normalize_text(ocr_text_candidate)):
+                    preamble_page = i
+                    source = "ocr"
+                    break
+        except Exception:
+            pass
+
+    if preamble_page == -1:
+        preamble_page = 0
+        source = "ocr_fallback"
+
+    if source == "text" and pages is not None:
+        extracted_text = extract_after_preamble(pages[preamble_page])
+    elif source == "text":
+        page_text = page_text_cache.get_or_extract(
+            content_hash, preamble_page, PDFPLUMBER_EXTRACTOR,
+            lambda: _pdfplumber_page_text(filepath, preamble_page)
+        ) or ""
+        extracted_text = extract_after_preamble(page_text)
+    else:
+        ocr_text = ocr_texts.get(preamble_page)
+        if ocr_text is None:
+            ocr_text = ocr_page(filepath, preamble_page + 1, content_hash) or ""
+        extracted_text = extract_after_preamble(ocr_text)
+
+    doc = nlp_model(extracted_text)
+    label_map = {
+        "LABEL_ORG": "societe",
+        "LABEL_MARCHE": "marche",
+        "LABEL_LOC": "region",
+        "LABEL_VERSION": "version"
+    }
+
+    collected = {}
+    for ent in doc.ents:
+        human_label = label_map.get(ent.label_)
+        if human_label and human_label not in collected:
+            collected[human_label] = ent.text.strip()
+
+    if source in ("text", "ocr"):
+        prompt_text = f"""
             Tu es un assistant intelligent chargé d'analyser un document administratif, technique ou institutionnel, même si le texte contient du bruit, des répétitions ou des incohérences.
 
             Voici le contenu du document :
@@ -287,9 +431,9 @@ def extract_metadata_from_pdf(filepath: str, nlp_model, llama_model) -> dict:
             objet : ...
             mission : ...
             nature : ...
-            """
-        else:
-            prompt_text = f"""
+        """
+    else:
+        prompt_text = f"""
             Tu es un assistant intelligent chargé d'analyser un document administratif, technique ou institutionnel, même si le texte contient du bruit, des erreurs OCR ou des répétitions.
 
             Voici le contenu du document :
@@ -312,14 +456,48 @@ def extract_metadata_from_pdf(filepath: str, nlp_model, llama_model) -> dict:
             mission : ...
             nature du document : ...
             région : ...
-            """
+        """
 
-        result = llama_model.invoke(prompt_text)
-        for line in result.strip().splitlines():
-            if ":" in line:
-                key, value = line.split(":", 1)
-                collected[key.strip().lower()] = value.strip()
+    return collected, prompt_text
 
+def parse_llm_metadata(result: str) -> dict:
+    """Convertit la réponse du LLM (lignes `clé : valeur`) en métadonnées.
+
+        Args:
+            result (str): Réponse du LLM
+
+        Returns:
+            dict: Métadonnées extraites (clés en minuscules)
+    """
+    collected = {}
+    for line in result.strip().splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            collected[key.strip().lower()] = value.strip()
+    return collected
+
+def extract_metadata_from_pdf(filepath: str, nlp_model, llama_model, content_hash: Optional[str] = None,
+                              pages: Optional[List[str]] = None) -> dict:
+    """Extrait les métadonnées d'un document PDF en combinant plusieurs techniques.
+
+        Args:
+            filepath (str): Chemin vers le fichier PDF
+            nlp_model: Modèle NLP pour l'extraction d'entités (ex: spaCy)
+            llama_model: Modèle LLM pour l'analyse sémantique
+            content_hash (str, optional): Empreinte du fichier (calculée si absente), clé du cache de texte des pages
+            pages (List[str], optional): Texte déjà extrait des PREAMBLE_SEARCH_PAGES premières pages ;
+                le PDF n'est alors pas rouvert
+
+        Returns:
+            dict: Dictionnaire des métadonnées extraites
+
+        Note:
+            Combine `prepare_metadata_extraction` (texte, OCR, entités nommées) et
+            l'analyse sémantique avec LLM, de façon synchrone.
+    """
+    try:
+        collected, prompt_text = prepare_metadata_extraction(filepath, nlp_model, content_hash, pages)
+        collected.update(parse_llm_metadata(llama_model.invoke(prompt_text)))
         return collected
     except Exception as e:
         print(f"[MetadataExtractor] Erreur : {e}")
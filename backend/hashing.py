@@ -0,0 +1,49 @@
+import hashlib
+
+# ----------------- CONFIGURATION -----------------
+
+CONTENT_HASH_KEY = "content_hash"
+FILE_HASH_KEY = "file_hash"
+FILE_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def text_sha256(text: str) -> str:
+    """Calcule l'empreinte SHA-256 d'un texte.
+
+        Args:
+            text (str): Texte à hacher
+
+        Returns:
+            str: Empreinte hexadécimale
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def annotate_content_hashes(chunks):
+    """Enregistre l'empreinte du contenu de chaque chunk dans ses métadonnées.
+
+        Args:
+            chunks: Chunks LangChain à annoter
+
+        Returns:
+            list: Chunks avec la clé `content_hash` renseignée
+    """
+    for chunk in chunks:
+        chunk.metadata[CONTENT_HASH_KEY] = text_sha256(chunk.page_content)
+    return chunks
+
+
+def file_sha256(path: str) -> str:
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier, lu par blocs.
+
+        Args:
+            path (str): Chemin du fichier
+
+        Returns:
+            str: Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(FILE_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,272 @@
+import os
+import time
+import heapq
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from answer_cache import source_key
+
+# ----------------- CONFIGURATION -----------------
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_PARSE_PROCESSES = int(os.getenv("INGESTION_PARSE_PROCESSES", "2"))
+INGESTION_MAX_PENDING = int(os.getenv("INGESTION_MAX_PENDING", "1000"))
+PRIORITY_HINT_TTL = 300.0
+
+PRIORITY_UPLOAD = 0
+PRIORITY_WATCH = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_UPLOAD: "upload", PRIORITY_WATCH: "watch", PRIORITY_BULK: "bulk"}
+
+
+class IngestionQueue:
+    """File d'ingestion des fichiers, dédupliquée par chemin, bornée et priorisée.
+
+        - Un chemin n'est présent qu'une fois : un nouvel événement sur un fichier
+          en attente ne fait que relever sa priorité ; un événement sur un fichier
+          en cours de traitement le replanifie une fois le traitement terminé.
+        - Au-delà de `max_pending` fichiers en attente, `put` attend qu'une place
+          se libère : le thread du watcher est ralenti au lieu de saturer la mémoire.
+        - Les fichiers sont servis par priorité (upload unitaire, événement du
+          watcher, import de dossier) puis par ordre d'arrivée.
+        - L'analyse (parsing, OCR, NER) passe par un pool de processus, hors de la
+          boucle d'événements de l'API.
+
+        Attributes:
+            workers (int): Nombre de fichiers traités simultanément
+            parse_processes (int): Nombre de processus d'analyse
+            max_pending (int): Nombre maximal de fichiers en attente
+    """
+    def __init__(self, workers: int = INGESTION_WORKERS, parse_processes: int = INGESTION_PARSE_PROCESSES,
+                 max_pending: int = INGESTION_MAX_PENDING):
+        """Initialise la file (les workers sont lancés par `start`).
+
+            Args:
+                workers (int): Nombre de fichiers traités simultanément
+                parse_processes (int): Nombre de processus d'analyse
+                max_pending (int): Nombre maximal de fichiers en attente
+        """
+        self.workers = workers
+        self.parse_processes = parse_processes
+        self.max_pending = max_pending
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_lag = 0.0
+        self.total_duration = 0.0
+        self._heap = []
+        self._pending = {}
+        self._running = {}
+        self._requeue = {}
+        self._hints = OrderedDict()
+        self._seq = 0
+        self._loop = None
+        self._cond = None
+        self._tasks = []
+        self._handler = None
+        self._process_pool = None
+
+    def start(self, handler: Callable[[str], Awaitable[None]]):
+        """Lance les workers sur la boucle d'événements courante.
+
+            Args:
+                handler (Callable[[str], Awaitable[None]]): Coroutine de traitement d'un fichier
+        """
+        self._loop = asyncio.get_running_loop()
+        self._cond = asyncio.Condition()
+        self._handler = handler
+        self._process_pool = ProcessPoolExecutor(
+            max_workers=self.parse_processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"[Ingestion] {self.workers} worker(s), {self.parse_processes} processus d'analyse démarrés")
+
+    async def stop(self):
+        """Arrête les workers et le pool de processus."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    async def run_in_process(self, func, *args):
+        """Exécute une fonction d'analyse dans le pool de processus.
+
+            Args:
+                func: Fonction importable (sérialisable) à exécuter
+                *args: Arguments de la fonction
+
+            Returns:
+                Any: Résultat de la fonction
+        """
+        return await self._loop.run_in_executor(self._process_pool, func, *args)
+
+    def hint(self, path: str, priority: int):
+        """Indique la priorité du prochain événement qui concernera un fichier.
+
+            Appelé par les endpoints d'upload avant d'écrire le fichier, pour que
+            l'événement du watcher qui suivra soit classé comme upload unitaire ou
+            comme import de dossier.
+
+            Args:
+                path (str): Chemin du fichier
+                priority (int): Priorité (PRIORITY_UPLOAD, PRIORITY_WATCH, PRIORITY_BULK)
+        """
+        now = time.monotonic()
+        # Durée de vie fixe : l'ordre d'insertion est celui d'expiration, seules les
+        # indications en tête peuvent avoir expiré.
+        while self._hints and next(iter(self._hints.values()))[1] <= now:
+            self._hints.popitem(last=False)
+        key = source_key(path)
+        self._hints[key] = (priority, now + PRIORITY_HINT_TTL)
+        self._hints.move_to_end(key)
+
+    def _priority(self, key: str, priority: Optional[int]) -> int:
+        hinted = self._hints.pop(key, None)
+        if priority is not None:
+            return priority
+        if hinted and hinted[1] > time.monotonic():
+            return hinted[0]
+        return PRIORITY_WATCH
+
+    async def put(self, path: str, priority: Optional[int] = None):
+        """Ajoute un fichier à la file (depuis la boucle d'événements).
+
+            Args:
+                path (str): Chemin du fichier
+                priority (Optional[int]): Priorité, sinon celle indiquée par `hint` ou PRIORITY_WATCH
+        """
+        key = source_key(path)
+        priority = self._priority(key, priority)
+        async with self._cond:
+            while True:
+                if key in self._running:
+                    previous = self._requeue.get(key)
+                    self._requeue[key] = (path, min(priority, previous[1]) if previous else priority)
+                    self.deduplicated += 1
+                    return
+                if key in self._pending:
+                    _, current, enqueued_at, _ = self._pending[key]
+                    self.deduplicated += 1
+                    if priority < current:
+                        self._push(key, path, priority, enqueued_at)
+                    return
+                if len(self._pending) < self.max_pending:
+                    break
+                await self._cond.wait()
+
+            self.enqueued += 1
+            self._push(key, path, priority, time.monotonic())
+
+    def _push(self, key: str, path: str, priority: int, enqueued_at: float):
+        self._seq += 1
+        self._pending[key] = (path, priority, enqueued_at, self._seq)
+        heapq.heappush(self._heap, (priority, self._seq, key))
+        self._cond.notify_all()
+
+    def submit(self, path: str, priority: Optional[int] = None):
+        """Ajoute un fichier à la file depuis un autre thread (ex: le watcher).
+
+            Bloque le thread appelant tant que la file est pleine.
+
+            Args:
+                path (str): Chemin du fichier
+                priority (Optional[int]): Priorité du fichier
+        """
+        if self._loop is None:
+            raise RuntimeError("La file d'ingestion n'est pas démarrée")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.create_task(self.put(path, priority))
+            return
+        asyncio.run_coroutine_threadsafe(self.put(path, priority), self._loop).result()
+
+    async def _next(self) -> tuple:
+        async with self._cond:
+            while True:
+                while self._heap:
+                    priority, seq, key = heapq.heappop(self._heap)
+                    entry = self._pending.get(key)
+                    if entry is None or entry[3] != seq:
+                        continue
+                    del self._pending[key]
+                    self._running[key] = entry
+                    self._cond.notify_all()
+                    return key, entry
+                await self._cond.wait()
+
+    async def _worker(self):
+        while True:
+            key, (path, priority, enqueued_at, _) = await self._next()
+            started = time.monotonic()
+            self.total_lag += started - enqueued_at
+            try:
+                await self._handler(path)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[Ingestion] Erreur traitement {path} : {e}")
+            finally:
+                self.total_duration += time.monotonic() - started
+                async with self._cond:
+                    del self._running[key]
+                    requeue = self._requeue.pop(key, None)
+                    if requeue:
+                        self._push(key, requeue[0], requeue[1], time.monotonic())
+
+    def status(self, path: str) -> Optional[str]:
+        """Retourne l'état d'un fichier dans la file.
+
+            Args:
+                path (str): Chemin du fichier
+
+            Returns:
+                Optional[str]: "queued", "processing" ou None
+        """
+        key = source_key(path)
+        if key in self._running:
+            return "processing"
+        if key in self._pending:
+            return "queued"
+        return None
+
+    def stats(self) -> dict:
+        """Retourne la profondeur de la file, le retard et les compteurs.
+
+            Returns:
+                dict: Fichiers en attente (par priorité), en cours, retard du plus ancien, moyennes
+        """
+        now = time.monotonic()
+        by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+        for _, priority, _, _ in self._pending.values():
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            by_priority[name] = by_priority.get(name, 0) + 1
+        oldest = min((enqueued_at for _, _, enqueued_at, _ in self._pending.values()), default=None)
+        started = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "parse_processes": self.parse_processes,
+            "max_pending": self.max_pending,
+            "depth": len(self._pending),
+            "depth_by_priority": by_priority,
+            "processing": [entry[0] for entry in self._running.values()],
+            "oldest_pending_seconds": now - oldest if oldest is not None else 0.0,
+            "enqueued": self.enqueued,
+            "deduplicated": self.deduplicated,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_lag_seconds": self.total_lag / started if started else 0.0,
+            "avg_duration_seconds": self.total_duration / started if started else 0.0,
+        }
+
+
+ingestion_queue = IngestionQueue()
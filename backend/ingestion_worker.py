@@ -0,0 +1,251 @@
+import os
+import json
+import tempfile
+from typing import Iterable, Iterator, Optional, Tuple
+from langchain_community.document_loaders import (
+    UnstructuredWordDocumentLoader,
+    UnstructuredExcelLoader,
+    UnstructuredPowerPointLoader,
+)
+from langchain_core.documents import Document
+from extractors import prepare_metadata_extraction
+from token_splitter import TokenTextSplitter
+from hashing import file_sha256
+from parsed_document import parse_pdf
+
+# Fonctions exécutées dans les processus d'analyse de l'ingestion : ce module ne
+# doit pas ouvrir Chroma ni les index, seulement les modèles d'analyse.
+
+# ----------------- CONFIGURATION -----------------
+
+NER_MODEL_PATH = "./modele_ner_doc"
+INGEST_SPOOL_DIR = "ingest_spool"
+CHUNK_TOKENS = 160
+CHUNK_OVERLAP_TOKENS = 16
+
+_nlp_model = None
+
+# ----------------- UTILITAIRES -----------------
+
+def load_documents_by_extension(file_path: str, content_hash: Optional[str] = None) -> list[Document]:
+    """Charge un document en fonction de son extension.
+
+        Args:
+            file_path (str): Chemin vers le fichier à charger
+            content_hash (Optional[str]): Empreinte du fichier, clé du cache de texte des pages PDF
+
+        Returns:
+            list[Document]: Liste des documents chargés
+
+        Raises:
+            Exception: Si le format de fichier n'est pas supporté
+
+        Supported Formats:
+            - PDF (.pdf)
+            - Word (.docx)
+            - Excel (.xls, .xlsx)
+            - PowerPoint (.pptx)
+    """
+    ext = os.path.splitext(file_path)[-1].lower()
+    if ext == ".pdf":
+        return parse_pdf(file_path, content_hash).to_documents()
+    elif ext == ".docx":
+        return UnstructuredWordDocumentLoader(file_path).load()
+    elif ext in [".xls", ".xlsx"]:
+        return UnstructuredExcelLoader(file_path).load()
+    elif ext == ".pptx":
+        return UnstructuredPowerPointLoader(file_path).load()
+    else:
+        raise Exception(f"Format de fichier non supporté : {ext}")
+
+def iter_chunk_ids(chunks: Iterable[Document]) -> Iterator[Document]:
+    """Calcule au fil de l'eau des IDs uniques pour chaque chunk basés sur la source et la page.
+
+        Args:
+            chunks (Iterable[Document]): Chunks à traiter, dans l'ordre du document
+
+        Yields:
+            Document: Chunk avec son ID dans les métadonnées
+
+        Example:
+            Un ID généré aura le format: "chemin/vers/fichier.pdf:3:1"
+            (source:page:chunk_index)
+    """
+    last_page_id = None
+    current_chunk_index = 0
+
+    for chunk in chunks:
+        source = chunk.metadata.get("source")
+        page = chunk.metadata.get("page")
+        current_page_id = f"{source}:{page}"
+
+        if current_page_id == last_page_id:
+            current_chunk_index += 1
+        else:
+            current_chunk_index = 0
+
+        chunk.metadata["id"] = f"{current_page_id}:{current_chunk_index}"
+        last_page_id = current_page_id
+        yield chunk
+
+def calculate_chunk_ids(chunks: list[Document]) -> list[Document]:
+    """Calcule des IDs uniques pour chaque chunk basés sur la source et la page.
+
+        Args:
+            chunks (list[Document]): Liste de chunks à traiter
+
+        Returns:
+            list[Document]: Chunks avec leurs métadonnées ID mises à jour
+
+        Example:
+            Un ID généré aura le format: "chemin/vers/fichier.pdf:3:1"
+            (source:page:chunk_index)
+    """
+    return list(iter_chunk_ids(chunks))
+
+def iter_chunks(documents: Iterable[Document], splitter) -> Iterator[Document]:
+    """Découpe les pages une à une : seuls les chunks de la page courante sont en mémoire.
+
+        Produit les mêmes chunks et IDs que `split_documents` sur la liste complète.
+
+        Args:
+            documents (Iterable[Document]): Pages du document
+            splitter (TokenTextSplitter): Découpeur (renseigne le nombre de tokens de chaque chunk)
+
+        Yields:
+            Document: Chunk avec son ID et son nombre de tokens
+    """
+    def split():
+        for document in documents:
+            yield from splitter.split_documents([document])
+    return iter_chunk_ids(split())
+
+def iter_windows(items: Iterable, size: int) -> Iterator[list]:
+    """Regroupe les éléments d'un itérable en fenêtres de taille fixe.
+
+        Args:
+            items (Iterable): Éléments à regrouper
+            size (int): Taille des fenêtres
+
+        Yields:
+            list: Fenêtre d'au plus `size` éléments
+    """
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+def write_chunk_spool(chunks: Iterable[Document], spool_dir: str = INGEST_SPOOL_DIR) -> Tuple[str, int]:
+    """Écrit des chunks dans un fichier temporaire (une ligne JSON par chunk).
+
+        Permet au processus d'analyse de transmettre les chunks au processus
+        principal sans les matérialiser tous en mémoire d'un côté ni de l'autre.
+
+        Args:
+            chunks (Iterable[Document]): Chunks à écrire
+            spool_dir (str): Dossier des fichiers temporaires (hors du dossier surveillé)
+
+        Returns:
+            Tuple[str, int]: Chemin du fichier et nombre de chunks écrits
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=spool_dir, suffix=".jsonl")
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(json.dumps({"text": chunk.page_content, "metadata": chunk.metadata}, default=str))
+                f.write("\n")
+                count += 1
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
+
+def read_chunk_spool(path: str) -> Iterator[Document]:
+    """Relit au fil de l'eau les chunks d'un fichier écrit par `write_chunk_spool`.
+
+        Args:
+            path (str): Chemin du fichier
+
+        Yields:
+            Document: Chunk
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            yield Document(page_content=entry["text"], metadata=entry["metadata"])
+
+def clear_chunk_spool(spool_dir: str = INGEST_SPOOL_DIR):
+    """Supprime les fichiers temporaires de chunks laissés par un arrêt brutal.
+
+        Args:
+            spool_dir (str): Dossier des fichiers temporaires
+    """
+    if not os.path.isdir(spool_dir):
+        return
+    for name in os.listdir(spool_dir):
+        try:
+            os.remove(os.path.join(spool_dir, name))
+        except OSError as e:
+            print(f"[Ingestion] Fichier temporaire non supprimé {name} : {e}")
+
+def get_nlp_model():
+    """Retourne le modèle NER d'extraction de métadonnées (chargé une fois par processus).
+
+        Returns:
+            Language: Modèle spaCy
+    """
+    global _nlp_model
+    if _nlp_model is None:
+        import spacy
+        _nlp_model = spacy.load(NER_MODEL_PATH)
+    return _nlp_model
+
+def parse_document(file_path: str) -> dict:
+    """Analyse un fichier : chargement, extraction des métadonnées, découpage en chunks.
+
+        Un PDF n'est lu qu'une fois : ses premières pages servent à l'extraction
+        de métadonnées, puis les suivantes sont lues au fil du découpage. Seules
+        les entités nommées sont extraites ici ; le prompt LLM est renvoyé pour
+        l'étape différée (`metadata_stage`).
+
+        Étape coûteuse en CPU (parsing, OCR, NER) exécutée dans un processus du
+        pool d'ingestion. Les chunks sont découpés page par page et écrits au
+        fil de l'eau dans un fichier temporaire, que le processus principal
+        relit par fenêtres pour l'embedding et l'écriture dans les index.
+
+        Args:
+            file_path (str): Chemin vers le fichier à analyser
+
+        Returns:
+            dict: Fichier temporaire des chunks (`spool`), nombre de chunks (`chunk_count`),
+                métadonnées extraites (`metadata`), prompt LLM des métadonnées (`llm_prompt`,
+                None hors PDF) et empreinte du fichier (`file_hash`)
+    """
+    file_hash = file_sha256(file_path)
+
+    metadata_extra, llm_prompt = {}, None
+    if file_path.lower().endswith(".pdf"):
+        parsed = parse_pdf(file_path, file_hash)
+        documents = parsed.iter_documents()
+        try:
+            metadata_extra, llm_prompt = prepare_metadata_extraction(
+                file_path, get_nlp_model(), file_hash, pages=parsed.head_pages
+            )
+        except Exception as e:
+            print(f"[MetadataExtractor] Erreur : {e}")
+    else:
+        documents = load_documents_by_extension(file_path, file_hash)
+
+    splitter = TokenTextSplitter(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+    spool, chunk_count = write_chunk_spool(iter_chunks(documents, splitter))
+
+    return {
+        "spool": spool, "chunk_count": chunk_count, "metadata": metadata_extra,
+        "llm_prompt": llm_prompt, "file_hash": file_hash,
+    }
@@ -0,0 +1,260 @@
+import re
+import math
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+from extractors import normalize_text
+from answer_cache import source_key
+
+# ----------------- CONFIGURATION -----------------
+
+LEXICAL_INDEX_FILE = "lexical_index.sqlite3"
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_DOCUMENT_FREQUENCY = 0.5
+REBUILD_PAGE_SIZE = 1000
+
+IDENTIFIER_PATTERN = re.compile(r"\w+(?:[/.-]\w+)+")
+WORD_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = {
+    "le", "la", "les", "de", "des", "du", "un", "une", "et", "en", "au", "aux",
+    "a", "l", "d", "qu", "que", "qui", "quoi", "quel", "quelle", "quels", "quelles",
+    "est", "sont", "pour", "par", "sur", "dans", "avec", "ce", "cet", "cette", "ces",
+    "il", "elle", "ils", "elles", "se", "sa", "son", "ses", "ne", "pas", "ou", "y",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte en termes pour l'index lexical.
+
+        Les identifiants composés (ex: `1235/E/DPL/2018`, `ADI-NOVEC`) sont conservés
+        entiers en plus de leurs composants afin qu'une référence exacte soit
+        fortement discriminante.
+
+        Args:
+            text (str): Texte à découper
+
+        Returns:
+            List[str]: Termes normalisés (minuscules, sans accents)
+    """
+    norm = normalize_text(text)
+    terms = IDENTIFIER_PATTERN.findall(norm)
+    for word in WORD_PATTERN.findall(norm):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 1 or word.isdigit():
+            terms.append(word)
+    return terms
+
+
+class LexicalIndex:
+    """Index inversé BM25 des chunks, maintenu par le watcher à côté de Chroma.
+
+        Les postings sont stockés dans SQLite (mode WAL) : l'index survit aux
+        redémarrages et la recherche ne lit que les postings des termes de la requête.
+        Le nombre de chunks, leur longueur totale et la fréquence documentaire de
+        chaque terme sont tenus à jour par des triggers (`lexical_stats`,
+        `term_stats`) : la recherche ne parcourt ni `chunks` ni les postings
+        complets d'un terme pour les calculer.
+
+        Attributes:
+            path (str): Chemin du fichier SQLite
+    """
+    def __init__(self, path: str = LEXICAL_INDEX_FILE):
+        """Ouvre (ou crée) l'index.
+
+            Args:
+                path (str): Chemin du fichier SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT,
+                source_key TEXT,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source_key ON chunks(source_key);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+            CREATE TABLE IF NOT EXISTS lexical_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                chunks INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS term_stats (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            INSERT OR IGNORE INTO term_stats
+                SELECT term, COUNT(*) FROM postings WHERE NOT EXISTS (SELECT 1 FROM lexical_stats) GROUP BY term;
+            INSERT OR IGNORE INTO lexical_stats
+                SELECT 0, COUNT(*), COALESCE(SUM(length), 0) FROM chunks;
+            CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+                UPDATE lexical_stats SET chunks = chunks + 1, total_length = total_length + new.length WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+                UPDATE lexical_stats SET chunks = chunks - 1, total_length = total_length - old.length WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS postings_insert AFTER INSERT ON postings BEGIN
+                INSERT INTO term_stats VALUES (new.term, 1)
+                    ON CONFLICT(term) DO UPDATE SET df = df + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS postings_delete AFTER DELETE ON postings BEGIN
+                UPDATE term_stats SET df = df - 1 WHERE term = old.term;
+                DELETE FROM term_stats WHERE term = old.term AND df <= 0;
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def _delete(self, chunk_ids: List[str]):
+        rows = [(chunk_id,) for chunk_id in chunk_ids]
+        self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", rows)
+        self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", rows)
+
+    def add_chunks(self, chunks):
+        """Indexe (ou réindexe) des chunks.
+
+            Args:
+                chunks: Documents LangChain dont les métadonnées contiennent `id` et `source`
+        """
+        chunk_rows, posting_rows = [], []
+        for chunk in chunks:
+            chunk_id = chunk.metadata.get("id")
+            if not chunk_id:
+                continue
+            source = chunk.metadata.get("source") or ""
+            terms = Counter(tokenize(chunk.page_content))
+            chunk_rows.append((chunk_id, source, source_key(source), sum(terms.values())))
+            posting_rows.extend((term, chunk_id, tf) for term, tf in terms.items())
+
+        with self._lock, self._conn:
+            self._delete([row[0] for row in chunk_rows])
+            self._conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", posting_rows)
+
+    def remove_chunks(self, chunk_ids: List[str]):
+        """Retire des chunks de l'index.
+
+            Args:
+                chunk_ids (List[str]): IDs des chunks à retirer
+        """
+        if not chunk_ids:
+            return
+        with self._lock, self._conn:
+            self._delete(chunk_ids)
+
+    def count(self) -> int:
+        """Retourne le nombre de chunks indexés.
+
+            Returns:
+                int: Nombre de chunks
+        """
+        with self._lock:
+            return self._conn.execute("SELECT chunks FROM lexical_stats WHERE id = 0").fetchone()[0]
+
+    def search(self, query: str, k: int = 10, sources=None) -> List[Tuple[str, float]]:
+        """Recherche les chunks les plus pertinents au sens BM25.
+
+            Args:
+                query (str): Requête utilisateur
+                k (int): Nombre de résultats
+                sources (list, optional): Limite la recherche à ces documents
+
+            Returns:
+                List[Tuple[str, float]]: (ID du chunk, score BM25) par score décroissant
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        allowed = sorted({source_key(s) for s in sources}) if sources else None
+        source_filter = f" AND c.source_key IN ({', '.join('?' * len(allowed))})" if allowed else ""
+
+        with self._lock:
+            n_chunks, total_length = self._conn.execute(
+                "SELECT chunks, total_length FROM lexical_stats WHERE id = 0"
+            ).fetchone()
+            if not n_chunks:
+                return []
+            avg_length = total_length / n_chunks or 1.0
+            frequencies = dict(self._conn.execute(
+                f"SELECT term, df FROM term_stats WHERE term IN ({', '.join('?' * len(terms))})", terms
+            ))
+
+            scores = Counter()
+            for term, df in frequencies.items():
+                if df / n_chunks > MAX_DOCUMENT_FREQUENCY and n_chunks > 10:
+                    continue
+                idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term = ?" + source_filter,
+                    [term] + (allowed or [])
+                )
+                for chunk_id, tf, length in rows:
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                    scores[chunk_id] += idf * norm
+
+        return scores.most_common(k)
+
+    def rebuild_from(self, db):
+        """Construit l'index à partir des chunks déjà présents dans Chroma.
+
+            Utilisé une seule fois, lorsque l'index lexical est vide alors que
+            Chroma contient des chunks indexés avant son introduction.
+
+            Args:
+                db (Chroma): Base vectorielle source
+        """
+        from langchain_core.documents import Document
+
+        offset = 0
+        total = 0
+        while True:
+            page = db.get(include=["documents", "metadatas"], limit=REBUILD_PAGE_SIZE, offset=offset)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            chunks = []
+            for chunk_id, text, metadata in zip(ids, page["documents"], page["metadatas"]):
+                metadata = dict(metadata or {})
+                metadata["id"] = chunk_id
+                chunks.append(Document(page_content=text or "", metadata=metadata))
+            self.add_chunks(chunks)
+            total += len(chunks)
+            offset += len(ids)
+        print(f"[LexicalIndex] Index reconstruit depuis Chroma : {total} chunk(s)")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fusionne plusieurs classements par Reciprocal Rank Fusion.
+
+        Args:
+            rankings (List[List[str]]): Classements d'IDs, du plus au moins pertinent
+            k (int): Constante d'amortissement du rang
+
+        Returns:
+            List[Tuple[str, float]]: (ID, score fusionné) par score décroissant
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    return scores.most_common()
+
+
+lexical_index = LexicalIndex()
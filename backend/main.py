@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from routers import upload, history, stats, explorer, trash, chat
+from routers import upload, history, stats, explorer, trash, chat, system
 from watcher import watch_uploads
+from ollama_client import ollama_client
 import asyncio
 
 app = FastAPI(
@@ -15,6 +16,7 @@ app = FastAPI(
     - Exploration de fichiers
     - Corbeille
     - Chat intégré
+    - Supervision (caches, files d'attente)
     """,
     version="1.0.0"
 )
@@ -33,8 +35,9 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 async def startup_event():
     """Initialise les tâches en arrière-plan au démarrage de l'application.
 
-    Lance le watcher de fichiers qui surveille le dossier des uploads pour détecter
-    les nouvelles modifications et déclencher les traitements associés.
+    Ouvre le client HTTP partagé vers Ollama puis lance le watcher de fichiers
+    qui surveille le dossier des uploads pour détecter les nouvelles
+    modifications et déclencher les traitements associés.
 
     Returns:
         None: Cette fonction ne retourne rien directement mais lance une tâche asynchrone.
@@ -42,11 +45,21 @@ async def startup_event():
     Note:
         La tâche créée tournera en continu jusqu'à l'arrêt de l'application.
     """
+    await ollama_client.start()
     asyncio.create_task(watch_uploads())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Libère les ressources partagées à l'arrêt de l'application.
+
+    Ferme les connexions du pool HTTP vers Ollama.
+    """
+    await ollama_client.close()
+
 app.include_router(upload.router, prefix="/upload", tags=["Upload"])
 app.include_router(history.router, prefix="/history", tags=["Historique"])
 app.include_router(stats.router, prefix="/stats", tags=["Statistiques"])
 app.include_router(explorer.router, prefix="/explorer", tags=["Explorer"])
 app.include_router(chat.router, prefix="/chat", tags=["Chat"])
 app.include_router(trash.router)
+app.include_router(system.router, prefix="/system", tags=["Système"])
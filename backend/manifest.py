@@ -0,0 +1,257 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Iterator, Optional, Tuple
+
+from answer_cache import source_key
+
+# ----------------- CONFIGURATION -----------------
+
+MANIFEST_FILE = "manifest.sqlite3"
+
+STATE_INDEXED = "indexed"
+STATE_FAILED = "failed"
+
+EXTRACTION_PENDING = "pending"
+EXTRACTION_DONE = "done"
+
+
+def is_ignored_file(filename: str) -> bool:
+    """Indique si un fichier est temporaire ou caché et ne doit pas être indexé.
+
+        Args:
+            filename (str): Nom du fichier
+
+        Returns:
+            bool: True si le fichier doit être ignoré
+    """
+    return filename.startswith(('.', '~$', '~')) or filename.endswith('.tmp')
+
+
+def scan_tree(root: str) -> Iterator[Tuple[str, int, int]]:
+    """Parcourt une arborescence avec `os.scandir`.
+
+        Args:
+            root (str): Dossier racine
+
+        Yields:
+            Tuple[str, int, int]: (chemin, taille, date de modification en ns) de chaque fichier
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not is_ignored_file(entry.name):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield entry.path, stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            print(f"[Manifest] Dossier illisible {directory} : {e}")
+
+
+class FileManifest:
+    """Manifeste persistant des fichiers indexés : taille, date de modification, empreinte, état.
+
+        Tenu à jour par l'ingestion et le watcher ; comparé au dossier d'uploads au
+        démarrage pour ne retraiter que les fichiers ajoutés, modifiés ou supprimés
+        pendant que le serveur était arrêté.
+
+        Attributes:
+            path (str): Chemin du fichier SQLite
+    """
+    def __init__(self, path: str = MANIFEST_FILE):
+        """Ouvre (ou crée) le manifeste.
+
+            Args:
+                path (str): Chemin du fichier SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path_key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                content_hash TEXT,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS metadata_extractions (
+                path_key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                prompt TEXT,
+                state TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def entries(self) -> dict:
+        """Retourne toutes les entrées du manifeste.
+
+            Returns:
+                dict: Clé normalisée -> (chemin, taille, mtime_ns, empreinte, état)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path_key, path, size, mtime_ns, content_hash, state FROM files"
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def get(self, path: str) -> Optional[tuple]:
+        """Retourne l'entrée d'un fichier.
+
+            Args:
+                path (str): Chemin du fichier
+
+            Returns:
+                Optional[tuple]: (chemin, taille, mtime_ns, empreinte, état) ou None
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, size, mtime_ns, content_hash, state FROM files WHERE path_key = ?",
+                (source_key(path),)
+            ).fetchone()
+
+    def mark(self, path: str, state: str, size: Optional[int] = None, mtime_ns: Optional[int] = None,
+             content_hash: Optional[str] = None):
+        """Enregistre l'état d'un fichier.
+
+            Args:
+                path (str): Chemin du fichier
+                state (str): État (STATE_INDEXED ou STATE_FAILED)
+                size (Optional[int]): Taille du fichier lors du traitement
+                mtime_ns (Optional[int]): Date de modification lors du traitement
+                content_hash (Optional[str]): Empreinte du contenu
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_key(path), path, size, mtime_ns, content_hash, state, time.time())
+            )
+
+    def remove(self, path: str):
+        """Retire un fichier du manifeste.
+
+            Args:
+                path (str): Chemin du fichier
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE path_key = ?", (source_key(path),))
+            self._conn.execute("DELETE FROM metadata_extractions WHERE path_key = ?", (source_key(path),))
+
+    def remove_prefix(self, prefix: str):
+        """Retire tous les fichiers d'un dossier du manifeste.
+
+            Args:
+                prefix (str): Chemin du dossier
+        """
+        start = source_key(prefix).rstrip(os.sep) + os.sep
+        with self._lock, self._conn:
+            for table in ("files", "metadata_extractions"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE path_key >= ? AND path_key < ?", (start, start + "\U0010ffff")
+                )
+
+    def count(self) -> int:
+        """Retourne le nombre de fichiers du manifeste.
+
+            Returns:
+                int: Nombre d'entrées
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def mark_extraction_pending(self, path: str, file_hash: str, prompt: str):
+        """Enregistre une extraction LLM des métadonnées à faire (reprise au redémarrage si non terminée).
+
+            Args:
+                path (str): Chemin du fichier
+                file_hash (str): Empreinte du contenu analysé
+                prompt (str): Prompt à soumettre au LLM
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata_extractions VALUES (?, ?, ?, ?, ?)",
+                (source_key(path), path, file_hash, prompt, EXTRACTION_PENDING)
+            )
+
+    def mark_extraction_done(self, path: str, file_hash: str):
+        """Enregistre que les métadonnées LLM d'un contenu ont été fusionnées.
+
+            Sans effet si une extraction pour un autre contenu a été enregistrée depuis.
+
+            Args:
+                path (str): Chemin du fichier
+                file_hash (str): Empreinte du contenu dont les métadonnées ont été fusionnées
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE metadata_extractions SET state = ?, prompt = NULL WHERE path_key = ? AND file_hash = ?",
+                (EXTRACTION_DONE, source_key(path), file_hash)
+            )
+
+    def extraction_done_hash(self, path: str) -> Optional[str]:
+        """Retourne l'empreinte du contenu dont les métadonnées LLM ont été fusionnées.
+
+            Args:
+                path (str): Chemin du fichier
+
+            Returns:
+                Optional[str]: Empreinte, ou None si aucune extraction n'est terminée
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_hash FROM metadata_extractions WHERE path_key = ? AND state = ?",
+                (source_key(path), EXTRACTION_DONE)
+            ).fetchone()
+        return row[0] if row else None
+
+    def pending_extractions(self) -> list:
+        """Retourne les extractions LLM non terminées.
+
+            Returns:
+                list: (chemin, empreinte, prompt) de chaque extraction en attente
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, file_hash, prompt FROM metadata_extractions WHERE state = ?",
+                (EXTRACTION_PENDING,)
+            ).fetchall()
+
+    def rename_extraction(self, src_path: str, dest_path: str) -> Optional[tuple]:
+        """Réaffecte l'extraction LLM d'un fichier déplacé à son nouveau chemin.
+
+            Args:
+                src_path (str): Ancien chemin du fichier
+                dest_path (str): Nouveau chemin du fichier
+
+            Returns:
+                Optional[tuple]: (empreinte, prompt, état) de l'extraction, ou None
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT file_hash, prompt, state FROM metadata_extractions WHERE path_key = ?",
+                (source_key(src_path),)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM metadata_extractions WHERE path_key = ?", (source_key(src_path),))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata_extractions VALUES (?, ?, ?, ?, ?)",
+                (source_key(dest_path), dest_path, *row)
+            )
+        return row
+
+
+manifest = FileManifest()
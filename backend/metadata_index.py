@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import threading
+
+from extractors import normalize_text
+
+# ----------------- CONFIGURATION -----------------
+
+UPLOAD_DIR = "uploads"
+METADATA_FILE = "documents_metadata.json"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize_value(value) -> list:
+    """Découpe une valeur de métadonnée normalisée en tokens.
+
+        Args:
+            value: Valeur de métadonnée
+
+        Returns:
+            list: Tokens normalisés (minuscules, sans accents)
+    """
+    return TOKEN_PATTERN.findall(normalize_text(str(value)))
+
+
+class MetadataIndex:
+    """Index inversé résident des métadonnées de documents.
+
+        Pour chaque champ (marche, region, societe, version, nature...) l'index
+        associe chaque token normalisé à l'ensemble des documents qui le portent.
+        Il est chargé une fois depuis `documents_metadata.json` puis maintenu par le
+        watcher et l'endpoint `PUT /metadata/{filename}`.
+
+        Attributes:
+            metadata_file (str): Fichier de métadonnées utilisé au premier chargement
+    """
+    def __init__(self, metadata_file: str = METADATA_FILE):
+        """Initialise l'index (chargé paresseusement).
+
+            Args:
+                metadata_file (str): Chemin du fichier de métadonnées des documents
+        """
+        self.metadata_file = metadata_file
+        self._postings = {}
+        self._values = {}
+        self._documents = {}
+        self._expansions = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.metadata_file):
+            return
+        try:
+            with open(self.metadata_file, "r", encoding="utf-8") as f:
+                all_metadata = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[MetadataIndex] Erreur de lecture des métadonnées : {e}")
+            return
+        for filename, metadata in all_metadata.items():
+            self._add(filename, metadata)
+        print(f"[MetadataIndex] Chargé : {len(self._documents)} document(s)")
+
+    def _add(self, filename: str, metadata: dict):
+        metadata = dict(metadata or {})
+        self._documents[filename] = metadata
+        values = {}
+        for field, value in metadata.items():
+            if value is None:
+                continue
+            values[field] = normalize_text(str(value))
+            postings = self._postings.setdefault(field, {})
+            for token in set(tokenize_value(value)):
+                if token not in postings:
+                    postings[token] = set()
+                    self._expansions.pop(field, None)
+                postings[token].add(filename)
+        self._values[filename] = values
+
+    def _remove(self, filename: str):
+        self._documents.pop(filename, None)
+        for field, norm in self._values.pop(filename, {}).items():
+            postings = self._postings.get(field, {})
+            for token in set(TOKEN_PATTERN.findall(norm)):
+                docs = postings.get(token)
+                if docs is None:
+                    continue
+                docs.discard(filename)
+                if not docs:
+                    del postings[token]
+                    self._expansions.pop(field, None)
+
+    def update_document(self, filename: str, metadata: dict):
+        """Ajoute ou remplace les métadonnées d'un document.
+
+            Args:
+                filename (str): Nom du fichier (clé de documents_metadata.json)
+                metadata (dict): Métadonnées du document
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._remove(filename)
+            self._add(filename, metadata)
+
+    def remove_document(self, filename: str):
+        """Retire un document de l'index.
+
+            Args:
+                filename (str): Nom du fichier
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._remove(filename)
+
+    def get(self, filename: str) -> dict:
+        """Retourne les métadonnées indexées d'un document.
+
+            Args:
+                filename (str): Nom du fichier
+
+            Returns:
+                dict: Métadonnées (vide si le document est inconnu)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._documents.get(filename, {}))
+
+    def _expand(self, field: str, token: str) -> list:
+        """Retourne les tokens du vocabulaire du champ qui contiennent `token`.
+
+            Le résultat est mémorisé et n'est invalidé que lorsque le vocabulaire
+            du champ change.
+        """
+        cache = self._expansions.setdefault(field, {})
+        expanded = cache.get(token)
+        if expanded is None:
+            expanded = [candidate for candidate in self._postings.get(field, {}) if token in candidate]
+            cache[token] = expanded
+        return expanded
+
+    def match(self, field: str, value) -> set:
+        """Retourne les documents dont le champ contient la valeur (sous-chaîne normalisée).
+
+            Seul le token le plus sélectif de la valeur est résolu via l'index ; les
+            candidats obtenus sont ensuite vérifiés par sous-chaîne. Les tokens
+            intérieurs doivent correspondre exactement, le premier et le dernier
+            peuvent être partiels.
+
+            Args:
+                field (str): Nom du champ
+                value: Valeur recherchée
+
+            Returns:
+                set: Noms de fichiers correspondants
+        """
+        norm_value = normalize_text(str(value)).strip()
+        tokens = TOKEN_PATTERN.findall(norm_value)
+        if not tokens:
+            return set()
+
+        with self._lock:
+            self._ensure_loaded()
+            postings = self._postings.get(field, {})
+
+            best_tokens, best_size = None, None
+            for i, token in enumerate(tokens):
+                if 0 < i < len(tokens) - 1:
+                    vocabulary = [token] if token in postings else []
+                else:
+                    vocabulary = self._expand(field, token)
+                size = sum(len(postings[t]) for t in vocabulary)
+                if best_size is None or size < best_size:
+                    best_tokens, best_size = vocabulary, size
+                if not size:
+                    return set()
+
+            candidates = set()
+            for token in best_tokens:
+                candidates |= postings[token]
+            if len(tokens) == 1:
+                return candidates
+            return {f for f in candidates if norm_value in self._values[f].get(field, "")}
+
+    def filter(self, criteria: dict) -> list:
+        """Filtre les documents selon des critères de métadonnées.
+
+            Un document est retenu dès qu'un des critères correspond (OU logique),
+            comme le faisait le filtrage linéaire historique.
+
+            Args:
+                criteria (dict): Champ -> valeur recherchée (les valeurs nulles sont ignorées)
+
+            Returns:
+                list: Chemins des documents correspondants (vide si aucun critère valide)
+        """
+        matched = set()
+        for field, value in criteria.items():
+            if value and str(value).lower() != 'null':
+                matched |= self.match(field, value)
+        return [os.path.join(UPLOAD_DIR, filename) for filename in matched]
+
+
+metadata_index = MetadataIndex()
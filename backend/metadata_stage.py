@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from answer_cache import source_key
+from extractors import parse_llm_metadata
+from ollama_client import PooledOllamaLLM
+
+# ----------------- CONFIGURATION -----------------
+
+METADATA_LLM_MODEL = "llama3.2:3b-instruct-q4_K_M"
+METADATA_LLM_CONCURRENCY = int(os.getenv("METADATA_LLM_CONCURRENCY", "1"))
+
+
+class MetadataStage:
+    """Étape différée d'extraction des métadonnées par LLM.
+
+        Les chunks d'un document sont indexés (et interrogeables) dès l'analyse
+        terminée, avec les métadonnées issues des entités nommées. Le prompt LLM
+        préparé pendant l'analyse est soumis ici en arrière-plan ; les champs
+        obtenus sont transmis à `handler`, qui les fusionne dans les index.
+
+        - Au plus `concurrency` appels au LLM en même temps.
+        - Une nouvelle soumission pour un fichier remplace celle en attente ;
+          un appel déjà lancé va à son terme (le thread ne peut pas être
+          interrompu) et son résultat est écarté par `handler` si le contenu a changé.
+
+        Attributes:
+            concurrency (int): Nombre maximal d'appels simultanés au LLM
+            llm (PooledOllamaLLM): LLM d'extraction
+    """
+    def __init__(self, model: str = METADATA_LLM_MODEL, concurrency: int = METADATA_LLM_CONCURRENCY):
+        """Initialise l'étape (démarrée par `start`).
+
+            Args:
+                model (str): Modèle Ollama d'extraction
+                concurrency (int): Nombre maximal d'appels simultanés au LLM
+        """
+        self.concurrency = max(1, concurrency)
+        self.llm = PooledOllamaLLM(model=model)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.superseded = 0
+        self.total_seconds = 0.0
+        self._tasks = {}
+        self._running = {}
+        self._semaphore = None
+        self._handler = None
+        self._loop = None
+
+    def start(self, handler: Callable[[str, str, dict], Awaitable[None]]):
+        """Démarre l'étape sur la boucle d'événements courante.
+
+            Args:
+                handler (Callable[[str, str, dict], Awaitable[None]]): Coroutine de fusion
+                    appelée avec (chemin, empreinte du fichier, métadonnées LLM)
+        """
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._handler = handler
+
+    async def stop(self):
+        """Annule les extractions en attente ou en cours."""
+        tasks = set(self._tasks.values()) | set(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+        self._running = {}
+
+    def submit(self, file_path: str, file_hash: str, prompt: str):
+        """Planifie l'extraction LLM d'un fichier (depuis la boucle d'événements).
+
+            Args:
+                file_path (str): Chemin du fichier
+                file_hash (str): Empreinte du contenu analysé
+                prompt (str): Prompt préparé par `prepare_metadata_extraction`
+        """
+        key = source_key(file_path)
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            self.superseded += 1
+            if previous not in self._running:
+                previous.cancel()
+        self.submitted += 1
+        self._tasks[key] = self._loop.create_task(self._run(key, file_path, file_hash, prompt))
+
+    async def _run(self, key: str, file_path: str, file_hash: str, prompt: str):
+        try:
+            async with self._semaphore:
+                task = asyncio.current_task()
+                self._running[task] = key
+                started = time.monotonic()
+                try:
+                    result = await asyncio.to_thread(self.llm.invoke, prompt)
+                finally:
+                    self.total_seconds += time.monotonic() - started
+                    self._running.pop(task, None)
+            await self._handler(file_path, file_hash, parse_llm_metadata(result))
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            print(f"[MetadataStage] Erreur extraction LLM {file_path} : {e}")
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    def status(self, file_path: str) -> Optional[str]:
+        """Retourne l'état de l'extraction LLM d'un fichier.
+
+            Args:
+                file_path (str): Chemin du fichier
+
+            Returns:
+                Optional[str]: "queued", "running" ou None
+        """
+        key = source_key(file_path)
+        if key in self._running.values():
+            return "running"
+        if key in self._tasks:
+            return "queued"
+        return None
+
+    def stats(self) -> dict:
+        """Retourne l'état de l'étape.
+
+            Returns:
+                dict: Extractions en attente et en cours, compteurs et durée moyenne d'un appel
+        """
+        calls = self.completed + self.failed
+        return {
+            "concurrency": self.concurrency,
+            "pending": sum(1 for task in self._tasks.values() if task not in self._running),
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "superseded": self.superseded,
+            "avg_llm_seconds": self.total_seconds / calls if calls else 0.0,
+        }
+
+
+metadata_stage = MetadataStage()
@@ -0,0 +1,269 @@
+import os
+import json
+import threading
+from typing import AsyncIterator, List
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+# ----------------- CONFIGURATION -----------------
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+# "embeddings" : endpoint historique, un texte par requête, vecteurs non normalisés (index existants)
+# "embed" : endpoint par lots, vecteurs normalisés (nécessite de réindexer la base)
+OLLAMA_EMBED_API = os.getenv("OLLAMA_EMBED_API", "embeddings")
+
+
+def _pool_info(client) -> dict:
+    """Décrit l'état du pool de connexions d'un client httpx.
+
+        Args:
+            client: Client httpx (synchrone ou asynchrone) ou None
+
+        Returns:
+            dict: Nombre de connexions ouvertes, actives et inactives
+    """
+    if client is None:
+        return {"open": False, "connections": 0, "active": 0, "idle": 0}
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = 0
+    for connection in connections:
+        try:
+            idle += 1 if connection.is_idle() else 0
+        except Exception:
+            pass
+    return {
+        "open": not client.is_closed,
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+    }
+
+
+class OllamaClient:
+    """Client HTTP partagé vers le serveur Ollama, avec pool de connexions.
+
+        Un client asynchrone sert le streaming du chat, un client synchrone sert
+        les embeddings et les appels LLM d'extraction de métadonnées (exécutés
+        hors de la boucle d'événements). Les deux réutilisent leurs connexions
+        keep-alive au lieu d'en ouvrir une par requête.
+
+        Attributes:
+            base_url (str): URL du serveur Ollama
+            limits (httpx.Limits): Limites du pool de connexions
+            timeout (httpx.Timeout): Délais de connexion et de lecture
+    """
+    def __init__(self, base_url: str = OLLAMA_BASE_URL,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+                 read_timeout: float = OLLAMA_READ_TIMEOUT,
+                 embed_api: str = OLLAMA_EMBED_API):
+        """Initialise la configuration du client (les connexions sont ouvertes à la demande).
+
+            Args:
+                base_url (str): URL du serveur Ollama
+                max_connections (int): Nombre maximal de connexions simultanées
+                max_keepalive_connections (int): Nombre maximal de connexions inactives conservées
+                keepalive_expiry (float): Durée de vie d'une connexion inactive (s)
+                connect_timeout (float): Délai d'établissement de connexion (s)
+                read_timeout (float): Délai de lecture (s)
+                embed_api (str): Endpoint d'embedding ("embeddings" ou "embed")
+        """
+        self.base_url = base_url
+        self.embed_api = embed_api
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._async_client = None
+        self._sync_client = None
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Ouvre le client asynchrone (appelé au démarrage de l'application)."""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, timeout=self.timeout
+            )
+
+    async def close(self):
+        """Ferme les clients et leurs connexions (appelé à l'arrêt de l'application)."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        """Client synchrone partagé, créé à la première utilisation."""
+        with self._lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                self._sync_client = httpx.Client(
+                    base_url=self.base_url, limits=self.limits, timeout=self.timeout
+                )
+            return self._sync_client
+
+    def _post(self, path: str, payload: dict) -> dict:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+        try:
+            response = self.sync_client.post(path, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def stream_generate(self, payload: dict) -> AsyncIterator[dict]:
+        """Appelle `/api/generate` en streaming et produit chaque ligne JSON décodée.
+
+            Args:
+                payload (dict): Corps de la requête Ollama (model, prompt, options...)
+
+            Yields:
+                dict: Fragments de réponse renvoyés par Ollama
+        """
+        await self.start()
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            async with self._async_client.stream("POST", "/api/generate", json={**payload, "stream": True}) as response:
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def generate(self, model: str, prompt: str, options: dict = None) -> str:
+        """Appelle `/api/generate` sans streaming.
+
+            Args:
+                model (str): Nom du modèle
+                prompt (str): Prompt complet
+                options (dict, optional): Options de génération
+
+            Returns:
+                str: Texte généré
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        return self._post("/api/generate", payload).get("response", "")
+
+    def embed(self, model: str, text: str) -> List[float]:
+        """Calcule l'embedding d'un texte.
+
+            Args:
+                model (str): Nom du modèle d'embedding
+                text (str): Texte à encoder
+
+            Returns:
+                List[float]: Vecteur d'embedding
+        """
+        return self.embed_batch(model, [text])[0]
+
+    def embed_batch(self, model: str, texts: List[str]) -> List[List[float]]:
+        """Calcule les embeddings d'un lot de textes.
+
+            Avec `/api/embed`, le lot part en une seule requête ; avec l'endpoint
+            historique `/api/embeddings`, chaque texte fait l'objet d'une requête.
+
+            Args:
+                model (str): Nom du modèle d'embedding
+                texts (List[str]): Textes à encoder
+
+            Returns:
+                List[List[float]]: Vecteurs dans l'ordre des textes
+        """
+        if self.embed_api == "embed":
+            return self._post("/api/embed", {"model": model, "input": texts})["embeddings"]
+        return [self._post("/api/embeddings", {"model": model, "prompt": text})["embedding"] for text in texts]
+
+    def stats(self) -> dict:
+        """Retourne les métriques des requêtes et des pools de connexions.
+
+            Returns:
+                dict: Compteurs de requêtes et état des pools synchrone et asynchrone
+        """
+        return {
+            "base_url": self.base_url,
+            "embed_api": self.embed_api,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "async_pool": _pool_info(self._async_client),
+            "sync_pool": _pool_info(self._sync_client),
+        }
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """Embeddings Ollama passant par le client partagé.
+
+        Reprend les préfixes d'instruction d'`OllamaEmbeddings` afin que les
+        vecteurs restent compatibles avec ceux déjà indexés.
+
+        Attributes:
+            model (str): Nom du modèle d'embedding
+            client (OllamaClient): Client partagé
+    """
+    def __init__(self, model: str, client: "OllamaClient" = None,
+                 embed_instruction: str = "passage: ", query_instruction: str = "query: "):
+        self.model = model
+        self.client = client or ollama_client
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.client.embed(self.model, f"{self.embed_instruction}{text}") for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed(self.model, f"{self.query_instruction}{text}")
+
+
+class PooledOllamaLLM:
+    """LLM Ollama passant par le client partagé, compatible avec `Ollama.invoke`.
+
+        Attributes:
+            model (str): Nom du modèle
+            options (dict): Options de génération
+            client (OllamaClient): Client partagé
+    """
+    def __init__(self, model: str, options: dict = None, client: "OllamaClient" = None):
+        self.model = model
+        self.options = options
+        self.client = client or ollama_client
+
+    def invoke(self, prompt: str) -> str:
+        return self.client.generate(self.model, prompt, self.options)
+
+
+ollama_client = OllamaClient()
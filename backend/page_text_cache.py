@@ -0,0 +1,279 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Callable, Iterator, List, Optional
+
+# ----------------- CONFIGURATION -----------------
+
+PAGE_TEXT_CACHE_FILE = "page_text_cache.sqlite3"
+PAGE_TEXT_CACHE_MAX_BYTES = int(os.getenv("PAGE_TEXT_CACHE_MAX_MB", "512")) * 1024 * 1024
+PAGE_TEXT_CACHE_EVICT_RATIO = 0.9
+PAGE_TEXT_CACHE_BATCH = 64
+PAGE_COUNT = -1
+
+UPSERT_PAGE_TEXT = (
+    "INSERT INTO page_texts VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(content_hash, page, extractor) DO UPDATE SET "
+    "text = excluded.text, size = excluded.size, last_access = excluded.last_access"
+)
+
+
+class PageTextCache:
+    """Cache disque du texte extrait de chaque page d'un document.
+
+        Les entrées sont indexées par empreinte du contenu du fichier, numéro de
+        page et extracteur (avec ses réglages, ex: langue et résolution de
+        l'OCR) : un fichier renommé, copié, restauré ou téléversé à nouveau n'est
+        pas ré-analysé. La taille totale est bornée ; au-delà, les entrées les
+        moins récemment lues sont supprimées. La taille et le nombre d'entrées
+        sont tenus à jour par des triggers dans la table `page_text_stats`, ce
+        qui évite de parcourir la table à chaque écriture.
+
+        Partagé entre les processus d'analyse de l'ingestion (SQLite en WAL).
+
+        Attributes:
+            path (str): Chemin du fichier SQLite
+            max_bytes (int): Taille maximale du texte conservé
+            hits (int): Pages servies depuis le cache
+            misses (int): Pages extraites
+            evictions (int): Entrées supprimées pour respecter la taille maximale
+    """
+    def __init__(self, path: str = PAGE_TEXT_CACHE_FILE, max_bytes: int = PAGE_TEXT_CACHE_MAX_BYTES):
+        """Ouvre (ou crée) le cache.
+
+            Args:
+                path (str): Chemin du fichier SQLite
+                max_bytes (int): Taille maximale du texte conservé
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS page_texts (
+                content_hash TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                extractor TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, page, extractor)
+            );
+            CREATE INDEX IF NOT EXISTS idx_page_texts_access ON page_texts(last_access);
+            CREATE TABLE IF NOT EXISTS page_text_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                entries INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO page_text_stats
+                SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM page_texts;
+            CREATE TRIGGER IF NOT EXISTS page_texts_insert AFTER INSERT ON page_texts BEGIN
+                UPDATE page_text_stats SET entries = entries + 1, size = size + new.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS page_texts_update AFTER UPDATE OF size ON page_texts BEGIN
+                UPDATE page_text_stats SET size = size + new.size - old.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS page_texts_delete AFTER DELETE ON page_texts BEGIN
+                UPDATE page_text_stats SET entries = entries - 1, size = size - old.size WHERE id = 0;
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def get(self, content_hash: str, page: int, extractor: str) -> Optional[str]:
+        """Retourne le texte d'une page s'il est en cache.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                page (int): Numéro de page (0-based)
+                extractor (str): Extracteur et réglages
+
+            Returns:
+                Optional[str]: Texte de la page ou None
+        """
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT text FROM page_texts WHERE content_hash = ? AND page = ? AND extractor = ?",
+                    (content_hash, page, extractor)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute(
+                    "UPDATE page_texts SET last_access = ? WHERE content_hash = ? AND page = ? AND extractor = ?",
+                    (time.time(), content_hash, page, extractor)
+                )
+        except sqlite3.Error as e:
+            print(f"[PageTextCache] Erreur de lecture du cache : {e}")
+            return None
+        return row[0]
+
+    def put(self, content_hash: str, page: int, extractor: str, text: str):
+        """Enregistre le texte d'une page, puis applique la limite de taille.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                page (int): Numéro de page (0-based)
+                extractor (str): Extracteur et réglages
+                text (str): Texte extrait
+        """
+        size = len(text.encode("utf-8"))
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(UPSERT_PAGE_TEXT, (content_hash, page, extractor, text, size, time.time()))
+                self._evict()
+        except sqlite3.Error as e:
+            print(f"[PageTextCache] Erreur d'écriture du cache : {e}")
+
+    def _evict(self):
+        total = self._conn.execute("SELECT size FROM page_text_stats WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * PAGE_TEXT_CACHE_EVICT_RATIO)
+        freed = 0
+        victims = []
+        for rowid, size in self._conn.execute("SELECT rowid, size FROM page_texts ORDER BY last_access"):
+            victims.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM page_texts WHERE rowid = ?", victims)
+        self.evictions += len(victims)
+
+    def get_or_extract(self, content_hash: Optional[str], page: int, extractor: str,
+                       extract: Callable[[], Optional[str]]) -> Optional[str]:
+        """Retourne le texte d'une page depuis le cache, ou l'extrait et l'enregistre.
+
+            Args:
+                content_hash (Optional[str]): Empreinte du contenu du fichier (None désactive le cache)
+                page (int): Numéro de page (0-based)
+                extractor (str): Extracteur et réglages
+                extract (Callable[[], Optional[str]]): Extraction de la page (None si la page n'existe pas)
+
+            Returns:
+                Optional[str]: Texte de la page, ou None si la page n'existe pas
+        """
+        if content_hash is not None:
+            text = self.get(content_hash, page, extractor)
+            if text is not None:
+                self.hits += 1
+                return text
+        text = extract()
+        self.misses += 1
+        if content_hash is not None and text is not None:
+            self.put(content_hash, page, extractor, text)
+        return text
+
+    def get_page_count(self, content_hash: str, extractor: str) -> Optional[int]:
+        """Retourne le nombre de pages enregistré pour un fichier et un extracteur.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                extractor (str): Extracteur et réglages
+
+            Returns:
+                Optional[int]: Nombre de pages ou None
+        """
+        value = self.get(content_hash, PAGE_COUNT, extractor)
+        return int(value) if value is not None else None
+
+    def put_page_count(self, content_hash: str, extractor: str, count: int):
+        """Enregistre le nombre de pages d'un fichier pour un extracteur.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                extractor (str): Extracteur et réglages
+                count (int): Nombre de pages
+        """
+        self.put(content_hash, PAGE_COUNT, extractor, str(count))
+
+    def iter_pages(self, content_hash: str, extractor: str, batch_size: int = PAGE_TEXT_CACHE_BATCH) -> Iterator[str]:
+        """Produit le texte des pages en cache d'un fichier, dans l'ordre, par lots.
+
+            S'arrête à la première page absente : l'appelant compare le nombre de
+            pages produites à `get_page_count` pour savoir si le cache était complet.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                extractor (str): Extracteur et réglages
+                batch_size (int): Nombre de pages lues par requête
+
+            Yields:
+                str: Texte de chaque page, à partir de la page 0
+        """
+        page = 0
+        while True:
+            try:
+                with self._lock, self._conn:
+                    rows = self._conn.execute(
+                        "SELECT page, text FROM page_texts WHERE content_hash = ? AND extractor = ? "
+                        "AND page >= ? AND page < ? ORDER BY page",
+                        (content_hash, extractor, page, page + batch_size)
+                    ).fetchall()
+                    if rows:
+                        self._conn.execute(
+                            "UPDATE page_texts SET last_access = ? WHERE content_hash = ? AND extractor = ? "
+                            "AND page >= ? AND page < ?",
+                            (time.time(), content_hash, extractor, page, page + batch_size)
+                        )
+            except sqlite3.Error as e:
+                print(f"[PageTextCache] Erreur de lecture du cache : {e}")
+                return
+            for number, text in rows:
+                if number != page:
+                    return
+                self.hits += 1
+                yield text
+                page += 1
+            if len(rows) < batch_size:
+                return
+
+    def put_page_range(self, content_hash: str, extractor: str, first_page: int, texts: List[str]):
+        """Enregistre le texte d'une suite de pages consécutives en une transaction.
+
+            Args:
+                content_hash (str): Empreinte du contenu du fichier
+                extractor (str): Extracteur et réglages
+                first_page (int): Numéro de la première page (0-based)
+                texts (List[str]): Textes des pages dans l'ordre
+        """
+        now = time.time()
+        rows = [(content_hash, first_page + offset, extractor, text, len(text.encode("utf-8")), now)
+                for offset, text in enumerate(texts)]
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(UPSERT_PAGE_TEXT, rows)
+                self._evict()
+        except sqlite3.Error as e:
+            print(f"[PageTextCache] Erreur d'écriture du cache : {e}")
+
+    def stats(self) -> dict:
+        """Retourne les compteurs et la taille du cache.
+
+            Returns:
+                dict: Hits, misses, évictions, nombre d'entrées et taille en octets
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT entries, size FROM page_text_stats WHERE id = 0"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+page_text_cache = PageTextCache()
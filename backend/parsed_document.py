@@ -0,0 +1,139 @@
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+from extractors import PREAMBLE_SEARCH_PAGES
+from page_text_cache import page_text_cache, PAGE_TEXT_CACHE_BATCH
+
+# ----------------- CONFIGURATION -----------------
+
+PYPDF_EXTRACTOR = "pypdf"
+
+
+class ParsedDocument:
+    """Texte d'un document, page par page, extrait en une seule passe.
+
+        Produit une fois par fichier et partagé par le découpage en chunks et
+        l'extraction de métadonnées, qui n'ont plus à rouvrir le PDF.
+
+        Seules les `head_size` premières pages (recherche du préambule) sont
+        lues à l'ouverture et conservées ; les suivantes sont lues au fil de
+        `iter_documents` sans être conservées : la mémoire ne dépend pas du
+        nombre de pages. Le document ne peut donc être parcouru qu'une fois.
+
+        Attributes:
+            source (str): Chemin du fichier
+            head_pages (List[str]): Texte des premières pages
+            content_hash (Optional[str]): Empreinte du contenu du fichier
+            page_count (int): Nombre de pages lues jusqu'ici (total une fois le document parcouru)
+    """
+    def __init__(self, source: str, pages: Iterable[Tuple[str, dict]], content_hash: Optional[str] = None,
+                 head_size: int = PREAMBLE_SEARCH_PAGES):
+        """Initialise le document et lit ses premières pages.
+
+            Args:
+                source (str): Chemin du fichier
+                pages (Iterable[Tuple[str, dict]]): (texte, métadonnées sans la source) de chaque page
+                content_hash (Optional[str]): Empreinte du contenu du fichier
+                head_size (int): Nombre de premières pages conservées
+        """
+        self.source = source
+        self.content_hash = content_hash
+        self._pages = iter(pages)
+        self._head = list(islice(self._pages, head_size))
+        self._consumed = False
+        self.page_count = len(self._head)
+
+    @property
+    def head_pages(self) -> List[str]:
+        """List[str]: Texte des premières pages"""
+        return [text for text, _ in self._head]
+
+    def iter_documents(self) -> Iterator[Document]:
+        """Produit une entrée LangChain par page, à la demande, pour le découpage.
+
+            Yields:
+                Document: Page avec `source` et `page` dans les métadonnées
+
+            Raises:
+                RuntimeError: Si le document a déjà été parcouru
+        """
+        if self._consumed:
+            raise RuntimeError(f"Document déjà parcouru : {self.source}")
+        self._consumed = True
+        for text, metadata in self._head:
+            yield Document(page_content=text, metadata={**metadata, "source": self.source})
+        for text, metadata in self._pages:
+            self.page_count += 1
+            yield Document(page_content=text, metadata={**metadata, "source": self.source})
+
+    def to_documents(self) -> List[Document]:
+        """Convertit le document en une entrée LangChain par page, pour le découpage.
+
+            Returns:
+                List[Document]: Documents avec `source` et `page` dans les métadonnées
+        """
+        return list(self.iter_documents())
+
+
+def iter_pdf_pages(file_path: str, content_hash: Optional[str] = None) -> Iterator[Tuple[str, dict]]:
+    """Produit le texte et les métadonnées de chaque page d'un PDF, en passant par le cache.
+
+        Les pages en cache sont relues par lots ; à partir de la première page
+        absente, le PDF est lu avec PyPDFLoader et les pages extraites sont
+        enregistrées par lots au fil de la lecture, puis leur nombre à la fin.
+
+        Args:
+            file_path (str): Chemin vers le fichier PDF
+            content_hash (Optional[str]): Empreinte du fichier (None désactive le cache)
+
+        Yields:
+            Tuple[str, dict]: Texte de la page, métadonnées de la page (sans la source)
+    """
+    page = 0
+    if content_hash is not None:
+        for entry in page_text_cache.iter_pages(content_hash, PYPDF_EXTRACTOR):
+            entry = json.loads(entry)
+            yield entry["text"], entry["metadata"]
+            page += 1
+        if page and page == page_text_cache.get_page_count(content_hash, PYPDF_EXTRACTOR):
+            return
+
+    first_uncached, batch = page, []
+    for number, doc in enumerate(PyPDFLoader(file_path).lazy_load()):
+        if number < page:
+            continue
+        metadata = {k: v for k, v in doc.metadata.items() if k != "source"}
+        page_text_cache.misses += 1
+        if content_hash is not None:
+            batch.append(json.dumps({"text": doc.page_content, "metadata": metadata}, default=str))
+            if len(batch) >= PAGE_TEXT_CACHE_BATCH:
+                page_text_cache.put_page_range(content_hash, PYPDF_EXTRACTOR, first_uncached, batch)
+                first_uncached += len(batch)
+                batch = []
+        yield doc.page_content, metadata
+        page += 1
+
+    if content_hash is not None:
+        if batch:
+            page_text_cache.put_page_range(content_hash, PYPDF_EXTRACTOR, first_uncached, batch)
+        page_text_cache.put_page_count(content_hash, PYPDF_EXTRACTOR, page)
+
+
+def parse_pdf(file_path: str, content_hash: Optional[str] = None) -> ParsedDocument:
+    """Ouvre un PDF pour une lecture en une passe (PyPDFLoader), en passant par le cache.
+
+        Le texte et les métadonnées de chaque page sont mis en cache sous
+        l'empreinte du fichier ; la source est celle du chemin courant.
+
+        Args:
+            file_path (str): Chemin vers le fichier PDF
+            content_hash (Optional[str]): Empreinte du fichier (None désactive le cache)
+
+        Returns:
+            ParsedDocument: Premières pages lues, pages suivantes lues à la demande
+    """
+    return ParsedDocument(file_path, iter_pdf_pages(file_path, content_hash), content_hash)
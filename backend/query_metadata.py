@@ -0,0 +1,384 @@
+import os
+import re
+import json
+import threading
+
+from extractors import normalize_text
+
+# ----------------- CONFIGURATION -----------------
+
+METADATA_FILE = "documents_metadata.json"
+
+QUERY_FIELDS = ("marche", "region", "societe", "version")
+
+DEFAULT_VERSIONS = ["définitif", "définitive", "provisoire", "final", "finale"]
+
+MARCHE_PATTERN = re.compile(r"\b\d{1,6}(?:\s*/\s*[A-Za-z0-9-]{1,10}){1,4}\s*/\s*\d{2,4}\b")
+ACRONYM_PATTERN = re.compile(r"\b[A-Z][A-Z0-9&-]{1,}\b")
+VALUE_TOKEN_PATTERN = re.compile(r"[\w/&-]+")
+WORD_PATTERN = re.compile(r"\w+")
+
+FIELD_HINTS = {
+    "marche": ["marche", "marches", "reference"],
+    "region": ["region", "ville", "province"],
+    "societe": ["societe", "entreprise", "bureau d'etudes", "bet", "prestataire"],
+    "version": ["version"],
+}
+
+NER_LABEL_MAP = {
+    "LABEL_ORG": "societe",
+    "LABEL_MARCHE": "marche",
+    "LABEL_LOC": "region",
+    "LABEL_VERSION": "version"
+}
+
+IGNORED_VALUES = {"", "null", "none", "non trouve", "non trouvé"}
+
+# Sigles courants des requêtes qui ne désignent ni une société ni un marché.
+ACRONYM_STOPWORDS = {
+    "PDF", "DOC", "DOCX", "XLS", "XLSX", "PPT", "PPTX", "BET", "CPS", "RC", "AO", "DCE",
+    "PV", "TVA", "HT", "TTC", "DH", "MAD", "OK", "NB",
+}
+
+# Mots ignorés entre un mot-clé de champ et la valeur qui le suit (ex: « marché n° ... »).
+VALUE_SKIP_WORDS = {
+    "de", "du", "des", "d", "la", "le", "les", "l", "au", "aux", "a", "en",
+    "n", "no", "num", "numero", "nom", "nomme", "nommee", "appele", "appelee",
+}
+
+
+def normalize_with_offsets(text: str) -> tuple:
+    """Normalise un texte en conservant la correspondance avec les positions d'origine.
+
+        Args:
+            text (str): Texte à normaliser
+
+        Returns:
+            tuple: (texte normalisé, liste des indices d'origine de chaque caractère)
+    """
+    chars = []
+    offsets = []
+    for i, c in enumerate(text):
+        for n in normalize_text(c):
+            chars.append(n)
+            offsets.append(i)
+    return "".join(chars), offsets
+
+
+def index_key(norm: str):
+    """Retourne la clé d'index d'une valeur normalisée : son premier mot.
+
+        Une occurrence de la valeur dans une requête commence toujours par ce
+        mot entier (ou ce mot suivi du « s » du pluriel pour une valeur d'un seul mot).
+
+        Args:
+            norm (str): Valeur normalisée
+
+        Returns:
+            Optional[str]: Premier mot, ou None si la valeur n'en contient pas
+    """
+    m = WORD_PATTERN.search(norm)
+    return m.group(0) if m else None
+
+
+def empty_query_metadata() -> dict:
+    """Retourne un dictionnaire de métadonnées de requête vide.
+
+        Returns:
+            dict: Chaque champ recherché associé à None
+    """
+    return {field: None for field in QUERY_FIELDS}
+
+
+class QueryGazetteer:
+    """Dictionnaire des valeurs connues (régions, sociétés, versions, marchés).
+
+        Les valeurs sont extraites de `documents_metadata.json` et maintenues
+        incrémentalement par le watcher. Chaque valeur garde la liste des documents
+        qui la portent afin de disparaître avec le dernier d'entre eux.
+
+        Les valeurs sont indexées par leur premier mot : une requête ne vérifie
+        que les valeurs dont le premier mot y figure, et non toutes les valeurs
+        connues.
+
+        Attributes:
+            metadata_file (str): Fichier de métadonnées utilisé au premier chargement
+    """
+    def __init__(self, metadata_file: str = METADATA_FILE):
+        """Initialise le gazetteer (chargé paresseusement).
+
+            Args:
+                metadata_file (str): Chemin du fichier de métadonnées des documents
+        """
+        self.metadata_file = metadata_file
+        self._entries = {field: {} for field in QUERY_FIELDS}
+        self._documents = {}
+        self._index = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        for version in DEFAULT_VERSIONS:
+            self._entry("version", normalize_text(version), version)["documents"].add(None)
+
+    def _entry(self, field: str, norm: str, value: str) -> dict:
+        entry = self._entries[field].get(norm)
+        if entry is None:
+            entry = {
+                "value": value,
+                "documents": set(),
+                "pattern": re.compile(r"(?<!\w)" + re.escape(norm) + r"(?=s?(?!\w))"),
+            }
+            self._entries[field][norm] = entry
+            self._index.setdefault(index_key(norm), set()).add((field, norm))
+        return entry
+
+    def _drop_entry(self, field: str, norm: str):
+        del self._entries[field][norm]
+        key = index_key(norm)
+        candidates = self._index.get(key)
+        if candidates is not None:
+            candidates.discard((field, norm))
+            if not candidates:
+                del self._index[key]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.metadata_file):
+            return
+        try:
+            with open(self.metadata_file, "r", encoding="utf-8") as f:
+                all_metadata = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[Gazetteer] Erreur de lecture des métadonnées : {e}")
+            return
+        for filename, metadata in all_metadata.items():
+            self._add(filename, metadata)
+        print(f"[Gazetteer] Chargé : {self.size()} valeur(s) connue(s)")
+
+    def _add(self, filename: str, metadata: dict):
+        values = {}
+        for field in QUERY_FIELDS:
+            value = metadata.get(field)
+            if not value or normalize_text(str(value)).strip() in IGNORED_VALUES:
+                continue
+            norm = normalize_text(str(value)).strip()
+            if len(norm) < 2:
+                continue
+            self._entry(field, norm, str(value).strip())["documents"].add(filename)
+            values[field] = norm
+        self._documents[filename] = values
+
+    def _remove(self, filename: str):
+        for field, norm in self._documents.pop(filename, {}).items():
+            entry = self._entries[field].get(norm)
+            if entry:
+                entry["documents"].discard(filename)
+                if not entry["documents"]:
+                    self._drop_entry(field, norm)
+
+    def update_document(self, filename: str, metadata: dict):
+        """Ajoute ou remplace les valeurs d'un document.
+
+            Args:
+                filename (str): Nom du fichier (clé de documents_metadata.json)
+                metadata (dict): Métadonnées du document
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._remove(filename)
+            self._add(filename, metadata or {})
+
+    def remove_document(self, filename: str):
+        """Retire les valeurs d'un document supprimé.
+
+            Args:
+                filename (str): Nom du fichier
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._remove(filename)
+
+    def is_known(self, norm: str) -> bool:
+        """Indique si une valeur normalisée est connue, tous champs confondus.
+
+            Args:
+                norm (str): Valeur normalisée (`normalize_text`)
+
+            Returns:
+                bool: True si un document porte cette valeur
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return any(norm in entries for entries in self._entries.values())
+
+    def size(self) -> int:
+        """Retourne le nombre de valeurs connues, tous champs confondus.
+
+            Returns:
+                int: Nombre de valeurs
+        """
+        return sum(len(entries) for entries in self._entries.values())
+
+    def match(self, query: str) -> dict:
+        """Recherche les valeurs connues présentes dans une requête.
+
+            Args:
+                query (str): Requête utilisateur
+
+            Returns:
+                dict: Champ -> texte tel qu'il apparaît dans la requête (plus longue correspondance,
+                    pluriel en « s » toléré)
+        """
+        norm_query, offsets = normalize_with_offsets(query)
+        keys = {None}
+        for word in WORD_PATTERN.findall(norm_query):
+            keys.add(word)
+            if word.endswith("s"):
+                keys.add(word[:-1])
+
+        best = {}
+        with self._lock:
+            self._ensure_loaded()
+            for key in keys:
+                for field, norm in self._index.get(key, ()):
+                    m = self._entries[field][norm]["pattern"].search(norm_query)
+                    if m is None:
+                        continue
+                    current = best.get(field)
+                    if current is None or (len(norm), -m.start()) > (current[1] - current[0], -current[0]):
+                        best[field] = (m.start(), m.end())
+        return {
+            field: query[offsets[start]:offsets[end - 1] + 1]
+            for field, (start, end) in best.items()
+        }
+
+
+class QueryMetadataExtractor:
+    """Extrait les métadonnées d'une requête sans appeler le LLM dans le cas courant.
+
+        Le chemin rapide combine une expression régulière pour les références de
+        marché, le gazetteer et, si disponible, le modèle NER spaCy. Le LLM n'est
+        sollicité que lorsque la requête contient des indices non résolus
+        (sigle inconnu, mot-clé « marché »/« société »... suivi d'une valeur non reconnue).
+
+        Attributes:
+            gazetteer (QueryGazetteer): Valeurs connues des documents
+            nlp_model: Modèle spaCy optionnel
+            llm_fallback: Fonction `(query) -> dict` appelée en cas de doute
+    """
+    def __init__(self, gazetteer: QueryGazetteer, nlp_model=None, llm_fallback=None):
+        """Initialise l'extracteur.
+
+            Args:
+                gazetteer (QueryGazetteer): Gazetteer des valeurs connues
+                nlp_model: Modèle NER spaCy (optionnel)
+                llm_fallback: Extraction LLM de secours (optionnelle)
+        """
+        self.gazetteer = gazetteer
+        self.nlp_model = nlp_model
+        self.llm_fallback = llm_fallback
+        self.fast_path = 0
+        self.llm_calls = 0
+
+    def extract_fast(self, query: str) -> dict:
+        """Extrait les métadonnées par regex, gazetteer et NER.
+
+            Args:
+                query (str): Requête utilisateur
+
+            Returns:
+                dict: Champs trouvés uniquement
+        """
+        found = {}
+        m = MARCHE_PATTERN.search(query)
+        if m:
+            found["marche"] = m.group(0)
+
+        for field, value in self.gazetteer.match(query).items():
+            found.setdefault(field, value)
+
+        if self.nlp_model is not None:
+            try:
+                for ent in self.nlp_model(query).ents:
+                    field = NER_LABEL_MAP.get(ent.label_)
+                    if field and field not in found:
+                        found[field] = ent.text.strip()
+            except Exception as e:
+                print(f"[QueryMeta] Erreur NER : {e}")
+
+        return found
+
+    def _is_unresolved(self, token: str, resolved: str) -> bool:
+        norm = normalize_text(token)
+        return (token.upper() not in ACRONYM_STOPWORDS and norm not in resolved
+                and not self.gazetteer.is_known(norm))
+
+    def _has_unresolved_value(self, text: str, resolved: str) -> bool:
+        for token in VALUE_TOKEN_PATTERN.findall(text):
+            if normalize_text(token) in VALUE_SKIP_WORDS:
+                continue
+            if not (token[0].isupper() or any(c.isdigit() for c in token)):
+                return False
+            return self._is_unresolved(token, resolved)
+        return False
+
+    def is_unsure(self, query: str, found: dict) -> bool:
+        """Détermine si la requête contient des indices que le chemin rapide n'a pas résolus.
+
+            Un mot-clé de champ (« marché », « société »...) n'est un indice que
+            s'il est suivi d'une valeur (mot en majuscule ou contenant un
+            chiffre) non reconnue. Un sigle n'est un indice que s'il n'est ni
+            reconnu, ni connu du gazetteer, ni un sigle courant (ACRONYM_STOPWORDS).
+
+            Args:
+                query (str): Requête utilisateur
+                found (dict): Champs trouvés par le chemin rapide
+
+            Returns:
+                bool: True si le LLM doit être consulté
+        """
+        norm_query, offsets = normalize_with_offsets(query)
+        resolved = normalize_text(" ".join(found.values()))
+        for field, hints in FIELD_HINTS.items():
+            if field in found:
+                continue
+            for hint in hints:
+                for m in re.finditer(r"\b" + re.escape(hint) + r"\b", norm_query):
+                    if self._has_unresolved_value(query[offsets[m.end() - 1] + 1:], resolved):
+                        return True
+
+        for acronym in ACRONYM_PATTERN.findall(query):
+            if self._is_unresolved(acronym, resolved):
+                return True
+
+        return False
+
+    def extract(self, query: str) -> dict:
+        """Extrait les métadonnées d'une requête, avec repli LLM si nécessaire.
+
+            Args:
+                query (str): Requête utilisateur
+
+            Returns:
+                dict: Métadonnées au format {"marche", "region", "societe", "version"}
+        """
+        result = empty_query_metadata()
+        found = self.extract_fast(query)
+
+        if self.llm_fallback is not None and self.is_unsure(query, found):
+            self.llm_calls += 1
+            llm_result = self.llm_fallback(query) or {}
+            for field in QUERY_FIELDS:
+                value = llm_result.get(field)
+                if value and str(value).lower() != "null":
+                    result[field] = value
+        else:
+            self.fast_path += 1
+
+        result.update(found)
+        return result
+
+
+query_gazetteer = QueryGazetteer()
@@ -0,0 +1,136 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+# ----------------- CONFIGURATION -----------------
+
+RERANK_BATCHING = os.getenv("RERANK_BATCHING", "1") != "0"
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", "64"))
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "10"))
+
+
+class RerankBatcher:
+    """Regroupe les paires (requête, chunk) de requêtes concurrentes pour le cross-encoder.
+
+        Chaque requête dépose ses paires dans une file ; une tâche unique les
+        rassemble pendant au plus `max_wait_ms` (ou jusqu'à `max_batch_size` paires)
+        puis effectue un seul appel `predict` et redistribue les scores.
+
+        Les compteurs sont modifiés depuis la boucle asyncio et depuis le thread
+        de l'exécuteur : ils sont protégés par un verrou.
+
+        Attributes:
+            model: Modèle exposant `predict(pairs, batch_size=...)` (ex: CrossEncoder)
+            max_batch_size (int): Nombre maximal de paires par appel groupé
+            max_wait_ms (float): Temps d'attente maximal pour compléter un lot
+            enabled (bool): Si False, chaque requête appelle `predict` seule
+    """
+    def __init__(self, model, max_batch_size: int = RERANK_MAX_BATCH_SIZE,
+                 max_wait_ms: float = RERANK_MAX_WAIT_MS, enabled: bool = RERANK_BATCHING,
+                 executor: ThreadPoolExecutor = None):
+        """Initialise le regroupeur.
+
+            Args:
+                model: Modèle de reranking
+                max_batch_size (int): Nombre maximal de paires par lot
+                max_wait_ms (float): Fenêtre de regroupement en millisecondes
+                enabled (bool): Active ou non le regroupement
+                executor (ThreadPoolExecutor, optional): Exécuteur des appels `predict`
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.enabled = enabled
+        self.batches = 0
+        self.requests = 0
+        self.pairs = 0
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._queue = None
+        self._worker = None
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        with self._lock:
+            self.batches += 1
+            self.pairs += len(pairs)
+        return [float(s) for s in self.model.predict(pairs, batch_size=self.max_batch_size)]
+
+    async def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Calcule les scores de pertinence d'une liste de paires.
+
+            Args:
+                pairs (List[Tuple[str, str]]): Paires (requête, contenu du chunk)
+
+            Returns:
+                List[float]: Scores dans le même ordre que les paires
+        """
+        if not pairs:
+            return []
+
+        with self._lock:
+            self.requests += 1
+        loop = asyncio.get_running_loop()
+
+        if not self.enabled:
+            return await loop.run_in_executor(self._executor, self._predict, list(pairs))
+
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((list(pairs), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            all_pairs = [pair for pairs, _ in batch for pair in pairs]
+            try:
+                scores = await loop.run_in_executor(self._executor, self._predict, all_pairs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for pairs, future in batch:
+                if not future.done():
+                    future.set_result(scores[offset:offset + len(pairs)])
+                offset += len(pairs)
+
+    def stats(self) -> dict:
+        """Retourne les compteurs du regroupeur.
+
+            Returns:
+                dict: Paramètres, nombre de requêtes, de lots et taille moyenne des lots
+        """
+        with self._lock:
+            requests, batches, pairs = self.requests, self.batches, self.pairs
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "requests": requests,
+            "batches": batches,
+            "pairs": pairs,
+            "avg_batch_size": pairs / batches if batches else 0.0,
+        }
@@ -0,0 +1,145 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ----------------- CONFIGURATION -----------------
+
+STAGE_WORKERS = {
+    "metadata": int(os.getenv("RETRIEVAL_METADATA_WORKERS", "2")),
+    "search": int(os.getenv("RETRIEVAL_SEARCH_WORKERS", "4")),
+    "rerank": int(os.getenv("RETRIEVAL_RERANK_WORKERS", "1")),
+    "tokenize": int(os.getenv("RETRIEVAL_TOKENIZE_WORKERS", "2")),
+}
+
+
+class StagePool:
+    """Pool de threads borné dédié à une étape du pipeline de recherche.
+
+        Attributes:
+            name (str): Nom de l'étape
+            max_workers (int): Nombre maximal de tâches exécutées simultanément
+            executor (ThreadPoolExecutor): Exécuteur de l'étape
+    """
+    def __init__(self, name: str, max_workers: int):
+        """Initialise le pool.
+
+            Args:
+                name (str): Nom de l'étape
+                max_workers (int): Concurrence maximale de l'étape
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"retrieval-{name}")
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _call(self, func, *args, **kwargs):
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """Exécute une fonction bloquante dans le pool sans bloquer la boucle d'événements.
+
+            Args:
+                func: Fonction bloquante à exécuter
+                *args: Arguments positionnels
+                **kwargs: Arguments nommés
+
+            Returns:
+                Le résultat de `func`
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.waiting += 1
+        try:
+            result = await loop.run_in_executor(
+                self.executor, functools.partial(self._call, func, *args, **kwargs)
+            )
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        """Retourne l'occupation du pool.
+
+            Returns:
+                dict: Tâches en cours, en attente, terminées et en erreur
+        """
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "errors": self.errors,
+        }
+
+
+class RetrievalPipeline:
+    """Regroupe les pools des étapes bloquantes du chat (métadonnées et repli LLM,
+    Chroma, reranking, tokenisation) afin qu'une requête lente n'immobilise pas
+    la boucle d'événements ni les autres endpoints.
+
+        Attributes:
+            stages (dict): Nom de l'étape -> StagePool
+    """
+    def __init__(self, stage_workers: dict = None):
+        """Initialise les pools d'étapes.
+
+            Args:
+                stage_workers (dict, optional): Concurrence par étape. Defaults to STAGE_WORKERS.
+        """
+        self.stages = {
+            name: StagePool(name, workers)
+            for name, workers in (stage_workers or STAGE_WORKERS).items()
+        }
+
+    def executor(self, stage: str) -> ThreadPoolExecutor:
+        """Retourne l'exécuteur d'une étape.
+
+            Args:
+                stage (str): Nom de l'étape
+
+            Returns:
+                ThreadPoolExecutor: Exécuteur de l'étape
+        """
+        return self.stages[stage].executor
+
+    async def run(self, stage: str, func, *args, **kwargs):
+        """Exécute une fonction bloquante dans le pool de l'étape indiquée.
+
+            Args:
+                stage (str): Nom de l'étape
+                func: Fonction bloquante
+                *args: Arguments positionnels
+                **kwargs: Arguments nommés
+
+            Returns:
+                Le résultat de `func`
+        """
+        return await self.stages[stage].run(func, *args, **kwargs)
+
+    def stats(self) -> dict:
+        """Retourne l'occupation de chaque étape.
+
+            Returns:
+                dict: Nom de l'étape -> compteurs
+        """
+        return {name: pool.stats() for name, pool in self.stages.items()}
+
+
+retrieval_pipeline = RetrievalPipeline()
@@ -1,4 +1,5 @@
 import time
+import asyncio
 import traceback
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
@@ -6,31 +7,36 @@ from typing import List, Optional
 import os
 import json
 from fastapi.responses import StreamingResponse
-import httpx
 from fastapi import Body
 import re
 
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    UnstructuredWordDocumentLoader,
-    UnstructuredExcelLoader,
-    UnstructuredPowerPointLoader,
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_community.llms.ollama import Ollama
-from transformers import AutoTokenizer
 from sentence_transformers import CrossEncoder
+from embedding_cache import CachedQueryEmbeddings
+from ollama_client import ollama_client, PooledOllamaEmbeddings, PooledOllamaLLM
+from rerank_batcher import RerankBatcher
+from retrieval_pipeline import retrieval_pipeline
+from answer_cache import answer_cache
+from conversation_store import conversation_store
+from lexical_index import lexical_index, reciprocal_rank_fusion
+from tokenization import get_tokenizer, TOKEN_COUNT_KEY
+from query_metadata import QueryMetadataExtractor, query_gazetteer
+from metadata_index import metadata_index
+from watcher import nlp_model
 
 CHROMA_UPLOADS_PATH = "chroma_uploads"
+EMBEDDING_MODEL = "nomic-embed-text"
+LLM_MODEL = "llama3.2:3b-instruct-q4_K_M"
 DATA_PATH = "data"
-CONV_FILE = "conversations.json"
 METADATA_FILE = "documents_metadata.json"
 
 UPLOAD_DIR = "uploads"
 
+VECTOR_K = 15
+LEXICAL_K = 15
+RERANK_CANDIDATES = 12
+
 os.makedirs(DATA_PATH, exist_ok=True)
 
 PROMPT_TEMPLATE = """
@@ -48,18 +54,23 @@ Réponse :
 def get_embedding_model():
     """Initialise et retourne le modèle d'embedding Ollama.
 
+        Les appels passent par le client Ollama partagé et les embeddings de
+        requêtes sont mis en cache (mémoire + disque) pour éviter un
+        aller-retour vers Ollama lorsqu'une question est reposée.
+
         Returns:
-            OllamaEmbeddings: Modèle d'embedding configuré
+            CachedQueryEmbeddings: Modèle d'embedding configuré avec cache
     """
-    return OllamaEmbeddings(model="nomic-embed-text")
+    return CachedQueryEmbeddings(PooledOllamaEmbeddings(model=EMBEDDING_MODEL), model_name=EMBEDDING_MODEL)
 
 # Initialisation des modèles
 cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
+rerank_batcher = RerankBatcher(cross_encoder, executor=retrieval_pipeline.executor("rerank"))
+tokenizer = get_tokenizer()
 router = APIRouter()
 embedding_function = get_embedding_model()
 db_permanent = Chroma(persist_directory=CHROMA_UPLOADS_PATH, embedding_function=embedding_function)
-model = Ollama(model="llama3.2:3b-instruct-q4_K_M")
+model = PooledOllamaLLM(model=LLM_MODEL)
 
 # ----------------- MODÈLES PYDANTIC -----------------
 class Source(BaseModel):
@@ -152,32 +163,6 @@ class QueryRequest(BaseModel):
     query_text: str
     conversation_id: Optional[str] = None
 
-def load_conversations():
-    """Charge les conversations depuis le fichier de stockage.
-
-        Returns:
-            List[dict]: Liste des conversations
-    """
-    if not os.path.exists(CONV_FILE):
-        return []
-    try:
-        with open(CONV_FILE, "r", encoding="utf-8") as f:
-            content = f.read()
-            if not content.strip():
-                return []
-            return json.loads(content)
-    except json.JSONDecodeError:
-        return []
-
-def save_conversations(convs):
-    """Sauvegarde les conversations dans le fichier de stockage.
-
-        Args:
-            convs (List[dict]): Liste des conversations à sauvegarder
-    """
-    with open(CONV_FILE, "w", encoding="utf-8") as f:
-        json.dump(convs, f, indent=2, ensure_ascii=False)
-
 def save_context_docs_to_message(conv_id: str, message_id: int, docs_with_sources: List[dict]):
     """Sauvegarde les sources documentaires dans un message spécifique.
 
@@ -189,24 +174,16 @@ def save_context_docs_to_message(conv_id: str, message_id: int, docs_with_source
         Returns:
             bool: True si la sauvegarde a réussi
     """
-    convs = load_conversations()
-    for conv in convs:
-        if conv["id"] == conv_id:
-            for message in conv["messages"]:
-                if message["id"] == message_id:
-                    sources = []
-                    for doc in docs_with_sources:
-                        meta = doc["metadata"]
-                        sources.append({
-                            "source": meta.get("source"),
-                            "page": meta.get("page"),
-                            "id": meta.get("id"),
-                            "score": doc["score"]
-                        })
-                    message["sources"] = sources
-                    save_conversations(convs)
-                    return True
-    return False
+    sources = []
+    for doc in docs_with_sources:
+        meta = doc["metadata"]
+        sources.append({
+            "source": meta.get("source"),
+            "page": meta.get("page"),
+            "id": meta.get("id"),
+            "score": doc["score"]
+        })
+    return conversation_store.update_message_fields(conv_id, message_id, {"sources": sources})
 
 @router.get("/conversations", response_model=List[Conversation])
 def get_conversations():
@@ -215,7 +192,7 @@ def get_conversations():
         Returns:
             List[Conversation]: Liste des conversations
     """
-    return load_conversations()
+    return conversation_store.list_conversations()
 
 @router.post("/conversations", response_model=Conversation)
 def create_conversation(conv: Conversation):
@@ -230,9 +207,7 @@ def create_conversation(conv: Conversation):
     conv_dict = conv.dict()
     conv_dict["mode"] = conv_dict.get("mode", "classic")
 
-    convs = load_conversations()
-    convs.insert(0, conv_dict)
-    save_conversations(convs)
+    conversation_store.create_conversation(conv_dict)
     return conv_dict
 
 @router.put("/conversations/{conv_id}", response_model=Conversation)
@@ -249,12 +224,8 @@ def update_conversation(conv_id: str, conv: Conversation):
         Raises:
             HTTPException: Si la conversation n'existe pas
     """
-    convs = load_conversations()
-    for i, c in enumerate(convs):
-        if c["id"] == conv_id:
-            convs[i] = conv.dict()
-            save_conversations(convs)
-            return conv
+    if conversation_store.replace_conversation(conv_id, conv.dict()):
+        return conv
     raise HTTPException(status_code=404, detail="Conversation not found")
 
 @router.delete("/conversations/{conv_id}", status_code=204)
@@ -267,11 +238,8 @@ def delete_conversation(conv_id: str):
         Raises:
             HTTPException: Si la conversation n'existe pas
     """
-    convs = load_conversations()
-    updated_convs = [conv for conv in convs if conv["id"] != conv_id]
-    if len(convs) == len(updated_convs):
+    if not conversation_store.delete_conversation(conv_id):
         raise HTTPException(status_code=404, detail="Conversation non trouvée")
-    save_conversations(updated_convs)
     return
 
 @router.post("/conversations/{conv_id}/messages")
@@ -288,129 +256,145 @@ def update_message(conv_id: str, message: MessageUpdate = Body(...)):
         Raises:
             HTTPException: Si la conversation n'existe pas
     """
-    convs = load_conversations()
-    for i, conv in enumerate(convs):
-        if conv["id"] == conv_id:
-            messages = conv.get("messages", [])
-
-            if message.delete:
-                new_messages = [m for m in messages if m["id"] != message.id]
-                convs[i]["messages"] = new_messages
-                save_conversations(convs)
-                return {"status": "deleted", "message_id": message.id}
-
-            found = False
-            for j, m in enumerate(messages):
-                if m["id"] == message.id:
-                    updated_msg = m.copy()
-                    if message.sender is not None:
-                        updated_msg["sender"] = message.sender
-                    if message.text is not None:
-                        updated_msg["text"] = message.text
-                    if message.type is not None:
-                        updated_msg["type"] = message.type
-                    if message.fileName is not None:
-                        updated_msg["fileName"] = message.fileName
-                    if message.fileUrl is not None:
-                        updated_msg["fileUrl"] = message.fileUrl
-                    if message.sources is not None:
-                        updated_msg["sources"] = [s.dict() if isinstance(s, Source) else s for s in message.sources]
-                    if message.isLoading is not None:
-                        updated_msg["isLoading"] = message.isLoading
-                    convs[i]["messages"][j] = updated_msg
-                    found = True
-                    break
-
-            if not found:
-                new_msg = message.dict(exclude={"delete"})
-                convs[i]["messages"].append(new_msg)
-
-            save_conversations(convs)
-            return {"status": "updated_or_added", "message_id": message.id}
+    if message.delete:
+        if not conversation_store.delete_message(conv_id, message.id):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return {"status": "deleted", "message_id": message.id}
 
-    raise HTTPException(status_code=404, detail="Conversation not found")
+    changes = {}
+    for field in ("sender", "text", "type", "fileName", "fileUrl", "isLoading"):
+        value = getattr(message, field)
+        if value is not None:
+            changes[field] = value
+    if message.sources is not None:
+        changes["sources"] = [s.dict() if isinstance(s, Source) else s for s in message.sources]
+
+    if not conversation_store.upsert_message(conv_id, message.id, changes, message.dict(exclude={"delete"})):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"status": "updated_or_added", "message_id": message.id}
 
-def load_documents_by_extension(file_path: str) -> List[Document]:
-    """Charge des documents selon leur extension.
+def context_token_counts(documents: List[Document], db: Chroma) -> List[int]:
+    """Retourne le nombre de tokens de chaque chunk pour le budget de contexte.
+
+        Lit le compte enregistré à l'indexation ; les chunks indexés avant
+        l'introduction de ce compte sont mesurés puis complétés dans Chroma.
 
         Args:
-            file_path (str): Chemin du fichier
+            documents (List[Document]): Chunks retenus après reranking
+            db (Chroma): Base d'où proviennent les chunks
 
         Returns:
-            List[Document]: Documents chargés
+            List[int]: Nombre de tokens par chunk
+    """
+    counts = []
+    backfill_ids, backfill_metadatas = [], []
+    for doc in documents:
+        token_count = doc.metadata.get(TOKEN_COUNT_KEY)
+        if token_count is None:
+            token_count = len(tokenizer.encode(doc.page_content))
+            doc.metadata[TOKEN_COUNT_KEY] = token_count
+            if doc.metadata.get("id"):
+                backfill_ids.append(doc.metadata["id"])
+                backfill_metadatas.append(doc.metadata)
+        counts.append(token_count)
+
+    if backfill_ids:
+        try:
+            db._collection.update(ids=backfill_ids, metadatas=backfill_metadatas)
+            print(f"[CTX] Compte de tokens complété pour {len(backfill_ids)} chunk(s)")
+        except Exception as e:
+            print(f"[CTX] Erreur lors du complément des comptes de tokens : {e}")
+    return counts
+
+def find_loading_bot_message(conv_id: str) -> Optional[int]:
+    """Retrouve le message du bot en cours de chargement dans une conversation.
 
-        Raises:
-            HTTPException: Si le format n'est pas supporté
+        Args:
+            conv_id (str): ID de la conversation
+
+        Returns:
+            Optional[int]: ID du message ou None
     """
-    ext = os.path.splitext(file_path)[-1].lower()
-    if ext == ".pdf":
-        return PyPDFLoader(file_path).load()
-    elif ext == ".docx":
-        return UnstructuredWordDocumentLoader(file_path).load()
-    elif ext in [".xls", ".xlsx"]:
-        return UnstructuredExcelLoader(file_path).load()
-    elif ext == ".pptx":
-        return UnstructuredPowerPointLoader(file_path).load()
-    else:
-        raise HTTPException(status_code=400, detail=f"Format de fichier non supporté : {ext}")
+    conv = conversation_store.get_conversation(conv_id)
+    if conv:
+        for msg in reversed(conv["messages"]):
+            if msg["sender"] == "bot" and msg.get("isLoading", False):
+                return msg["id"]
+    return None
 
-def calculate_chunk_ids(chunks: List[Document]) -> List[Document]:
-    """Calcule des IDs uniques pour chaque chunk.
+async def replay_cached_answer(entry: dict, total_start: float):
+    """Rejoue une réponse en cache au même format NDJSON que la génération.
 
         Args:
-            chunks (List[Document]): Chunks à traiter
+            entry (dict): Entrée du cache de réponses
+            total_start (float): Début du traitement de la requête
 
-        Returns:
-            List[Document]: Chunks avec IDs ajoutés
+        Yields:
+            str: Lignes JSON de réponse puis de sources
     """
-    last_page_id = None
-    current_chunk_index = 0
+    try:
+        for fragment in entry["fragments"]:
+            yield json.dumps({"response": fragment}) + "\n"
+        if entry["sources"]:
+            yield json.dumps({"sources": entry["sources"]}) + "\n"
+    finally:
+        print(f"[CACHE] Réponse rejouée depuis le cache en {time.time() - total_start:.2f}s")
 
-    for chunk in chunks:
-        source = chunk.metadata.get("source")
-        page = chunk.metadata.get("page")
-        current_page_id = f"{source}:{page}"
+def fetch_chunks(db: Chroma, chunk_ids: List[str]) -> dict:
+    """Récupère des chunks de Chroma par ID.
 
-        if current_page_id == last_page_id:
-            current_chunk_index += 1
-        else:
-            current_chunk_index = 0
+        Args:
+            db (Chroma): Base vectorielle
+            chunk_ids (List[str]): IDs à récupérer
 
-        chunk.metadata["id"] = f"{current_page_id}:{current_chunk_index}"
-        last_page_id = current_page_id
+        Returns:
+            dict: ID -> Document
+    """
+    found = db.get(ids=chunk_ids, include=["documents", "metadatas"])
+    return {
+        chunk_id: Document(page_content=text or "", metadata=metadata or {})
+        for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+    }
 
-    return chunks
+async def hybrid_search(db: Chroma, vector_query: str, lexical_query: str, sources: Optional[List[str]] = None,
+                        vector_k: int = VECTOR_K, lexical_k: int = LEXICAL_K,
+                        candidates: int = RERANK_CANDIDATES) -> list:
+    """Combine recherche vectorielle (Chroma) et lexicale (BM25) par Reciprocal Rank Fusion.
 
-def process_documents(documents: List[Document], db: Chroma):
-    """Traite et indexe des documents dans ChromaDB.
+        Les deux recherches sont lancées en parallèle ; les chunks trouvés uniquement
+        par l'index lexical sont récupérés dans Chroma.
 
         Args:
-            documents (List[Document]): Documents à traiter
-            db (Chroma): Base de données cible
+            db (Chroma): Base vectorielle
+            vector_query (str): Requête pour la recherche vectorielle
+            lexical_query (str): Requête pour la recherche lexicale (identifiants conservés)
+            sources (Optional[List[str]]): Documents auxquels limiter la recherche
+            vector_k (int): Nombre de résultats vectoriels
+            lexical_k (int): Nombre de résultats lexicaux
+            candidates (int): Nombre de candidats fusionnés transmis au reranking
 
         Returns:
-            dict: Résultat du traitement
+            list: (Document, score RRF) par score décroissant
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-        length_function=lambda text: len(tokenizer.encode(text)),
-        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]  # Better sentence splitting
+    chroma_filter = {"source": {"$in": sources}} if sources else None
+    vector_results, lexical_results = await asyncio.gather(
+        retrieval_pipeline.run("search", db.similarity_search_with_score, vector_query, k=vector_k, filter=chroma_filter),
+        retrieval_pipeline.run("search", lexical_index.search, lexical_query, lexical_k, sources),
     )
 
-    chunks = splitter.split_documents(documents)
-    chunks = calculate_chunk_ids(chunks)
-    existing = db.get(include=[])
-    existing_ids = set(existing["ids"])
-    new_chunks = [chunk for chunk in chunks if chunk.metadata["id"] not in existing_ids]
-
-    if new_chunks:
-        ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=ids)
-        db.persist()
-        return {"message": f"{len(new_chunks)} new chunks added."}
-    else:
-        return {"message": "No new chunks to add."}
+    docs = {doc.metadata.get("id"): doc for doc, _ in vector_results if doc.metadata.get("id")}
+    fused = reciprocal_rank_fusion([
+        [doc.metadata.get("id") for doc, _ in vector_results if doc.metadata.get("id")],
+        [chunk_id for chunk_id, _ in lexical_results],
+    ])[:candidates]
+
+    missing = [chunk_id for chunk_id, _ in fused if chunk_id not in docs]
+    if missing:
+        docs.update(await retrieval_pipeline.run("search", fetch_chunks, db, missing))
+
+    print(f"[HYBRID] {len(vector_results)} résultat(s) vectoriel(s), {len(lexical_results)} lexical(aux), "
+          f"{len(fused)} candidat(s) fusionné(s) dont {len(missing)} uniquement lexical(aux)")
+    return [(docs[chunk_id], score) for chunk_id, score in fused if chunk_id in docs]
 
 @router.post("/query-by-filename")
 async def query_by_filename(request: QueryRequest):
@@ -430,33 +414,44 @@ async def query_by_filename(request: QueryRequest):
     if not request.query_text or not request.conversation_id:
         raise HTTPException(status_code=400, detail="Incomplete request")
 
-    convs = load_conversations()
+    conv = conversation_store.get_conversation(request.conversation_id)
     last_file = None
-    for conv in convs:
-        if conv["id"] == request.conversation_id:
-            for msg in reversed(conv["messages"]):
-                if msg.get("fileUrl"):
-                    last_file = msg["fileUrl"].split("/")[-1]
-                    break
+    if conv:
+        for msg in reversed(conv["messages"]):
+            if msg.get("fileUrl"):
+                last_file = msg["fileUrl"].split("/")[-1]
+                break
 
     if not last_file:
         raise HTTPException(status_code=400, detail="No file selected")
 
+    file_source = f"uploads\{last_file}"
+    cache_key = answer_cache.make_key("file", request.query_text, [file_source])
+    cached = answer_cache.get(cache_key)
+    if cached:
+        message_id = find_loading_bot_message(request.conversation_id)
+        if message_id and cached["docs_with_sources"]:
+            save_context_docs_to_message(request.conversation_id, message_id, cached["docs_with_sources"])
+        return StreamingResponse(replay_cached_answer(cached, total_start), media_type="text/plain")
+
     try:
         chroma_start = time.time()
-        chroma_filter = {"source": {"$eq": f"uploads\{last_file}"}}
-        docs_with_scores = db_permanent.similarity_search_with_score(
+        docs_with_scores = await hybrid_search(
+            db_permanent,
+            request.query_text,
             request.query_text,
-            k=10,
-            filter=chroma_filter
+            sources=[file_source],
+            vector_k=10,
+            lexical_k=10,
+            candidates=10
         )
 
-        print(f"[CHROMA] Recherche filtrée terminée en {time.time() - chroma_start:.2f}s - {len(docs_with_scores)} résultats trouvés")
+        print(f"[CHROMA] Recherche hybride filtrée terminée en {time.time() - chroma_start:.2f}s - {len(docs_with_scores)} résultats trouvés")
 
         rerank_start = time.time()
         if docs_with_scores:
             pairs = [(request.query_text, doc.page_content) for doc, _ in docs_with_scores]
-            rerank_scores = cross_encoder.predict(pairs)
+            rerank_scores = await rerank_batcher.score(pairs)
 
             combined_results = list(zip(
                 [doc for doc, _ in docs_with_scores],
@@ -476,8 +471,11 @@ async def query_by_filename(request: QueryRequest):
         context_tokens = 0
         context_texts = []
 
-        for doc, rerank_score, original_score in top_results:
-            doc_tokens = len(tokenizer.encode(doc.page_content))
+        token_counts = await retrieval_pipeline.run(
+            "tokenize", context_token_counts, [doc for doc, _, _ in top_results], db_permanent
+        )
+
+        for (doc, rerank_score, original_score), doc_tokens in zip(top_results, token_counts):
             if context_tokens + doc_tokens <= 1500:
                 context_texts.append(doc.page_content)
                 context_tokens += doc_tokens
@@ -503,63 +501,49 @@ async def query_by_filename(request: QueryRequest):
         async def event_stream():
             llm_start = time.time()
             response_started = False
-            message_id = None
-
-            if request.conversation_id:
-                for conv in convs:
-                    if conv["id"] == request.conversation_id:
-                        for msg in reversed(conv["messages"]):
-                            if msg["sender"] == "bot" and msg.get("isLoading", False):
-                                message_id = msg["id"]
-                                break
-
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                try:
-                    async with client.stream(
-                        "POST",
-                        "http://localhost:11434/api/generate",
-                        json={
-                            "model": "llama3.2:3b-instruct-q4_K_M",
-                            "prompt": prompt,
-                            "stream": True,
-                            "options": {
-                                "num_ctx": 2048,
-                                "temperature": 0.3,
-                                "top_k": 20,
-                                "num_predict": 300
-                            }
-                        }
-                    ) as response:
-                        async for line in response.aiter_lines():
-                            if line.strip():
-                                try:
-                                    data = json.loads(line)
-                                    if "response" in data:
-                                        yield json.dumps({"response": data["response"]}) + "\n"
-                                        response_started = True
-                                except json.JSONDecodeError:
-                                    continue
-
-                    if response_started and docs_with_sources:
-                        sources = [{
-                            "source": os.path.basename(doc["metadata"].get("source", "")),
-                            "page": doc["metadata"].get("page"),
-                            "id": doc["metadata"].get("id"),
-                            "score": doc["score"],
-                            "original_score": doc.get("original_score", 0)
-                        } for doc in docs_with_sources]
-
-                        yield json.dumps({"sources": sources}) + "\n"
-
-                        if request.conversation_id and message_id:
-                            save_context_docs_to_message(
-                                request.conversation_id,
-                                message_id,
-                                docs_with_sources
-                            )
-
-                finally:
-                    print(f"[TOTAL] Temps total : {time.time() - total_start:.2f}s")
+            fragments = []
+            message_id = find_loading_bot_message(request.conversation_id)
+
+            try:
+                async for data in ollama_client.stream_generate({
+                    "model": LLM_MODEL,
+                    "prompt": prompt,
+                    "options": {
+                        "num_ctx": 2048,
+                        "temperature": 0.3,
+                        "top_k": 20,
+                        "num_predict": 300
+                    }
+                }):
+                    if "response" in data:
+                        yield json.dumps({"response": data["response"]}) + "\n"
+                        fragments.append(data["response"])
+                        response_started = True
+
+                sources = []
+                if response_started and docs_with_sources:
+                    sources = [{
+                        "source": os.path.basename(doc["metadata"].get("source", "")),
+                        "page": doc["metadata"].get("page"),
+                        "id": doc["metadata"].get("id"),
+                        "score": doc["score"],
+                        "original_score": doc.get("original_score", 0)
+                    } for doc in docs_with_sources]
+
+                    yield json.dumps({"sources": sources}) + "\n"
+
+                    if request.conversation_id and message_id:
+                        save_context_docs_to_message(
+                            request.conversation_id,
+                            message_id,
+                            docs_with_sources
+                        )
+
+                if response_started:
+                    answer_cache.put(cache_key, fragments, sources, docs_with_sources)
+
+            finally:
+                print(f"[TOTAL] Temps total : {time.time() - total_start:.2f}s")
 
         return StreamingResponse(event_stream(), media_type="text/plain")
 
@@ -581,12 +565,12 @@ async def stream_query(request: QueryRequest):
     """
     return await stream_query_with_db(request, db_permanent)
 
-def extract_metadata_from_query(query: str, llama_model: Ollama) -> dict:
+def extract_metadata_from_query(query: str, llama_model: PooledOllamaLLM) -> dict:
     """Extrait les métadonnées potentielles d'une requête utilisateur.
 
         Args:
             query (str): Requête utilisateur
-            llama_model (Ollama): Modèle LLM pour l'extraction
+            llama_model (PooledOllamaLLM): Modèle LLM pour l'extraction
 
         Returns:
             dict: Métadonnées extraites
@@ -649,36 +633,31 @@ def extract_metadata_from_query(query: str, llama_model: Ollama) -> dict:
         }
 
 
-def filtrer_documents_par_metadonnees(documents, metadata):
+query_metadata_extractor = QueryMetadataExtractor(
+    query_gazetteer,
+    nlp_model=nlp_model,
+    llm_fallback=lambda query: extract_metadata_from_query(query, model)
+)
+
+
+def filtrer_documents_par_metadonnees(metadata):
     """Filtre les documents selon leurs métadonnées.
 
+        S'appuie sur l'index inversé résident plutôt que sur un parcours
+        du fichier de métadonnées.
+
         Args:
-            documents (List[tuple]): Liste de (filename, metadata)
             metadata (dict): Critères de filtrage
 
         Returns:
-            List[str]: Chemins des documents correspondants
+            List[str]: Chemins des documents correspondants (vide si aucun critère)
     """
     print("[FILTER] Filtrage avec métadonnées :", metadata)
 
-    metadata_filtree = {k: v for k, v in metadata.items() if v and str(v).lower() != 'null'}
-
-    if not metadata_filtree:
-        print("[FILTER] Aucune métadonnée valide → retour de tous les documents")
-        return documents
+    filter_start = time.time()
+    documents_filtrés = metadata_index.filter(metadata)
 
-    documents_filtrés = []
-    for doc in documents:
-        filename, meta = doc
-        match_trouve = False
-        for key, value in metadata_filtree.items():
-            if key in meta and value.lower() in str(meta[key]).lower():
-                match_trouve = True
-                break
-        if match_trouve:
-            documents_filtrés.append(os.path.join("uploads", filename))
-
-    print(f"[FILTER] Documents correspondants : {len(documents_filtrés)}")
+    print(f"[FILTER] Documents correspondants : {len(documents_filtrés)} en {(time.time() - filter_start) * 1000:.2f}ms")
     return documents_filtrés
 
 
@@ -719,34 +698,37 @@ async def stream_query_with_db(request: QueryRequest, db: Chroma):
     print(f"\n[START] Traitement de la requête : {request.query_text}")
 
     metadata_start = time.time()
-    query_metadata = extract_metadata_from_query(request.query_text, model) if db == db_permanent else None
+    query_metadata = None
+    if db == db_permanent:
+        query_metadata = await retrieval_pipeline.run("metadata", query_metadata_extractor.extract, request.query_text)
     print(f"[META] Extraction terminée en {time.time() - metadata_start:.2f}s → {query_metadata}")
 
     filtered_files = []
     if query_metadata:
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
-            DOC_METADATA = json.load(f)
-        filtered_files = filtrer_documents_par_metadonnees(DOC_METADATA.items(), query_metadata)
+        filtered_files = filtrer_documents_par_metadonnees(query_metadata)
+
+    cache_key = answer_cache.make_key("general", request.query_text, filtered_files)
+    cached = answer_cache.get(cache_key)
+    if cached:
+        return StreamingResponse(replay_cached_answer(cached, total_start), media_type="text/plain")
 
     search_query = remove_metadata_keywords_from_query(request.query_text, query_metadata or {})
 
     chroma_start = time.time()
-    k_initial = 20
 
-    chroma_filter = {}
     if filtered_files:
-        chroma_filter = {"source": {"$in": filtered_files}}
         print(f"[META] Recherche limitée à {len(filtered_files)} document(s).")
     else:
         print("[META] ⚠ Aucun document trouvé avec ces métadonnées, recherche sur toute la base.")
 
-    print(f"[CHROMA] Recherche vectorielle (k={k_initial}) avec filtre : {chroma_filter}")
+    print(f"[CHROMA] Recherche hybride (vecteurs k={VECTOR_K}, BM25 k={LEXICAL_K}, {RERANK_CANDIDATES} candidats)")
 
     try:
-        results = db.similarity_search_with_score(
+        results = await hybrid_search(
+            db,
             search_query,
-            k=k_initial,
-            filter=chroma_filter if chroma_filter else None  # Utilisez 'filter' au lieu de 'where'
+            request.query_text,
+            sources=filtered_files or None
         )
     except Exception as e:
         print(f"[ERROR] Erreur lors de la recherche Chroma: {str(e)}")
@@ -759,7 +741,7 @@ async def stream_query_with_db(request: QueryRequest, db: Chroma):
     print(f"[RERANK] {len(pairs)} paires préparées pour reranking.")
 
     if pairs:
-        rerank_scores = cross_encoder.predict(pairs)
+        rerank_scores = await rerank_batcher.score(pairs)
         combined_results = list(zip(
             [doc for doc, _ in results],
             rerank_scores,
@@ -792,8 +774,11 @@ async def stream_query_with_db(request: QueryRequest, db: Chroma):
     Réponse :
     """
 
-    for doc, rerank_score, original_score in top_results:
-        doc_tokens = len(tokenizer.encode(doc.page_content))
+    token_counts = await retrieval_pipeline.run(
+        "tokenize", context_token_counts, [doc for doc, _, _ in top_results], db
+    )
+
+    for (doc, rerank_score, original_score), doc_tokens in zip(top_results, token_counts):
         if context_tokens + doc_tokens <= 1500:
             context_texts.append(doc.page_content)
             context_tokens += doc_tokens
@@ -817,51 +802,44 @@ async def stream_query_with_db(request: QueryRequest, db: Chroma):
     async def event_stream():
         llm_start = time.time()
         print(f"[LLM] Envoi du prompt au modèle (streaming)...")
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                async with client.stream(
-                        "POST",
-                        "http://localhost:11434/api/generate",
-                        json={
-                            "model": "llama3.2:3b-instruct-q4_K_M",
-                            "prompt": prompt,
-                            "stream": True,
-                            "options": {
-                                "temperature": 0.3,
-                                "num_ctx": 2048,
-                                "top_k": 20,
-                                "num_predict": 300
-                            }
-                        }
-                ) as response:
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                data = json.loads(line)
-                                if "response" in data:
-                                    yield json.dumps({"response": data["response"]}) + "\n"
-                            except json.JSONDecodeError:
-                                continue
-
-                if docs_with_sources:
-                    sources = []
-                    for doc in docs_with_sources:
-                        meta = doc["metadata"]
-                        sources.append({
-                            "source": os.path.basename(meta.get("source", "")),
-                            "page": meta.get("page"),
-                            "id": meta.get("id"),
-                            "score": doc["score"],
-                            "original_score": doc["original_score"]
-                        })
-                    print(f"[SOURCES] Sources envoyées : {sources}")
-                    yield json.dumps({"sources": sources}) + "\n"
-
-            except Exception as e:
-                print(f"[ERROR] {str(e)}")
-                yield json.dumps({"error": f"Erreur: {str(e)}"}) + "\n"
-            finally:
-                print(f"[END] Temps total de traitement : {time.time() - total_start:.2f}s")
+        fragments = []
+        try:
+            async for data in ollama_client.stream_generate({
+                "model": LLM_MODEL,
+                "prompt": prompt,
+                "options": {
+                    "temperature": 0.3,
+                    "num_ctx": 2048,
+                    "top_k": 20,
+                    "num_predict": 300
+                }
+            }):
+                if "response" in data:
+                    yield json.dumps({"response": data["response"]}) + "\n"
+                    fragments.append(data["response"])
+
+            sources = []
+            if docs_with_sources:
+                for doc in docs_with_sources:
+                    meta = doc["metadata"]
+                    sources.append({
+                        "source": os.path.basename(meta.get("source", "")),
+                        "page": meta.get("page"),
+                        "id": meta.get("id"),
+                        "score": doc["score"],
+                        "original_score": doc["original_score"]
+                    })
+                print(f"[SOURCES] Sources envoyées : {sources}")
+                yield json.dumps({"sources": sources}) + "\n"
+
+            if fragments:
+                answer_cache.put(cache_key, fragments, sources, docs_with_sources)
+
+        except Exception as e:
+            print(f"[ERROR] {str(e)}")
+            yield json.dumps({"error": f"Erreur: {str(e)}"}) + "\n"
+        finally:
+            print(f"[END] Temps total de traitement : {time.time() - total_start:.2f}s")
 
     return StreamingResponse(event_stream(), media_type="text/plain")
 
@@ -1,6 +1,8 @@
 import time
 from fastapi import APIRouter, HTTPException, Body, Form, File, UploadFile, Query
 import os, shutil
+from ingestion_queue import ingestion_queue, PRIORITY_UPLOAD, PRIORITY_BULK
+from upload_storage import save_upload, resolve_upload_path
 
 router = APIRouter()
 BASE_DIR = os.path.abspath("uploads")
@@ -223,14 +225,17 @@ async def upload_file(
 
         Returns:
             dict: Nom du fichier uploadé
+
+        Raises:
+            HTTPException: 400 si le chemin sort du dossier d'uploads
     """
-    target_dir = os.path.join(BASE_DIR, path, os.path.dirname(relative_path))  # correction ici
-    os.makedirs(target_dir, exist_ok=True)
-    target_file = os.path.join(target_dir, file.filename)
+    try:
+        target_file = resolve_upload_path(BASE_DIR, path, os.path.dirname(relative_path), file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ingestion_queue.hint(target_file, PRIORITY_UPLOAD)
 
-    with open(target_file, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    await save_upload(file, target_file)
 
     return {"filename": relative_path or file.filename}
 
@@ -249,13 +254,16 @@ async def upload_folder(
 
         Returns:
             dict: Statut et chemin du fichier
-    """
-    target_dir = os.path.join(BASE_DIR, path, os.path.dirname(relative_path))
-    os.makedirs(target_dir, exist_ok=True)
 
-    target_file_path = os.path.join(target_dir, os.path.basename(relative_path))
-    with open(target_file_path, "wb") as buffer:
-        buffer.write(await file.read())
+        Raises:
+            HTTPException: 400 si le chemin sort du dossier d'uploads
+    """
+    try:
+        target_file_path = resolve_upload_path(BASE_DIR, path, relative_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ingestion_queue.hint(target_file_path, PRIORITY_BULK)
+    await save_upload(file, target_file_path)
 
     return {"status": "uploaded", "path": target_file_path}
 
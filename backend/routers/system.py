@@ -0,0 +1,112 @@
+from fastapi import APIRouter
+from routers import chat
+from ollama_client import ollama_client
+from retrieval_pipeline import retrieval_pipeline
+from answer_cache import answer_cache
+import watcher
+from ingestion_queue import ingestion_queue
+from page_text_cache import page_text_cache
+from metadata_stage import metadata_stage
+
+router = APIRouter()
+
+@router.get("/embedding-cache")
+def get_embedding_cache_stats():
+    """Retourne les compteurs du cache d'embeddings des requêtes.
+
+        Returns:
+            dict: Hits mémoire/disque, misses, taux de succès et nombre d'entrées
+    """
+    return chat.embedding_function.stats()
+
+@router.get("/rerank")
+def get_rerank_stats():
+    """Retourne les compteurs du regroupement des appels au cross-encoder.
+
+        Returns:
+            dict: Paramètres et statistiques des lots de reranking
+    """
+    return chat.rerank_batcher.stats()
+
+@router.get("/ollama")
+def get_ollama_pool_stats():
+    """Retourne les métriques du client HTTP partagé vers Ollama.
+
+        Returns:
+            dict: Requêtes totales, en cours, en erreur et état des pools de connexions
+    """
+    return ollama_client.stats()
+
+@router.get("/retrieval")
+def get_retrieval_pipeline_stats():
+    """Retourne l'occupation des pools du pipeline de recherche du chat.
+
+        Returns:
+            dict: Pour chaque étape, tâches en cours, en attente et terminées
+    """
+    return retrieval_pipeline.stats()
+
+@router.get("/answer-cache")
+def get_answer_cache_stats():
+    """Retourne les compteurs du cache de réponses du chat.
+
+        Returns:
+            dict: Hits, misses, nombre d'entrées et génération de l'index
+    """
+    return answer_cache.stats()
+
+@router.get("/embedding")
+def get_embedding_stage_stats():
+    """Retourne la configuration et le débit de l'étape d'embedding de l'ingestion.
+
+        Returns:
+            dict: Taille des lots, parallélisme, reprises et débit en chunks/s
+    """
+    return watcher.embedding_stage.stats()
+
+@router.get("/ingestion")
+def get_ingestion_queue_stats():
+    """Retourne l'état de la file d'ingestion des fichiers.
+
+        Returns:
+            dict: Profondeur de la file par priorité, fichiers en cours, retard et compteurs
+    """
+    return ingestion_queue.stats()
+
+@router.get("/reconciliation")
+def get_reconciliation_report():
+    """Retourne le rapport de la réconciliation du dossier d'uploads effectuée au démarrage.
+
+        Returns:
+            dict: Durée, fichiers nouveaux, modifiés et supprimés retraités
+    """
+    return watcher.last_reconciliation
+
+@router.get("/watcher")
+def get_watcher_stats():
+    """Retourne l'état du regroupement des événements du watcher.
+
+        Returns:
+            dict: Fichiers en attente de stabilisation et compteurs d'événements
+    """
+    if watcher.event_coalescer is None:
+        return {"status": "not_started"}
+    return watcher.event_coalescer.stats()
+
+@router.get("/page-text-cache")
+def get_page_text_cache_stats():
+    """Retourne l'état du cache disque du texte extrait des pages (pdfplumber, OCR, PyPDF).
+
+        Returns:
+            dict: Nombre d'entrées, taille, évictions et compteurs du processus de l'API
+    """
+    return page_text_cache.stats()
+
+@router.get("/metadata")
+def get_metadata_stage_stats():
+    """Retourne l'état de l'étape différée d'extraction des métadonnées par LLM.
+
+        Returns:
+            dict: Extractions en attente et en cours, compteurs et durée moyenne d'un appel
+    """
+    return metadata_stage.stats()
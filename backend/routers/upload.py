@@ -1,10 +1,22 @@
 from datetime import datetime
 import json
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body
+import re
+import asyncio
+import zipfile
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Body, Header, Request
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import os
 from starlette.responses import FileResponse
+from query_metadata import query_gazetteer
+from metadata_index import metadata_index
+from document_metadata import document_metadata
+from ingestion_queue import ingestion_queue, PRIORITY_UPLOAD, PRIORITY_BULK
+from metadata_stage import metadata_stage
+from upload_storage import (
+    save_upload, resolve_upload_path, plan_zip_extraction, extract_zip_entries, upload_sessions, UploadOffsetError,
+    UPLOAD_CHUNK_SIZE
+)
 
 router = APIRouter()
 
@@ -12,6 +24,23 @@ UPLOAD_DIR = "uploads"
 METADATA_FILE = "documents_metadata.json"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class UploadSessionRequest(BaseModel):
+    """Modèle Pydantic pour l'ouverture d'une session d'upload reprenable.
+
+        Attributes:
+            relative_path (str): Chemin du fichier relatif au dossier de destination
+            size (int): Taille totale du fichier (octets)
+            sha256 (Optional[str]): Empreinte attendue, vérifiée à la finalisation (sinon à fournir à la finalisation)
+            path (str): Dossier de destination relatif au dossier d'uploads
+    """
+    relative_path: str
+    size: int
+    sha256: Optional[str] = None
+    path: str = ""
+
 
 class MetadataResponse(BaseModel):
     """Modèle Pydantic pour la réponse des métadonnées.
@@ -101,11 +130,16 @@ async def upload_file(file: UploadFile = File(...)):
 
         Returns:
             dict: Dictionnaire avec le nom du fichier uploadé
+
+        Raises:
+            HTTPException: 400 si le nom du fichier sort du dossier d'uploads
     """
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_location, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    try:
+        file_location = resolve_upload_path(UPLOAD_DIR, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ingestion_queue.hint(file_location, PRIORITY_UPLOAD)
+    await save_upload(file, file_location)
     return {"filename": file.filename}
 
 @router.post("/folder")
@@ -123,22 +157,264 @@ async def upload_folder(
             dict: Dictionnaire avec le chemin relatif du fichier
 
         Raises:
-            HTTPException: 400 si le chemin relatif est manquant
+            HTTPException: 400 si le chemin relatif est manquant ou sort du dossier d'uploads
 
     """
     if not relative_path:
         raise HTTPException(status_code=400, detail="Le chemin relatif est manquant")
 
-    full_dir = os.path.join(UPLOAD_DIR, os.path.dirname(relative_path))
-    os.makedirs(full_dir, exist_ok=True)
-
-    file_location = os.path.join(UPLOAD_DIR, relative_path)
-    with open(file_location, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    try:
+        file_location = resolve_upload_path(UPLOAD_DIR, relative_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ingestion_queue.hint(file_location, PRIORITY_BULK)
+    await save_upload(file, file_location)
 
     return {"relative_path": relative_path}
 
+@router.post("/batch")
+async def upload_files(
+        files: List[UploadFile] = File(...),
+        relative_paths: List[str] = Form(default=[]),
+        path: str = Form(default="")
+):
+    """Upload plusieurs fichiers en une requête, chacun écrit par blocs.
+
+        Args:
+            files (List[UploadFile]): Fichiers à uploader
+            relative_paths (List[str]): Chemins relatifs des fichiers, dans le même ordre
+                (par défaut leur nom)
+            path (str): Dossier de destination relatif au dossier d'uploads
+
+        Returns:
+            dict: Chemin relatif, taille et empreinte SHA-256 de chaque fichier
+
+        Raises:
+            HTTPException: 400 si les chemins ne correspondent pas aux fichiers ou sortent du dossier d'uploads
+    """
+    if relative_paths and len(relative_paths) != len(files):
+        raise HTTPException(status_code=400, detail="Un chemin relatif est attendu par fichier")
+    try:
+        destinations = [
+            resolve_upload_path(UPLOAD_DIR, path, relative_paths[i] if relative_paths else file.filename)
+            for i, file in enumerate(files)
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    priority = PRIORITY_UPLOAD if len(files) == 1 else PRIORITY_BULK
+    uploaded = []
+    for file, destination in zip(files, destinations):
+        ingestion_queue.hint(destination, priority)
+        saved = await save_upload(file, destination)
+        uploaded.append({
+            "relative_path": os.path.relpath(destination, os.path.abspath(UPLOAD_DIR)),
+            "size": saved["size"],
+            "sha256": saved["sha256"]
+        })
+    return {"files": uploaded}
+
+@router.post("/archive")
+async def upload_archive(
+        file: UploadFile = File(...),
+        path: str = Form(default="")
+):
+    """Upload une archive ZIP et extrait ses fichiers dans le dossier d'uploads.
+
+        Les entrées sont extraites une à une, par blocs ; celles dont le chemin
+        sortirait du dossier de destination sont ignorées.
+
+        Args:
+            file (UploadFile): Archive ZIP
+            path (str): Dossier de destination relatif au dossier d'uploads
+
+        Returns:
+            dict: Fichiers extraits (chemin relatif, taille, empreinte) et entrées ignorées
+
+        Raises:
+            HTTPException: 400 si le fichier n'est pas une archive ZIP valide ou si le dossier est invalide
+    """
+    try:
+        root = resolve_upload_path(UPLOAD_DIR, path) if path else os.path.abspath(UPLOAD_DIR)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        with zipfile.ZipFile(file.file) as archive:
+            entries, skipped = plan_zip_extraction(archive, root)
+            for _, destination in entries:
+                ingestion_queue.hint(destination, PRIORITY_BULK)
+            saved = await asyncio.to_thread(extract_zip_entries, archive, entries)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Archive ZIP invalide")
+
+    return {
+        "files": [
+            {
+                "relative_path": os.path.relpath(item["path"], os.path.abspath(UPLOAD_DIR)),
+                "size": item["size"],
+                "sha256": item["sha256"]
+            }
+            for item in saved
+        ],
+        "skipped": skipped
+    }
+
+
+def session_response(session: dict) -> dict:
+    """Formate une session d'upload pour la réponse (chemin relatif au dossier d'uploads).
+
+        Args:
+            session (dict): Session de `upload_sessions`
+
+        Returns:
+            dict: Identifiant, chemin relatif, taille, octets reçus et taille de bloc conseillée
+    """
+    return {
+        "session_id": session["session_id"],
+        "relative_path": os.path.relpath(session["destination"], os.path.abspath(UPLOAD_DIR)),
+        "size": session["size"],
+        "offset": session["offset"],
+        "chunk_size": UPLOAD_CHUNK_SIZE
+    }
+
+@router.post("/sessions")
+async def create_upload_session(request: UploadSessionRequest):
+    """Ouvre une session d'upload reprenable pour un gros fichier.
+
+        Le client envoie ensuite le fichier par plages (`PUT /sessions/{id}`),
+        peut demander la position reçue après une coupure (`GET /sessions/{id}`)
+        puis finalise (`POST /sessions/{id}/finalize`). Les données partielles
+        restent hors du dossier surveillé jusqu'à la finalisation.
+
+        Args:
+            request (UploadSessionRequest): Chemin, taille et empreinte attendue du fichier
+
+        Returns:
+            dict: Session ouverte (identifiant, octets reçus, taille de bloc conseillée)
+
+        Raises:
+            HTTPException: 400 si le chemin ou la taille est invalide
+    """
+    if request.size < 0:
+        raise HTTPException(status_code=400, detail="Taille de fichier invalide")
+    try:
+        destination = resolve_upload_path(UPLOAD_DIR, request.path, request.relative_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session = await asyncio.to_thread(upload_sessions.create, destination, request.size, request.sha256)
+    return session_response(session)
+
+@router.get("/sessions/{session_id}")
+async def get_upload_session(session_id: str):
+    """Retourne le nombre d'octets déjà reçus pour une session (reprise après coupure).
+
+        Args:
+            session_id (str): Identifiant de la session
+
+        Returns:
+            dict: Session (identifiant, chemin relatif, taille, octets reçus)
+
+        Raises:
+            HTTPException: 404 si la session n'existe pas ou a expiré
+    """
+    session = upload_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    return session_response(session)
+
+@router.put("/sessions/{session_id}")
+async def upload_session_range(
+        session_id: str,
+        request: Request,
+        content_range: str = Header(...)
+):
+    """Reçoit une plage d'octets d'un fichier (en-tête `Content-Range: bytes début-fin/total`).
+
+        Le corps est écrit en flux à la suite des octets déjà reçus ; en cas de
+        coupure, ce qui est arrivé est conservé.
+
+        Args:
+            session_id (str): Identifiant de la session
+            request (Request): Requête dont le corps contient la plage
+            content_range (str): En-tête Content-Range
+
+        Returns:
+            dict: Nombre d'octets reçus (`offset`) et taille totale (`size`)
+
+        Raises:
+            HTTPException: 400 si la plage est invalide, 404 si la session n'existe pas,
+                409 si la plage ne commence pas à la position reçue (la position est dans `detail`)
+    """
+    match = CONTENT_RANGE_PATTERN.fullmatch(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="En-tête Content-Range invalide")
+    start, end, total = (int(value) for value in match.groups())
+    session = upload_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    if end < start or total != session["size"]:
+        raise HTTPException(status_code=400, detail="Plage incohérente avec la taille du fichier")
+
+    try:
+        offset = await upload_sessions.write_range(session_id, start, end - start + 1, request.stream())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"offset": offset, "size": session["size"]}
+
+@router.post("/sessions/{session_id}/finalize")
+async def finalize_upload_session(session_id: str, sha256: Optional[str] = Body(default=None, embed=True)):
+    """Termine un upload : vérifie la taille et l'empreinte puis déplace le fichier dans le dossier d'uploads.
+
+        Args:
+            session_id (str): Identifiant de la session
+            sha256 (Optional[str]): Empreinte attendue (sinon celle donnée à l'ouverture)
+
+        Returns:
+            dict: Chemin relatif, taille et empreinte SHA-256 du fichier
+
+        Raises:
+            HTTPException: 404 si la session n'existe pas, 400 si aucune empreinte attendue n'a été
+                fournie, si le fichier est incomplet ou si l'empreinte ne correspond pas (la session
+                est alors supprimée)
+    """
+    session = upload_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    ingestion_queue.hint(session["destination"], PRIORITY_UPLOAD)
+    try:
+        saved = await upload_sessions.finalize(session_id, sha256)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "relative_path": os.path.relpath(saved["path"], os.path.abspath(UPLOAD_DIR)),
+        "size": saved["size"],
+        "sha256": saved["sha256"]
+    }
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(session_id: str):
+    """Abandonne une session d'upload et supprime les données reçues.
+
+        Args:
+            session_id (str): Identifiant de la session
+
+        Returns:
+            dict: Statut de l'opération
+
+        Raises:
+            HTTPException: 404 si la session n'existe pas
+    """
+    if not upload_sessions.abort(session_id):
+        raise HTTPException(status_code=404, detail="Session d'upload introuvable")
+    return {"status": "aborted"}
+
 
 @router.get("/existing_files")
 async def get_existing_files():
@@ -241,6 +517,8 @@ async def check_processing_status(filename: str):
             - exists: Si le fichier existe
             - processed: Si le fichier a été traité
             - status: Statut détaillé
+            - queue: État dans la file d'ingestion ("queued", "processing" ou None)
+            - metadata: État de l'extraction LLM des métadonnées ("queued", "running" ou None)
     """
     file_path = os.path.join(UPLOAD_DIR, filename)
     metadata_path = f"{file_path}.metadata.json"
@@ -252,7 +530,9 @@ async def check_processing_status(filename: str):
         "filename": filename,
         "exists": exists,
         "processed": processed,
-        "status": "processed" if processed else "processing" if exists else "not_found"
+        "status": "processed" if processed else "processing" if exists else "not_found",
+        "queue": ingestion_queue.status(file_path),
+        "metadata": metadata_stage.status(file_path)
     }
 
 
@@ -335,16 +615,10 @@ async def update_file_metadata(
         raise HTTPException(status_code=404, detail="Fichier non trouvé")
 
     try:
-        if os.path.exists(METADATA_FILE):
-            with open(METADATA_FILE, 'r') as f:
-                all_metadata = json.load(f)
-        else:
-            all_metadata = {}
-
-        all_metadata[filename] = metadata
+        document_metadata.put(filename, metadata)
 
-        with open(METADATA_FILE, 'w') as f:
-            json.dump(all_metadata, f, indent=2)
+        metadata_index.update_document(filename, metadata)
+        query_gazetteer.update_document(filename, metadata)
 
         return {"success": True, "message": "Métadonnées mises à jour"}
 
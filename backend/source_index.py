@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Tuple
+
+from answer_cache import source_key
+
+# ----------------- CONFIGURATION -----------------
+
+SOURCE_INDEX_FILE = "source_index.sqlite3"
+REBUILD_PAGE_SIZE = 5000
+
+
+class SourceIndex:
+    """Correspondance persistante fichier source -> IDs de chunks Chroma.
+
+        Permet de retrouver les chunks d'un fichier ou d'un dossier par une
+        recherche indexée, sans parcourir les métadonnées de toute la collection.
+        Les chemins sont comparés sous leur forme normalisée (`source_key`).
+
+        Attributes:
+            path (str): Chemin du fichier SQLite
+    """
+    def __init__(self, path: str = SOURCE_INDEX_FILE):
+        """Ouvre (ou crée) l'index.
+
+            Args:
+                path (str): Chemin du fichier SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS source_chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                source_key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_source_chunks_key ON source_chunks(source_key);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, entries: Iterable[Tuple[str, str]]):
+        """Enregistre des chunks.
+
+            Args:
+                entries (Iterable[Tuple[str, str]]): Paires (ID du chunk, chemin source)
+        """
+        rows = [(chunk_id, source, source_key(source)) for chunk_id, source in entries]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO source_chunks VALUES (?, ?, ?)", rows)
+
+    def add_chunks(self, chunks):
+        """Enregistre des chunks LangChain.
+
+            Args:
+                chunks: Documents dont les métadonnées contiennent `id` et `source`
+        """
+        self.add(
+            (chunk.metadata["id"], chunk.metadata["source"])
+            for chunk in chunks
+            if chunk.metadata.get("id") and chunk.metadata.get("source")
+        )
+
+    def remove(self, chunk_ids: List[str]):
+        """Retire des chunks.
+
+            Args:
+                chunk_ids (List[str]): IDs des chunks à retirer
+        """
+        if not chunk_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM source_chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids]
+            )
+
+    def chunk_ids(self, source: str) -> List[str]:
+        """Retourne les IDs des chunks d'un fichier.
+
+            Args:
+                source (str): Chemin du fichier source
+
+            Returns:
+                List[str]: IDs des chunks
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM source_chunks WHERE source_key = ?", (source_key(source),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def chunks_under(self, prefix: str) -> List[Tuple[str, str]]:
+        """Retourne les chunks de tous les fichiers d'un dossier (sous-dossiers compris).
+
+            Args:
+                prefix (str): Chemin du dossier
+
+            Returns:
+                List[Tuple[str, str]]: Paires (ID du chunk, chemin source)
+        """
+        start = source_key(prefix).rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, source FROM source_chunks WHERE source_key >= ? AND source_key < ?",
+                (start, start + "\U0010ffff")
+            ).fetchall()
+        return rows
+
+    def sources(self) -> dict:
+        """Retourne les fichiers sources présents dans l'index.
+
+            Returns:
+                dict: Chemin normalisé -> chemin tel qu'enregistré
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_key, MIN(source) FROM source_chunks GROUP BY source_key"
+            ).fetchall()
+        return dict(rows)
+
+    def count(self) -> int:
+        """Retourne le nombre de chunks enregistrés.
+
+            Returns:
+                int: Nombre de chunks
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM source_chunks").fetchone()[0]
+
+    def rebuild_from(self, db):
+        """Construit l'index à partir des métadonnées des chunks présents dans Chroma.
+
+            Args:
+                db (Chroma): Base vectorielle source
+        """
+        offset = 0
+        total = 0
+        while True:
+            page = db.get(include=["metadatas"], limit=REBUILD_PAGE_SIZE, offset=offset)
+            ids = page.get("ids", [])
+            if not ids:
+                break
+            self.add(
+                (chunk_id, metadata["source"])
+                for chunk_id, metadata in zip(ids, page["metadatas"])
+                if metadata and metadata.get("source")
+            )
+            total += len(ids)
+            offset += len(ids)
+        print(f"[SourceIndex] Index reconstruit depuis Chroma : {total} chunk(s)")
+
+
+source_index = SourceIndex()
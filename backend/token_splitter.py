@@ -0,0 +1,146 @@
+import copy
+from typing import Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+from tokenization import get_tokenizer, TOKEN_COUNT_KEY
+
+# ----------------- CONFIGURATION -----------------
+
+SENTENCE_ENDINGS = (".", "!", "?", ";", ":")
+MIN_CHUNK_FILL = 0.5
+
+BREAK_PARAGRAPH = 4
+BREAK_LINE = 3
+BREAK_SENTENCE = 2
+BREAK_WORD = 1
+BREAK_NONE = 0
+
+
+class TokenTextSplitter:
+    """Découpe un texte en chunks d'un nombre de tokens borné, en une seule tokenisation.
+
+        Chaque page est tokenisée une fois par un tokenizer rapide ; les offsets
+        des tokens servent à couper le texte à une frontière de token, en
+        préférant (par ordre) une fin de paragraphe, une fin de ligne, une fin de
+        phrase puis un espace entre deux mots. Le nombre de tokens de chaque chunk
+        (tokens spéciaux inclus, comme `count_tokens`) est enregistré dans ses
+        métadonnées sans re-tokenisation.
+
+        Attributes:
+            chunk_tokens (int): Nombre maximal de tokens par chunk (tokens spéciaux inclus)
+            overlap_tokens (int): Nombre de tokens repris du chunk précédent
+    """
+    def __init__(self, chunk_tokens: int, overlap_tokens: int = 0, tokenizer=None):
+        """Initialise le découpeur.
+
+            Args:
+                chunk_tokens (int): Nombre maximal de tokens par chunk (tokens spéciaux inclus)
+                overlap_tokens (int): Nombre de tokens repris du chunk précédent
+                tokenizer: Tokenizer Hugging Face rapide (par défaut celui du contexte du chat)
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        if not getattr(self.tokenizer, "is_fast", False):
+            raise ValueError("TokenTextSplitter nécessite un tokenizer rapide (offsets des tokens)")
+        self.special_tokens = self.tokenizer.num_special_tokens_to_add()
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.budget = max(1, chunk_tokens - self.special_tokens)
+        if overlap_tokens >= self.budget:
+            raise ValueError("Le recouvrement doit être inférieur à la taille des chunks")
+
+    def _break_strength(self, text: str, offsets: list, cut: int) -> int:
+        gap = text[offsets[cut - 1][1]:offsets[cut][0]]
+        if not gap:
+            return BREAK_NONE
+        if "\n\n" in gap:
+            return BREAK_PARAGRAPH
+        if "\n" in gap:
+            return BREAK_LINE
+        if text[offsets[cut - 1][0]:offsets[cut - 1][1]].endswith(SENTENCE_ENDINGS):
+            return BREAK_SENTENCE
+        return BREAK_WORD
+
+    def _find_cut(self, text: str, offsets: list, start: int, end: int) -> Tuple[int, int]:
+        lowest = start + max(1, int(self.budget * MIN_CHUNK_FILL))
+        best_cut, best_strength = end, BREAK_NONE
+        for cut in range(end, lowest - 1, -1):
+            strength = self._break_strength(text, offsets, cut)
+            if strength > best_strength:
+                best_cut, best_strength = cut, strength
+                if strength == BREAK_PARAGRAPH:
+                    break
+        return best_cut, best_strength
+
+    def _overlap_start(self, text: str, offsets: list, start: int, cut: int) -> int:
+        if not self.overlap_tokens:
+            return cut
+        candidate = max(start + 1, cut - self.overlap_tokens)
+        for position in range(candidate, cut):
+            if self._break_strength(text, offsets, position) > BREAK_NONE:
+                return position
+        return cut
+
+    def split_text_with_counts(self, text: str) -> List[Tuple[str, int]]:
+        """Découpe un texte.
+
+            Args:
+                text (str): Texte à découper
+
+            Returns:
+                List[Tuple[str, int]]: (texte du chunk, nombre de tokens spéciaux inclus)
+        """
+        offsets = self.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True,
+            return_attention_mask=False, return_token_type_ids=False, verbose=False,
+        )["offset_mapping"]
+        total = len(offsets)
+        chunks = []
+        start = 0
+        starts_on_word = True
+        while start < total:
+            end = min(start + self.budget, total)
+            ends_on_word = True
+            if end < total:
+                end, strength = self._find_cut(text, offsets, start, end)
+                ends_on_word = strength > BREAK_NONE
+            chunk = text[offsets[start][0]:offsets[end - 1][1]]
+            if starts_on_word and ends_on_word:
+                token_count = end - start + self.special_tokens
+            else:
+                # Coupure au milieu d'un mot : la re-tokenisation peut différer du découpage.
+                token_count = len(self.tokenizer.encode(chunk))
+            chunks.append((chunk, token_count))
+            if end >= total:
+                break
+            start = self._overlap_start(text, offsets, start, end)
+            starts_on_word = self._break_strength(text, offsets, start) > BREAK_NONE
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        """Découpe un texte.
+
+            Args:
+                text (str): Texte à découper
+
+            Returns:
+                List[str]: Textes des chunks
+        """
+        return [chunk for chunk, _ in self.split_text_with_counts(text)]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Découpe des documents en chunks LangChain.
+
+            Args:
+                documents (Iterable[Document]): Documents (pages) à découper
+
+            Returns:
+                List[Document]: Chunks avec leur nombre de tokens dans `token_count`
+        """
+        chunks = []
+        for document in documents:
+            for text, token_count in self.split_text_with_counts(document.page_content):
+                chunk_metadata = copy.deepcopy(document.metadata)
+                chunk_metadata[TOKEN_COUNT_KEY] = token_count
+                chunks.append(Document(page_content=text, metadata=chunk_metadata))
+        return chunks
@@ -0,0 +1,52 @@
+import threading
+from typing import List
+
+from langchain_core.documents import Document
+
+# ----------------- CONFIGURATION -----------------
+
+CONTEXT_TOKENIZER = "bert-base-uncased"
+TOKEN_COUNT_KEY = "token_count"
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """Retourne le tokenizer utilisé pour le budget de contexte du chat (chargé une seule fois).
+
+        Returns:
+            PreTrainedTokenizerBase: Tokenizer Hugging Face
+    """
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(CONTEXT_TOKENIZER)
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Compte les tokens d'un texte comme le fait la construction du contexte.
+
+        Args:
+            text (str): Texte à mesurer
+
+        Returns:
+            int: Nombre de tokens (tokens spéciaux inclus)
+    """
+    return len(get_tokenizer().encode(text))
+
+
+def annotate_token_counts(chunks: List[Document]) -> List[Document]:
+    """Enregistre le nombre de tokens de chaque chunk dans ses métadonnées.
+
+        Args:
+            chunks (List[Document]): Chunks à annoter
+
+        Returns:
+            List[Document]: Chunks avec la clé `token_count` renseignée
+    """
+    for chunk in chunks:
+        chunk.metadata[TOKEN_COUNT_KEY] = count_tokens(chunk.page_content)
+    return chunks
@@ -0,0 +1,412 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import tempfile
+import zipfile
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from manifest import is_ignored_file
+from hashing import file_sha256
+
+# ----------------- CONFIGURATION -----------------
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_STAGING_DIR = "upload_staging"
+STAGING_SUFFIX = ".part"
+UPLOAD_SESSION_DIR = os.path.join(UPLOAD_STAGING_DIR, "sessions")
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def resolve_upload_path(root: str, *parts: str) -> str:
+    """Construit un chemin de destination sous `root` en refusant toute sortie du dossier.
+
+        Protège contre les chemins relatifs malveillants (`../`, chemins absolus),
+        notamment ceux des entrées d'archives ZIP.
+
+        Args:
+            root (str): Dossier racine (dossier d'uploads)
+            *parts (str): Segments du chemin relatif
+
+        Returns:
+            str: Chemin absolu normalisé
+
+        Raises:
+            ValueError: Si le chemin sort de `root` ou désigne `root` lui-même
+    """
+    root = os.path.abspath(root)
+    relative = os.path.join(*[part.replace("\\", "/") for part in parts if part])
+    path = os.path.abspath(os.path.join(root, relative))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Chemin invalide : {relative}")
+    return path
+
+
+class StagedFile:
+    """Fichier en cours de réception, écrit dans le dossier de transit.
+
+        Le dossier de transit est hors du dossier surveillé : le watcher ne voit
+        que le fichier complet, déplacé par `os.replace` (atomique sur un même
+        système de fichiers). L'empreinte SHA-256 est calculée au fil de l'écriture.
+
+        Attributes:
+            path (str): Chemin du fichier temporaire
+            size (int): Nombre d'octets écrits
+    """
+    def __init__(self, staging_dir: str = UPLOAD_STAGING_DIR):
+        """Crée le fichier temporaire.
+
+            Args:
+                staging_dir (str): Dossier de transit
+        """
+        os.makedirs(staging_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=staging_dir, suffix=STAGING_SUFFIX)
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, block: bytes):
+        """Ajoute un bloc au fichier et à l'empreinte.
+
+            Args:
+                block (bytes): Données reçues
+        """
+        self._file.write(block)
+        self._digest.update(block)
+        self.size += len(block)
+
+    def commit(self, destination: str) -> dict:
+        """Déplace le fichier complet vers sa destination.
+
+            Args:
+                destination (str): Chemin final (les dossiers sont créés si besoin)
+
+            Returns:
+                dict: Chemin (`path`), taille (`size`) et empreinte (`sha256`) du fichier
+        """
+        self._file.close()
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(self.path, destination)
+        return {"path": destination, "size": self.size, "sha256": self._digest.hexdigest()}
+
+    def discard(self):
+        """Abandonne le fichier temporaire."""
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+async def save_upload(file: UploadFile, destination: str) -> dict:
+    """Enregistre un fichier uploadé par blocs, sans le charger entièrement en mémoire.
+
+        Args:
+            file (UploadFile): Fichier reçu
+            destination (str): Chemin final
+
+        Returns:
+            dict: Chemin (`path`), taille (`size`) et empreinte (`sha256`) du fichier
+    """
+    staged = StagedFile()
+    try:
+        while True:
+            block = await file.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            await asyncio.to_thread(staged.write, block)
+        return await asyncio.to_thread(staged.commit, destination)
+    except BaseException:
+        staged.discard()
+        raise
+
+def save_stream(source: BinaryIO, destination: str) -> dict:
+    """Enregistre un flux binaire par blocs (version synchrone de `save_upload`).
+
+        Args:
+            source (BinaryIO): Flux à recopier
+            destination (str): Chemin final
+
+        Returns:
+            dict: Chemin (`path`), taille (`size`) et empreinte (`sha256`) du fichier
+    """
+    staged = StagedFile()
+    try:
+        for block in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            staged.write(block)
+        return staged.commit(destination)
+    except BaseException:
+        staged.discard()
+        raise
+
+
+def plan_zip_extraction(archive: zipfile.ZipFile, root: str) -> Tuple[List[Tuple[zipfile.ZipInfo, str]], List[str]]:
+    """Associe chaque entrée d'une archive à son chemin de destination.
+
+        Seul le répertoire central de l'archive est lu. Les dossiers, les
+        fichiers temporaires ou cachés et les entrées dont le chemin sortirait
+        de `root` sont écartés.
+
+        Args:
+            archive (zipfile.ZipFile): Archive ouverte
+            root (str): Dossier de destination
+
+        Returns:
+            Tuple[List[Tuple[ZipInfo, str]], List[str]]: Entrées à extraire avec leur
+                destination, noms des entrées écartées
+    """
+    entries, skipped = [], []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        if is_ignored_file(os.path.basename(info.filename.rstrip("/"))):
+            skipped.append(info.filename)
+            continue
+        try:
+            entries.append((info, resolve_upload_path(root, info.filename)))
+        except ValueError:
+            print(f"[Upload] Entrée d'archive refusée : {info.filename}")
+            skipped.append(info.filename)
+    return entries, skipped
+
+def extract_zip_entries(archive: zipfile.ZipFile, entries: List[Tuple[zipfile.ZipInfo, str]]) -> List[dict]:
+    """Extrait des entrées d'archive une à une, par blocs, via le dossier de transit.
+
+        Args:
+            archive (zipfile.ZipFile): Archive ouverte
+            entries (List[Tuple[ZipInfo, str]]): Entrées et destinations (`plan_zip_extraction`)
+
+        Returns:
+            List[dict]: Chemin, taille et empreinte de chaque fichier extrait
+    """
+    saved = []
+    for info, destination in entries:
+        with archive.open(info) as source:
+            saved.append(save_stream(source, destination))
+    return saved
+
+
+class UploadOffsetError(ValueError):
+    """Plage envoyée ne commençant pas à la position déjà reçue.
+
+        Attributes:
+            offset (int): Nombre d'octets déjà reçus
+    """
+    def __init__(self, offset: int):
+        super().__init__(f"Plage attendue à partir de l'octet {offset}")
+        self.offset = offset
+
+
+class UploadSessionStore:
+    """Sessions d'upload reprenables : un gros fichier est envoyé par plages d'octets.
+
+        Chaque session est un fichier partiel (`<id>.part`) et un descripteur
+        JSON (`<id>.json`) dans le dossier de transit, hors du dossier surveillé.
+        Le nombre d'octets reçus est la taille du fichier partiel : après une
+        coupure, le client reprend à cette position, y compris après un
+        redémarrage du serveur. À la finalisation, l'empreinte est vérifiée puis
+        le fichier est déplacé par `os.replace` vers sa destination.
+
+        Attributes:
+            directory (str): Dossier des sessions
+            ttl (int): Durée (s) sans écriture après laquelle une session est supprimée
+    """
+    def __init__(self, directory: str = UPLOAD_SESSION_DIR, ttl: int = UPLOAD_SESSION_TTL):
+        """Initialise le magasin de sessions.
+
+            Args:
+                directory (str): Dossier des sessions
+                ttl (int): Durée (s) sans écriture après laquelle une session est supprimée
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self._locks = {}
+
+    def _paths(self, session_id: str) -> Tuple[str, str]:
+        if not SESSION_ID_PATTERN.fullmatch(session_id):
+            raise KeyError(session_id)
+        base = os.path.join(self.directory, session_id)
+        return base + ".json", base + STAGING_SUFFIX
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        self._paths(session_id)
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def _remove(self, session_id: str):
+        for path in self._paths(session_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._locks.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        """Supprime les sessions sans écriture depuis plus de `ttl` secondes.
+
+            Returns:
+                int: Nombre de sessions supprimées
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        deadline = time.time() - self.ttl
+        purged = 0
+        for name in os.listdir(self.directory):
+            session_id, extension = os.path.splitext(name)
+            if extension != ".json" or not SESSION_ID_PATTERN.fullmatch(session_id):
+                continue
+            if session_id in self._locks and self._locks[session_id].locked():
+                continue
+            meta_path, part_path = self._paths(session_id)
+            try:
+                last_write = max(os.path.getmtime(meta_path), os.path.getmtime(part_path))
+            except OSError:
+                last_write = 0
+            if last_write < deadline:
+                self._remove(session_id)
+                purged += 1
+        return purged
+
+    def create(self, destination: str, size: int, sha256: Optional[str] = None) -> dict:
+        """Ouvre une session d'upload.
+
+            Args:
+                destination (str): Chemin final du fichier
+                size (int): Taille totale annoncée (octets)
+                sha256 (str, optional): Empreinte attendue, vérifiée à la finalisation
+
+            Returns:
+                dict: Session (`session_id`, `destination`, `size`, `sha256`, `offset`)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        purged = self.purge_expired()
+        if purged:
+            print(f"[Upload] {purged} session(s) d'upload expirée(s) supprimée(s)")
+        session = {
+            "session_id": uuid.uuid4().hex,
+            "destination": destination,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+        }
+        meta_path, part_path = self._paths(session["session_id"])
+        open(part_path, "wb").close()
+        with open(meta_path, "w") as f:
+            json.dump(session, f)
+        return {**session, "offset": 0}
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Retourne une session et le nombre d'octets déjà reçus.
+
+            Args:
+                session_id (str): Identifiant de la session
+
+            Returns:
+                Optional[dict]: Session avec `offset`, ou None si elle n'existe pas
+        """
+        try:
+            meta_path, part_path = self._paths(session_id)
+            with open(meta_path, "r") as f:
+                session = json.load(f)
+            session["offset"] = os.path.getsize(part_path)
+        except (KeyError, OSError, json.JSONDecodeError):
+            return None
+        return session
+
+    async def write_range(self, session_id: str, start: int, length: int, stream: AsyncIterator[bytes]) -> int:
+        """Écrit une plage d'octets reçue en flux à la suite du fichier partiel.
+
+            Les octets reçus avant une coupure de la connexion sont conservés :
+            le client reprend à la nouvelle position.
+
+            Args:
+                session_id (str): Identifiant de la session
+                start (int): Position du premier octet de la plage
+                length (int): Longueur annoncée de la plage
+                stream (AsyncIterator[bytes]): Corps de la requête
+
+            Returns:
+                int: Nombre d'octets reçus après l'écriture
+
+            Raises:
+                KeyError: Si la session n'existe pas
+                UploadOffsetError: Si la plage ne commence pas à la position déjà reçue
+                ValueError: Si la plage dépasse la taille annoncée ou ne correspond pas au corps
+        """
+        async with self._lock(session_id):
+            session = self.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            if start != session["offset"]:
+                raise UploadOffsetError(session["offset"])
+            if start + length > session["size"]:
+                raise ValueError("La plage dépasse la taille annoncée du fichier")
+
+            _, part_path = self._paths(session_id)
+            written = 0
+            with open(part_path, "ab") as f:
+                async for block in stream:
+                    if written + len(block) > length:
+                        f.truncate(start)
+                        raise ValueError("Le corps de la requête dépasse la plage annoncée")
+                    await asyncio.to_thread(f.write, block)
+                    written += len(block)
+            return start + written
+
+    async def finalize(self, session_id: str, sha256: Optional[str] = None) -> dict:
+        """Vérifie un upload complet et déplace le fichier vers sa destination.
+
+            Args:
+                session_id (str): Identifiant de la session
+                sha256 (str, optional): Empreinte attendue (sinon celle donnée à la création)
+
+            Returns:
+                dict: Chemin (`path`), taille (`size`) et empreinte (`sha256`) du fichier
+
+            Raises:
+                KeyError: Si la session n'existe pas
+                ValueError: Si aucune empreinte attendue n'a été fournie, si le fichier est
+                    incomplet ou si l'empreinte ne correspond pas (la session est alors supprimée)
+        """
+        async with self._lock(session_id):
+            session = self.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            expected = (sha256 or session["sha256"] or "").lower()
+            if not expected:
+                raise ValueError("Empreinte SHA-256 attendue manquante (à l'ouverture ou à la finalisation)")
+            if session["offset"] != session["size"]:
+                raise ValueError(f"Upload incomplet : {session['offset']}/{session['size']} octets reçus")
+
+            _, part_path = self._paths(session_id)
+            digest = await asyncio.to_thread(file_sha256, part_path)
+            if digest != expected:
+                self._remove(session_id)
+                raise ValueError("L'empreinte SHA-256 du fichier reçu ne correspond pas")
+
+            destination = session["destination"]
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(part_path, destination)
+            self._remove(session_id)
+            return {"path": destination, "size": session["size"], "sha256": digest}
+
+    def abort(self, session_id: str) -> bool:
+        """Abandonne une session et supprime les données reçues.
+
+            Args:
+                session_id (str): Identifiant de la session
+
+            Returns:
+                bool: True si la session existait
+        """
+        if self.get(session_id) is None:
+            return False
+        self._remove(session_id)
+        return True
+
+
+upload_sessions = UploadSessionStore()
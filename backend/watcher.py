@@ -4,122 +4,170 @@ import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import json
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    UnstructuredWordDocumentLoader,
-    UnstructuredExcelLoader,
-    UnstructuredPowerPointLoader,
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Iterable, Optional
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
 import spacy
-from langchain_community.llms.ollama import Ollama
-from extractors import extract_metadata_from_pdf
+from ollama_client import PooledOllamaEmbeddings
+from embedding_stage import EmbeddingStage
+from ingestion_worker import (
+    parse_document, iter_windows, read_chunk_spool, clear_chunk_spool
+)
+from ingestion_queue import ingestion_queue
+from query_metadata import query_gazetteer
+from metadata_index import metadata_index
+from answer_cache import answer_cache, source_key
+from lexical_index import lexical_index
+from source_index import source_index
+from manifest import manifest, scan_tree, is_ignored_file, STATE_INDEXED, STATE_FAILED, EXTRACTION_PENDING
+from event_coalescer import EventCoalescer
+from metadata_stage import metadata_stage
+from ingestion_queue import PRIORITY_BULK
+from document_metadata import document_metadata
+from hashing import CONTENT_HASH_KEY, FILE_HASH_KEY, text_sha256, file_sha256, annotate_content_hashes
 
 # ----------------- CONFIGURATION -----------------
 
 UPLOAD_DIR = "uploads"
 CHROMA_PATH = "chroma_uploads"
-METADATA_FILE = "documents_metadata.json"
+MAX_REPORTED_PATHS = 100
+INGEST_WINDOW_SIZE = int(os.getenv("INGEST_WINDOW_SIZE", "256"))
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-embedding_function = OllamaEmbeddings(model="nomic-embed-text")
+embedding_function = PooledOllamaEmbeddings(model="nomic-embed-text")
+embedding_stage = EmbeddingStage(model="nomic-embed-text")
 db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
 
 nlp_model = spacy.load("./modele_ner_doc")
-llama_model = Ollama(model="llama3.2:3b-instruct-q4_K_M")
 
 # ----------------- UTILITAIRES -----------------
 
-def load_documents_by_extension(file_path: str) -> list[Document]:
-    """Charge un document en fonction de son extension.
+def get_source_chunk_hashes(source_path: str) -> dict:
+    """Récupère l'empreinte de contenu des chunks indexés d'un fichier source.
 
-        Args:
-            file_path (str): Chemin vers le fichier à charger
-
-        Returns:
-            list[Document]: Liste des documents chargés
-
-        Raises:
-            Exception: Si le format de fichier n'est pas supporté
-
-        Supported Formats:
-            - PDF (.pdf)
-            - Word (.docx)
-            - Excel (.xls, .xlsx)
-            - PowerPoint (.pptx)
-    """
-    ext = os.path.splitext(file_path)[-1].lower()
-    if ext == ".pdf":
-        return PyPDFLoader(file_path).load()
-    elif ext == ".docx":
-        return UnstructuredWordDocumentLoader(file_path).load()
-    elif ext in [".xls", ".xlsx"]:
-        return UnstructuredExcelLoader(file_path).load()
-    elif ext == ".pptx":
-        return UnstructuredPowerPointLoader(file_path).load()
-    else:
-        raise Exception(f"Format de fichier non supporté : {ext}")
-
-def calculate_chunk_ids(chunks: list[Document]) -> list[Document]:
-    """Calcule des IDs uniques pour chaque chunk basés sur la source et la page.
+        Seule l'empreinte est conservée (et non les métadonnées ni le texte),
+        les chunks étant lus par fenêtres de INGEST_WINDOW_SIZE.
 
         Args:
-            chunks (list[Document]): Liste de chunks à traiter
+            source_path (str): Chemin vers le fichier source
 
         Returns:
-            list[Document]: Chunks avec leurs métadonnées ID mises à jour
-
-        Example:
-            Un ID généré aura le format: "chemin/vers/fichier.pdf:3:1"
-            (source:page:chunk_index)
+            dict: ID du chunk -> empreinte du contenu
     """
-    last_page_id = None
-    current_chunk_index = 0
-
-    for chunk in chunks:
-        source = chunk.metadata.get("source")
-        page = chunk.metadata.get("page")
-        current_page_id = f"{source}:{page}"
-
-        if current_page_id == last_page_id:
-            current_chunk_index += 1
-        else:
-            current_chunk_index = 0
-
-        chunk.metadata["id"] = f"{current_page_id}:{current_chunk_index}"
-        last_page_id = current_page_id
-
-    return chunks
-
-def process_documents(documents: list[Document]):
-    """Traite une liste de documents en chunks et les ajoute à la base vectorielle.
+    hashes = {}
+    for window in iter_windows(source_index.chunk_ids(source_path), INGEST_WINDOW_SIZE):
+        found = db.get(ids=window, include=["metadatas"])
+        missing = []
+        for chunk_id, metadata in zip(found["ids"], found["metadatas"]):
+            content_hash = (metadata or {}).get(CONTENT_HASH_KEY)
+            if content_hash:
+                hashes[chunk_id] = content_hash
+            else:
+                missing.append(chunk_id)
+        if missing:
+            # Chunks indexés avant l'introduction de l'empreinte : elle est calculée depuis le texte.
+            found = db.get(ids=missing, include=["documents"])
+            for chunk_id, text in zip(found["ids"], found["documents"]):
+                hashes[chunk_id] = text_sha256(text or "")
+    return hashes
+
+def sync_source_chunks(source_path: str, chunks: Iterable[Document]) -> dict:
+    """Met à jour les chunks d'un fichier en ne réindexant que ce qui a changé.
+
+        Les chunks sont comparés à ceux déjà indexés par leur empreinte de contenu :
+            - contenu et métadonnées identiques : rien n'est fait
+            - contenu identique, métadonnées modifiées : mise à jour des métadonnées seules
+            - contenu déjà indexé ailleurs dans le fichier (texte décalé) : l'embedding est réutilisé
+            - nouveau contenu : seul ce chunk est embeddé
+            - chunks disparus : supprimés
+
+        Les chunks sont consommés par fenêtres de INGEST_WINDOW_SIZE (lecture des
+        métadonnées indexées, embedding et écriture fenêtre par fenêtre) : seule
+        l'empreinte des chunks déjà indexés est gardée pour tout le document.
 
         Args:
-            documents (list[Document]): Documents à traiter
+            source_path (str): Chemin vers le fichier source
+            chunks (Iterable[Document]): Chunks actuels du fichier (IDs calculés), éventuellement un générateur
 
         Returns:
-            str: Message de résultat indiquant le nombre de chunks ajoutés
+            dict: Nombre de chunks inchangés, mis à jour, réutilisés, embeddés et supprimés
     """
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_documents(documents)
-    chunks = calculate_chunk_ids(chunks)
-
-    existing = db.get(include=[])
-    existing_ids = set(existing.get("ids", []))
-
-    new_chunks = [chunk for chunk in chunks if chunk.metadata["id"] not in existing_ids]
-
-    if new_chunks:
-        ids = [chunk.metadata["id"] for chunk in new_chunks]
-        db.add_documents(new_chunks, ids=ids)
-        return f"{len(new_chunks)} nouveau(x) chunk(s) ajouté(s)."
-    else:
-        return "Aucun nouveau chunk à ajouter."
-
+    # Chunks indexés pas encore revus : ceux qui restent à la fin ont disparu.
+    unseen = get_source_chunk_hashes(source_path)
+    id_by_hash = {}
+    for chunk_id, content_hash in unseen.items():
+        id_by_hash.setdefault(content_hash, chunk_id)
+
+    counts = {"unchanged": 0, "metadata_updated": 0, "reused": 0, "embedded": 0}
+    for window in iter_windows(chunks, INGEST_WINDOW_SIZE):
+        window = annotate_content_hashes(window)
+        same_content, reuse, to_embed = [], [], []
+        previous_hashes = {}
+        for chunk in window:
+            chunk_id = chunk.metadata["id"]
+            content_hash = chunk.metadata[CONTENT_HASH_KEY]
+            previous_hash = unseen.pop(chunk_id, None)
+            if previous_hash is not None:
+                previous_hashes[chunk_id] = previous_hash
+            if previous_hash == content_hash:
+                same_content.append(chunk)
+            elif content_hash in id_by_hash:
+                reuse.append((chunk, id_by_hash[content_hash]))
+            else:
+                to_embed.append(chunk)
+
+        metadata_only = []
+        if same_content:
+            found = db.get(ids=[chunk.metadata["id"] for chunk in same_content], include=["metadatas"])
+            indexed = dict(zip(found["ids"], found["metadatas"]))
+            metadata_only = [chunk for chunk in same_content if indexed.get(chunk.metadata["id"]) != chunk.metadata]
+            counts["unchanged"] += len(same_content) - len(metadata_only)
+            if metadata_only:
+                db._collection.update(
+                    ids=[chunk.metadata["id"] for chunk in metadata_only],
+                    metadatas=[chunk.metadata for chunk in metadata_only]
+                )
+
+        if reuse:
+            found = db._collection.get(ids=list({source_id for _, source_id in reuse}), include=["embeddings"])
+            vectors = dict(zip(found["ids"], found["embeddings"]))
+            missing = [chunk for chunk, source_id in reuse if source_id not in vectors]
+            reuse = [(chunk, vectors[source_id]) for chunk, source_id in reuse if source_id in vectors]
+            to_embed.extend(missing)
+
+        if to_embed:
+            vectors = embedding_stage.embed_documents([chunk.page_content for chunk in to_embed])
+            reuse.extend(zip(to_embed, vectors))
+
+        if reuse:
+            written = [chunk for chunk, _ in reuse]
+            embedding_stage.upsert(db, written, [vector for _, vector in reuse])
+            lexical_index.add_chunks(written)
+            source_index.add_chunks(written)
+            # Ces IDs ne portent plus leur ancien contenu : ils ne peuvent plus
+            # servir de source de réutilisation pour les fenêtres suivantes.
+            for chunk in written:
+                chunk_id = chunk.metadata["id"]
+                previous_hash = previous_hashes.get(chunk_id)
+                if previous_hash is not None and id_by_hash.get(previous_hash) == chunk_id:
+                    del id_by_hash[previous_hash]
+
+        counts["metadata_updated"] += len(metadata_only)
+        counts["reused"] += len(reuse) - len(to_embed)
+        counts["embedded"] += len(to_embed)
+
+    stale_ids = list(unseen)
+    if stale_ids:
+        db.delete(stale_ids)
+        lexical_index.remove_chunks(stale_ids)
+        source_index.remove(stale_ids)
+
+    if counts["metadata_updated"] or counts["reused"] or counts["embedded"] or stale_ids:
+        answer_cache.invalidate_sources([source_path])
+
+    counts["deleted"] = len(stale_ids)
+    return counts
 
 def delete_chunks_by_source(source_path: str):
     """Supprime les chunks associés à un fichier source.
@@ -130,30 +178,22 @@ def delete_chunks_by_source(source_path: str):
         Returns:
             str: Message de résultat indiquant le nombre de chunks supprimés
     """
-    abs_path = os.path.abspath(source_path)
     filename = os.path.basename(source_path)
+    ids_to_delete = source_index.chunk_ids(source_path)
+    manifest.remove(source_path)
 
-    all_docs = db.get(include=["metadatas", "documents"])
-    ids_to_delete = [
-        all_docs["ids"][idx]
-        for idx, metadata in enumerate(all_docs["metadatas"])
-        if metadata.get("source") and os.path.abspath(metadata["source"]) == abs_path
-    ]
-
-    if os.path.exists(METADATA_FILE):
-        try:
-            with open(METADATA_FILE, 'r+') as f:
-                all_metadata = json.load(f)
-                if filename in all_metadata:
-                    del all_metadata[filename]
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(all_metadata, f, indent=2)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"[ERROR] Erreur lors de la mise à jour du fichier de métadonnées: {e}")
+    try:
+        document_metadata.remove(filename)
+        query_gazetteer.remove_document(filename)
+        metadata_index.remove_document(filename)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"[ERROR] Erreur lors de la mise à jour du fichier de métadonnées: {e}")
 
     if ids_to_delete:
         db.delete(ids_to_delete)
+        lexical_index.remove_chunks(ids_to_delete)
+        source_index.remove(ids_to_delete)
+        answer_cache.remove_sources([source_path])
         return f"{len(ids_to_delete)} chunk(s) supprimé(s) pour le fichier {filename}."
 
     return f"Aucun chunk à supprimer pour le fichier {filename}."
@@ -167,86 +207,143 @@ def delete_chunks_by_source_prefix(prefix_path: str):
         Returns:
             str: Message de résultat indiquant le nombre de chunks supprimés
     """
-    abs_prefix = os.path.abspath(prefix_path)
-    all_docs = db.get(include=["metadatas", "documents"])
-    ids_to_delete = []
-
-    for idx, metadata in enumerate(all_docs["metadatas"]):
-        source = metadata.get("source")
-        if source:
-            abs_source = os.path.abspath(source)
-            if abs_source.startswith(abs_prefix):
-                ids_to_delete.append(all_docs["ids"][idx])
+    entries = source_index.chunks_under(prefix_path)
+    manifest.remove_prefix(prefix_path)
+    ids_to_delete = [chunk_id for chunk_id, _ in entries]
+    sources = {source for _, source in entries}
 
     if ids_to_delete:
         db.delete(ids_to_delete)
+        lexical_index.remove_chunks(ids_to_delete)
+        source_index.remove(ids_to_delete)
+        answer_cache.remove_sources(sources)
         return f"{len(ids_to_delete)} chunk(s) supprimé(s) pour le dossier."
     return "Aucun chunk à supprimer pour le dossier."
 
-# ----------------- WATCHER -----------------
-
-class UploadsHandler(FileSystemEventHandler):
-    """Gestionnaire d'événements pour surveiller les modifications dans le dossier d'uploads.
+def rename_document_metadata(old_filename: str, new_filename: str):
+    """Réaffecte les métadonnées extraites d'un document à son nouveau nom.
 
-        Attributes:
-            processing_files (set): Ensemble des fichiers en cours de traitement
-            loop (asyncio.AbstractEventLoop): Boucle d'événements asyncio
-            last_events (dict): Derniers événements traités avec leur taille
+        Args:
+            old_filename (str): Ancien nom du fichier
+            new_filename (str): Nouveau nom du fichier
     """
-    def __init__(self, loop):
-        """Initialise le gestionnaire.
+    if old_filename == new_filename:
+        return
+    try:
+        metadata = document_metadata.rename(old_filename, new_filename)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"[ERROR] Erreur lors de la mise à jour du fichier de métadonnées: {e}")
+        return
+    if metadata is None:
+        return
 
-            Args:
-                loop (asyncio.AbstractEventLoop): Boucle d'événements asyncio
-        """
-        self.processing_files = set()
-        self.loop = loop
-        self.last_events = {}
+    query_gazetteer.remove_document(old_filename)
+    metadata_index.remove_document(old_filename)
+    query_gazetteer.update_document(new_filename, metadata)
+    metadata_index.update_document(new_filename, metadata)
+
+def move_source_chunks(src_path: str, dest_path: str) -> tuple[int, Optional[str]]:
+    """Réaffecte les chunks d'un fichier à son nouveau chemin en conservant leurs vecteurs.
 
-    def should_ignore_event(self, src_path):
-        """Détermine si un événement doit être ignoré.
+        Les IDs (`source:page:index`) et la métadonnée `source` sont réécrits ;
+        les embeddings existants sont recopiés tels quels.
 
         Args:
-            src_path (str): Chemin du fichier concerné par l'événement
+            src_path (str): Ancien chemin du fichier
+            dest_path (str): Nouveau chemin du fichier
 
         Returns:
-            bool: True si l'événement doit être ignoré
-        """
-        filename = os.path.basename(src_path)
-        if filename.startswith(('.', '~$', '~')) or filename.endswith('.tmp'):
-            return True
+            tuple[int, Optional[str]]: Nombre de chunks déplacés et empreinte du fichier indexé
+    """
+    old_ids = source_index.chunk_ids(src_path)
+    if not old_ids:
+        return 0, None
+
+    found = db._collection.get(ids=old_ids, include=["embeddings", "metadatas", "documents"])
+    moved = []
+    for chunk_id, vector, metadata, text in zip(
+        found["ids"], found["embeddings"], found["metadatas"], found["documents"]
+    ):
+        _, page, index = chunk_id.rsplit(":", 2)
+        new_id = f"{dest_path}:{page}:{index}"
+        metadata = dict(metadata or {}, source=dest_path, id=new_id)
+        moved.append((Document(page_content=text or "", metadata=metadata), vector))
+
+    embedding_stage.upsert(db, [chunk for chunk, _ in moved], [vector for _, vector in moved])
+    new_ids = {chunk.metadata["id"] for chunk, _ in moved}
+    stale_ids = [chunk_id for chunk_id in found["ids"] if chunk_id not in new_ids]
+    if stale_ids:
+        db.delete(stale_ids)
+    lexical_index.remove_chunks(stale_ids)
+    lexical_index.add_chunks([chunk for chunk, _ in moved])
+    source_index.remove(stale_ids)
+    source_index.add_chunks([chunk for chunk, _ in moved])
+    answer_cache.remove_sources([src_path])
+    answer_cache.invalidate_sources([dest_path])
+
+    file_hash = next((chunk.metadata.get(FILE_HASH_KEY) for chunk, _ in moved if chunk.metadata.get(FILE_HASH_KEY)), None)
+    return len(moved), file_hash
+
+def indexed_file_hash(source_path: str) -> Optional[str]:
+    """Retourne l'empreinte du fichier enregistrée lors de sa dernière indexation.
 
-        now = time.time()
-        if src_path in self.last_events:
-            last_event_time, last_size = self.last_events[src_path]
+        Args:
+            source_path (str): Chemin du fichier
 
-            try:
-                current_size = os.path.getsize(src_path)
-                if now - last_event_time < 5.0 and current_size == last_size:
-                    return True
-            except OSError:
-                pass
+        Returns:
+            Optional[str]: Empreinte, ou None si le fichier n'est pas indexé
+    """
+    chunk_ids = source_index.chunk_ids(source_path)[:1]
+    if not chunk_ids:
+        return None
+    metadatas = db.get(ids=chunk_ids, include=["metadatas"])["metadatas"]
+    return (metadatas[0] or {}).get(FILE_HASH_KEY) if metadatas else None
 
-        try:
-            current_size = os.path.getsize(src_path)
-            self.last_events[src_path] = (now, current_size)
-        except OSError:
-            self.last_events[src_path] = (now, 0)
+def stamp_file_hash(source_path: str, file_hash: str):
+    """Enregistre l'empreinte du fichier sur ses chunks (index antérieur à son introduction).
+
+        Args:
+            source_path (str): Chemin du fichier
+            file_hash (str): Empreinte du contenu du fichier
+    """
+    chunk_ids = source_index.chunk_ids(source_path)
+    if not chunk_ids:
+        return
+    found = db.get(ids=chunk_ids, include=["metadatas"])
+    db._collection.update(
+        ids=found["ids"],
+        metadatas=[dict(metadata or {}, **{FILE_HASH_KEY: file_hash}) for metadata in found["metadatas"]]
+    )
+
+# ----------------- WATCHER -----------------
+
+class UploadsHandler(FileSystemEventHandler):
+    """Gestionnaire d'événements pour surveiller les modifications dans le dossier d'uploads.
+
+        Les créations et modifications ne déclenchent pas directement de
+        traitement : elles passent par le regroupement d'événements, qui ne
+        transmet chaque fichier à la file d'ingestion qu'une fois stabilisé.
+
+        Attributes:
+            coalescer (EventCoalescer): Regroupement des événements par fichier
+    """
+    def __init__(self, coalescer: EventCoalescer):
+        """Initialise le gestionnaire.
+
+            Args:
+                coalescer (EventCoalescer): Regroupement des événements par fichier
+        """
+        self.coalescer = coalescer
 
-        return False
     def on_modified(self, event):
         """Gère les événements de modification de fichier.
 
             Args:
                 event (FileSystemEvent): Événement de modification
         """
-        if event.is_directory or self.should_ignore_event(event.src_path):
+        if event.is_directory or is_ignored_file(os.path.basename(event.src_path)):
             return
-
-        print(f"[Watcher] Fichier modifié : {event.src_path}")
-        asyncio.run_coroutine_threadsafe(
-            self.handle_file(event.src_path), self.loop
-        )
+        self.coalescer.touch(event.src_path)
 
     def on_created(self, event):
         """Gère les événements de création de fichier.
@@ -257,11 +354,10 @@ class UploadsHandler(FileSystemEventHandler):
         if event.is_directory:
             print(f"[Watcher] Dossier créé : {event.src_path}")
             return
-        else:
-            print(f"[Watcher] Fichier créé : {event.src_path}")
-            asyncio.run_coroutine_threadsafe(
-                self.handle_file(event.src_path), self.loop
-            )
+        if is_ignored_file(os.path.basename(event.src_path)):
+            return
+        print(f"[Watcher] Fichier créé : {event.src_path}")
+        self.coalescer.touch(event.src_path)
 
     def on_deleted(self, event):
         """Gère les événements de suppression de fichier/dossier.
@@ -271,108 +367,364 @@ class UploadsHandler(FileSystemEventHandler):
         """
         if event.is_directory:
             print(f"[Watcher] Dossier supprimé : {event.src_path}")
+            self.coalescer.cancel_prefix(event.src_path)
             result = delete_chunks_by_source_prefix(event.src_path)
             print(f"[Watcher] {result}")
         else:
             print(f"[Watcher] Fichier supprimé : {event.src_path}")
+            self.coalescer.cancel(event.src_path)
             result = delete_chunks_by_source(event.src_path)
             print(f"[Watcher] {result}")
 
     def on_moved(self, event):
         """Gère les événements de déplacement/renommage de fichier/dossier.
 
+            Les chunks existants sont réaffectés au nouveau chemin sans être
+            réembeddés. Le document n'est retraité que si son contenu a changé.
+            Les événements de déplacement des fichiers d'un dossier déplacé,
+            émis après celui du dossier, ne font alors plus rien.
+
             Args:
                 event (FileSystemEvent): Événement de déplacement
         """
         if event.is_directory:
             print(f"[Watcher] Dossier déplacé : {event.src_path} → {event.dest_path}")
-            deleted = delete_chunks_by_source_prefix(event.src_path)
-            print(f"[Watcher] {deleted}")
-
+            src_dir = os.path.abspath(event.src_path)
+            sources = {source for _, source in source_index.chunks_under(event.src_path)}
+            for source in sources:
+                relative = os.path.relpath(os.path.abspath(source.replace("\\", "/")), src_dir)
+                self.move_file(source, os.path.join(event.dest_path, relative))
         else:
             print(f"[Watcher] Fichier déplacé : {event.src_path} → {event.dest_path}")
-            deleted = delete_chunks_by_source(event.src_path)
-            print(f"[Watcher] {deleted}")
+            self.move_file(event.src_path, event.dest_path)
 
-            asyncio.run_coroutine_threadsafe(
-                self.handle_file(event.dest_path), self.loop
-            )
+    def move_file(self, src_path: str, dest_path: str):
+        """Réaffecte l'indexation d'un fichier déplacé et le retraite si son contenu a changé.
 
-    async def handle_file(self, file_path):
-        """Traite un fichier en l'indexant dans la base vectorielle.
+            Si la taille et la date du fichier correspondent au manifeste, le
+            contenu est considéré inchangé sans relire le fichier ; sinon
+            l'empreinte est vérifiée par `verify_moved_file` dans la boucle
+            d'événements, pas dans le thread du watcher.
 
             Args:
-                file_path (str): Chemin vers le fichier à traiter
+                src_path (str): Ancien chemin du fichier
+                dest_path (str): Nouveau chemin du fichier
         """
-        abs_path = os.path.abspath(file_path)
-        if not abs_path.startswith(os.path.abspath(UPLOAD_DIR)):
-            print(f"[Watcher] Ignoré hors uploads : {file_path}")
+        self.coalescer.cancel(src_path)
+        if is_ignored_file(os.path.basename(dest_path)):
+            # Renommé en fichier temporaire ou caché : le document n'est plus indexable.
+            print(f"[Watcher] {delete_chunks_by_source(src_path)}")
             return
+        moved, indexed_hash = move_source_chunks(src_path, dest_path)
+        if moved:
+            rename_document_metadata(os.path.basename(src_path), os.path.basename(dest_path))
+            print(f"[Watcher] {moved} chunk(s) réaffecté(s) à {dest_path}")
+            extraction = manifest.rename_extraction(src_path, dest_path)
+            if extraction and extraction[2] == EXTRACTION_PENDING:
+                self.coalescer.loop.call_soon_threadsafe(metadata_stage.submit, dest_path, extraction[0], extraction[1])
+        else:
+            indexed_hash = indexed_file_hash(dest_path)
 
-        filename = os.path.basename(file_path)
-        if filename.startswith(".~") or filename.endswith(".tmp"):
-            print(f"[Watcher] Ignoré fichier temporaire : {file_path}")
+        # Événements des fichiers d'un dossier déplacé : l'entrée est déjà au nouveau chemin.
+        entry = manifest.get(src_path) or manifest.get(dest_path)
+        manifest.remove(src_path)
+        if not moved and indexed_hash is None:
+            self.coalescer.touch(dest_path)
+            return
+        try:
+            stat = os.stat(dest_path)
+        except OSError:
             return
 
-        current_size = os.path.getsize(file_path)
-        if file_path in self.last_events:
-            _, last_size = self.last_events[file_path]
-            if current_size == last_size:
-                print(f"[Watcher] Fichier non modifié (même taille) : {file_path}")
+        if entry is not None:
+            _, size, mtime_ns, manifest_hash, state = entry
+            if (state == STATE_INDEXED and manifest_hash and indexed_hash in (None, manifest_hash)
+                    and (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns)):
+                # Simple renommage : taille et date conservées, l'empreinte du manifeste reste valable.
+                if indexed_hash is None:
+                    stamp_file_hash(dest_path, manifest_hash)
+                manifest.mark(dest_path, STATE_INDEXED, stat.st_size, stat.st_mtime_ns, manifest_hash)
                 return
 
-        await asyncio.sleep(0.5)
-        if file_path in self.processing_files:
-            return
-        self.processing_files.add(file_path)
+        asyncio.run_coroutine_threadsafe(
+            verify_moved_file(dest_path, indexed_hash, self.coalescer), self.coalescer.loop
+        )
 
-        try:
-            print(f"[Watcher] Traitement complet du fichier : {file_path}")
-            documents = load_documents_by_extension(file_path)
-
-            metadata_extra = {}
-            if file_path.lower().endswith(".pdf"):
-                metadata_extra = extract_metadata_from_pdf(file_path, nlp_model, llama_model)
-                print(f"[Watcher] Métadonnées extraites : {metadata_extra}")
-
-                all_metadata = {}
-                if os.path.exists(METADATA_FILE):
-                    with open(METADATA_FILE, 'r') as f:
-                        all_metadata = json.load(f)
-
-                filename = os.path.basename(file_path)
-                all_metadata[filename] = metadata_extra
-
-                with open(METADATA_FILE, 'w') as f:
-                    json.dump(all_metadata, f, indent=2)
-
-            splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            chunks = splitter.split_documents(documents)
-            chunks = calculate_chunk_ids(chunks)
-
-            existing = db.get(include=[])
-            existing_ids = set(existing.get("ids", []))
-
-            new_chunks = []
-            for chunk in chunks:
-                chunk_id = chunk.metadata.get("id")
-                if chunk_id not in existing_ids:
-                    if metadata_extra:
-                        chunk.metadata.update(metadata_extra)
-                    new_chunks.append(chunk)
-
-            if new_chunks:
-                ids = [chunk.metadata["id"] for chunk in new_chunks]
-                db.add_documents(new_chunks, ids=ids)
-                print(f"[Watcher] {len(new_chunks)} chunk(s) ajouté(s)")
-            else:
-                print("[Watcher] Aucun nouveau chunk à ajouter.")
 
-        except Exception as e:
-            print(f"[Watcher] Erreur traitement fichier {file_path} : {e}")
-        finally:
-            self.processing_files.remove(file_path)
+async def verify_moved_file(file_path: str, indexed_hash: Optional[str], coalescer: EventCoalescer):
+    """Compare l'empreinte d'un fichier déplacé à celle de son indexation, hors du thread du watcher.
+
+        Appelée quand la taille ou la date du fichier ne correspondent plus au
+        manifeste. Le fichier n'est retraité que si son contenu a changé.
+
+        Args:
+            file_path (str): Nouveau chemin du fichier
+            indexed_hash (Optional[str]): Empreinte enregistrée sur ses chunks (None si index antérieur)
+            coalescer (EventCoalescer): Regroupement des événements, qui planifie le retraitement
+    """
+    try:
+        stat = os.stat(file_path)
+        current_hash = await asyncio.to_thread(file_sha256, file_path)
+    except OSError:
+        return
 
+    if indexed_hash is None:
+        await asyncio.to_thread(stamp_file_hash, file_path, current_hash)
+        indexed_hash = current_hash
+    if indexed_hash == current_hash:
+        manifest.mark(file_path, STATE_INDEXED, stat.st_size, stat.st_mtime_ns, current_hash)
+        return
+
+    coalescer.touch(file_path)
+
+
+async def ingest_file(file_path: str):
+    """Traite un fichier en l'indexant dans la base vectorielle (appelé par la file d'ingestion).
+
+        L'analyse (chargement, OCR, NER, LLM) s'exécute dans un processus du pool
+        d'ingestion, l'embedding et l'écriture dans les index dans un thread :
+        la boucle d'événements de l'API reste disponible.
+
+        Args:
+            file_path (str): Chemin vers le fichier à traiter
+    """
+    abs_path = os.path.abspath(file_path)
+    if not abs_path.startswith(os.path.abspath(UPLOAD_DIR)):
+        print(f"[Watcher] Ignoré hors uploads : {file_path}")
+        return
+
+    filename = os.path.basename(file_path)
+    if filename.startswith(".~") or filename.endswith(".tmp"):
+        print(f"[Watcher] Ignoré fichier temporaire : {file_path}")
+        return
+
+    if not os.path.exists(file_path):
+        return
+
+    print(f"[Watcher] Traitement complet du fichier : {file_path}")
+    stat = os.stat(file_path)
+    try:
+        parsed = await ingestion_queue.run_in_process(parse_document, file_path)
+    except Exception:
+        manifest.mark(file_path, STATE_FAILED, stat.st_size, stat.st_mtime_ns)
+        raise
+    try:
+        await index_parsed_document(file_path, parsed, stat)
+    finally:
+        os.remove(parsed["spool"])
+
+    if not os.path.exists(file_path):
+        result = await asyncio.to_thread(delete_chunks_by_source, file_path)
+        print(f"[Watcher] Fichier supprimé pendant son traitement : {result}")
+
+async def index_parsed_document(file_path: str, parsed: dict, stat: os.stat_result):
+    """Enregistre les métadonnées d'un fichier analysé et indexe ses chunks par fenêtres.
+
+        Args:
+            file_path (str): Chemin vers le fichier
+            parsed (dict): Résultat de `parse_document`
+            stat (os.stat_result): Taille et date du fichier au début du traitement
+    """
+    filename = os.path.basename(file_path)
+    metadata_extra = parsed["metadata"]
+    llm_prompt = parsed.get("llm_prompt")
+
+    if file_path.lower().endswith(".pdf"):
+        previous = document_metadata.get(filename)
+        if llm_prompt and previous and manifest.extraction_done_hash(file_path) == parsed["file_hash"]:
+            # Contenu inchangé et champs LLM déjà fusionnés : les métadonnées enregistrées restent valables.
+            metadata_extra = {**metadata_extra, **previous}
+            llm_prompt = None
+        print(f"[Watcher] Métadonnées extraites : {metadata_extra}")
+
+        document_metadata.put(filename, metadata_extra)
+        query_gazetteer.update_document(filename, metadata_extra)
+        metadata_index.update_document(filename, metadata_extra)
+
+    def chunks():
+        for chunk in read_chunk_spool(parsed["spool"]):
+            chunk.metadata.update(metadata_extra)
+            chunk.metadata[FILE_HASH_KEY] = parsed["file_hash"]
+            yield chunk
+
+    try:
+        result = await asyncio.to_thread(sync_source_chunks, file_path, chunks())
+    except Exception:
+        manifest.mark(file_path, STATE_FAILED, stat.st_size, stat.st_mtime_ns, parsed["file_hash"])
+        raise
+    manifest.mark(file_path, STATE_INDEXED, stat.st_size, stat.st_mtime_ns, parsed["file_hash"])
+    print(
+        f"[Watcher] {result['embedded']} chunk(s) embeddé(s), {result['reused']} réutilisé(s), "
+        f"{result['metadata_updated']} métadonnée(s) mise(s) à jour, {result['deleted']} supprimé(s), "
+        f"{result['unchanged']} inchangé(s)"
+    )
+    if llm_prompt:
+        manifest.mark_extraction_pending(file_path, parsed["file_hash"], llm_prompt)
+        metadata_stage.submit(file_path, parsed["file_hash"], llm_prompt)
+
+def update_source_chunk_metadata(source_path: str, fields: dict) -> int:
+    """Ajoute des champs aux métadonnées des chunks d'un fichier, sans toucher aux vecteurs.
+
+        Args:
+            source_path (str): Chemin du fichier
+            fields (dict): Champs à ajouter ou remplacer
+
+        Returns:
+            int: Nombre de chunks mis à jour
+    """
+    updated = 0
+    for window in iter_windows(source_index.chunk_ids(source_path), INGEST_WINDOW_SIZE):
+        existing = db.get(ids=window, include=["metadatas"])
+        if not existing["ids"]:
+            continue
+        metadatas = [{**(metadata or {}), **fields} for metadata in existing["metadatas"]]
+        db._collection.update(ids=existing["ids"], metadatas=metadatas)
+        updated += len(existing["ids"])
+    if updated:
+        answer_cache.invalidate_sources([source_path])
+    return updated
+
+async def merge_llm_metadata(file_path: str, file_hash: str, fields: dict):
+    """Fusionne les métadonnées obtenues par l'étape LLM dans les index d'un fichier.
+
+        Ignoré si le fichier a été modifié, déplacé ou supprimé depuis son
+        analyse (l'empreinte indexée ne correspond plus). Une fois la fusion
+        faite, l'extraction est marquée terminée dans le manifeste.
+
+        Args:
+            file_path (str): Chemin du fichier
+            file_hash (str): Empreinte du contenu analysé
+            fields (dict): Métadonnées extraites par le LLM
+    """
+    if await asyncio.to_thread(indexed_file_hash, file_path) != file_hash:
+        print(f"[Watcher] Métadonnées LLM ignorées (fichier modifié) : {file_path}")
+        return
+
+    if fields:
+        filename = os.path.basename(file_path)
+        metadata = document_metadata.merge(filename, fields)
+        query_gazetteer.update_document(filename, metadata)
+        metadata_index.update_document(filename, metadata)
+
+        updated = await asyncio.to_thread(update_source_chunk_metadata, file_path, fields)
+        print(f"[Watcher] Métadonnées LLM fusionnées : {filename} ({updated} chunk(s)) {fields}")
+    manifest.mark_extraction_done(file_path, file_hash)
+
+def resume_metadata_extractions() -> int:
+    """Resoumet à l'étape LLM les extractions non terminées avant l'arrêt du serveur.
+
+        Returns:
+            int: Nombre d'extractions resoumises
+    """
+    resumed = 0
+    for path, file_hash, prompt in manifest.pending_extractions():
+        # Les fichiers supprimés entre-temps sont traités par la réconciliation.
+        if os.path.exists(path):
+            metadata_stage.submit(path, file_hash, prompt)
+            resumed += 1
+    return resumed
+
+
+last_reconciliation = {"status": "not_started"}
+event_coalescer = None
+
+def diff_uploads_with_manifest() -> dict:
+    """Compare le dossier d'uploads au manifeste des fichiers indexés.
+
+        Seuls la taille et la date de modification sont comparées ; l'empreinte
+        n'est recalculée que pour les fichiers dont la date a changé sans que la
+        taille change (fichier simplement touché).
+
+        Au premier démarrage (manifeste vide), les fichiers déjà présents dans
+        l'index sont adoptés tels quels et les sources indexées absentes du
+        dossier sont considérées comme supprimées.
+
+        Returns:
+            dict: Fichiers nouveaux, modifiés, supprimés et compteurs
+    """
+    entries = manifest.entries()
+    bootstrap = not entries
+    indexed_sources = source_index.sources() if bootstrap else {}
+
+    seen = set()
+    new, changed = [], []
+    unchanged = touched = adopted = 0
+    for path, size, mtime_ns in scan_tree(UPLOAD_DIR):
+        key = source_key(path)
+        seen.add(key)
+        entry = entries.get(key)
+        if entry is None:
+            if key in indexed_sources:
+                manifest.mark(path, STATE_INDEXED, size, mtime_ns)
+                adopted += 1
+            else:
+                new.append(path)
+            continue
+
+        _, old_size, old_mtime_ns, old_hash, state = entry
+        if state != STATE_INDEXED:
+            changed.append(path)
+        elif old_size == size and old_mtime_ns == mtime_ns:
+            unchanged += 1
+        elif old_size == size and old_hash and file_sha256(path) == old_hash:
+            manifest.mark(path, STATE_INDEXED, size, mtime_ns, old_hash)
+            touched += 1
+        else:
+            changed.append(path)
+
+    removed = [entry[0] for key, entry in entries.items() if key not in seen]
+    removed += [source for key, source in indexed_sources.items() if key not in seen]
+    return {
+        "bootstrap": bootstrap,
+        "new": new,
+        "changed": changed,
+        "removed": removed,
+        "unchanged": unchanged,
+        "touched": touched,
+        "adopted": adopted,
+    }
+
+async def reconcile_uploads():
+    """Resynchronise l'index avec le dossier d'uploads au démarrage.
+
+        Les fichiers nouveaux ou modifiés pendant l'arrêt du serveur sont placés
+        dans la file d'ingestion (priorité import en masse), les fichiers
+        supprimés sont retirés des index. Le rapport est conservé dans
+        `last_reconciliation`.
+    """
+    global last_reconciliation
+    start = time.time()
+    last_reconciliation = {"status": "running", "started_at": start}
+
+    diff = await asyncio.to_thread(diff_uploads_with_manifest)
+    for path in diff["removed"]:
+        await asyncio.to_thread(delete_chunks_by_source, path)
+    for path in diff["new"] + diff["changed"]:
+        await ingestion_queue.put(path, PRIORITY_BULK)
+
+    last_reconciliation = {
+        "status": "done",
+        "started_at": start,
+        "duration_seconds": time.time() - start,
+        "bootstrap": diff["bootstrap"],
+        "counts": {
+            "new": len(diff["new"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+            "unchanged": diff["unchanged"],
+            "touched": diff["touched"],
+            "adopted": diff["adopted"],
+        },
+        "new": diff["new"][:MAX_REPORTED_PATHS],
+        "changed": diff["changed"][:MAX_REPORTED_PATHS],
+        "removed": diff["removed"][:MAX_REPORTED_PATHS],
+    }
+    counts = last_reconciliation["counts"]
+    print(
+        f"[Watcher] Réconciliation en {last_reconciliation['duration_seconds']:.2f}s : "
+        f"{counts['new']} nouveau(x), {counts['changed']} modifié(s), {counts['removed']} supprimé(s), "
+        f"{counts['unchanged']} inchangé(s)"
+    )
 
 async def watch_uploads():
     """Lance la surveillance du dossier d'uploads.
@@ -382,14 +734,31 @@ async def watch_uploads():
     """
     os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+    if db.get(include=[], limit=1).get("ids"):
+        if lexical_index.count() == 0:
+            await asyncio.to_thread(lexical_index.rebuild_from, db)
+        if source_index.count() == 0:
+            await asyncio.to_thread(source_index.rebuild_from, db)
+
+    clear_chunk_spool()
+    ingestion_queue.start(ingest_file)
+    metadata_stage.start(merge_llm_metadata)
+    resumed = resume_metadata_extractions()
+    if resumed:
+        print(f"[Watcher] {resumed} extraction(s) de métadonnées LLM reprise(s)")
+
+    global event_coalescer
     loop = asyncio.get_running_loop()
-    handler = UploadsHandler(loop)
+    event_coalescer = EventCoalescer(loop, ingestion_queue.put)
+    handler = UploadsHandler(event_coalescer)
 
     observer = Observer()
     observer.schedule(handler, UPLOAD_DIR, recursive=True)
     observer.start()
     print(f"[Watcher] Surveillance du dossier '{UPLOAD_DIR}' démarrée...")
 
+    await reconcile_uploads()
+
     try:
         while True:
             await asyncio.sleep(1)
@@ -397,3 +766,5 @@ async def watch_uploads():
         print("[Watcher] Arrêt du watcher.")
         observer.stop()
         observer.join()
+        await ingestion_queue.stop()
+        await metadata_stage.stop()